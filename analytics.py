@@ -0,0 +1,327 @@
+"""
+Estatísticas de risco e desempenho das operações fechadas
+Atualizadas em O(1) por operação e consultadas sem percorrer o histórico
+"""
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Janelas de tempo das estatísticas (nome -> segundos)
+PERIODS = {'24h': 86400, '7d': 7 * 86400}
+
+# Operação nas janelas: (horário do fechamento em epoch, PnL %, ganho)
+Trade = Tuple[float, float, bool]
+
+
+def scope_key(symbol: Optional[str] = None, timeframe: Optional[str] = None) -> str:
+    """
+    Nome do escopo das estatísticas
+    
+    '*' (todas as operações), 'BTC/USDT' (símbolo), '*@15m' (timeframe) ou
+    'BTC/USDT@15m' (símbolo e timeframe).
+    """
+    key = symbol or '*'
+    if timeframe:
+        key += f"@{timeframe}"
+    return key
+
+
+class _Accumulator:
+    """
+    Contagens, média e variância (Welford) e somas de ganhos e perdas
+    
+    Aceita remover valores já adicionados, o que mantém as janelas móveis
+    em O(1) por operação.
+    """
+    
+    __slots__ = ('count', 'wins', 'mean', 'm2', 'gross_profit', 'gross_loss')
+    
+    def __init__(self):
+        self.count = 0
+        self.wins = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+    
+    def add(self, pnl: float, win: bool):
+        self.count += 1
+        self.wins += win
+        delta = pnl - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (pnl - self.mean)
+        if pnl > 0:
+            self.gross_profit += pnl
+        else:
+            self.gross_loss -= pnl
+    
+    def remove(self, pnl: float, win: bool):
+        if self.count <= 1:
+            self.__init__()
+            return
+        mean = self.mean
+        self.count -= 1
+        self.wins -= win
+        self.mean = (mean * (self.count + 1) - pnl) / self.count
+        self.m2 = max(self.m2 - (pnl - mean) * (pnl - self.mean), 0.0)
+        if pnl > 0:
+            self.gross_profit -= pnl
+        else:
+            self.gross_loss += pnl
+    
+    def summary(self) -> Dict:
+        losses = self.count - self.wins
+        return {
+            'trades': self.count,
+            'wins': self.wins,
+            'losses': losses,
+            'win_rate': self.wins / self.count * 100 if self.count else 0.0,
+            'total_pnl': self.mean * self.count,
+            'expectancy': self.mean,  # PnL médio esperado por operação
+            'std_pnl': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0,
+            'gross_profit': self.gross_profit,
+            'gross_loss': -self.gross_loss,
+            # None quando não houve perdas (infinito não existe em JSON)
+            'profit_factor': self.gross_profit / self.gross_loss if self.gross_loss > 0 else None
+        }
+    
+    def state(self) -> List:
+        return [self.count, self.wins, self.mean, self.m2, self.gross_profit, self.gross_loss]
+    
+    @classmethod
+    def from_state(cls, state: List) -> '_Accumulator':
+        accumulator = cls()
+        accumulator.count, accumulator.wins, accumulator.mean, accumulator.m2, accumulator.gross_profit, accumulator.gross_loss = state
+        return accumulator
+
+
+class _Window:
+    """Operações de uma janela móvel (últimas N ou últimos X segundos) e o acumulador delas"""
+    
+    def __init__(self, size: Optional[int] = None, seconds: Optional[float] = None):
+        self.size = size
+        self.seconds = seconds
+        self.trades: Deque[Trade] = deque()
+        self.totals = _Accumulator()
+    
+    def add(self, trade: Trade):
+        self.trades.append(trade)
+        self.totals.add(trade[1], trade[2])
+        if self.size is not None and len(self.trades) > self.size:
+            _, pnl, win = self.trades.popleft()
+            self.totals.remove(pnl, win)
+    
+    def expire(self, now: float):
+        """Descarta as operações mais antigas que a janela de tempo"""
+        if self.seconds is None:
+            return
+        while self.trades and self.trades[0][0] <= now - self.seconds:
+            _, pnl, win = self.trades.popleft()
+            self.totals.remove(pnl, win)
+
+
+class TradeStats:
+    """
+    Estatísticas das operações de um escopo
+    
+    Totais (média e desvio padrão por Welford, profit factor, expectativa),
+    melhor e pior operação, drawdown máximo da curva de PnL acumulado,
+    sequências de ganhos e perdas e as janelas das últimas N operações e
+    dos últimos PERIODS. Cada operação custa O(1); a consulta também
+    (amortizado, pelas operações que saem das janelas de tempo).
+    """
+    
+    def __init__(self, window: int = 100, created_at: Optional[float] = None):
+        self.window = window
+        self.created_at = created_at  # Primeira operação (ou reset); anteriores não entram nas janelas
+        self.totals = _Accumulator()
+        self.best: Optional[float] = None
+        self.worst: Optional[float] = None
+        self.cumulative = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.streak = 0  # > 0: ganhos seguidos; < 0: perdas seguidas
+        self.max_win_streak = 0
+        self.max_loss_streak = 0
+        self.last_trade_at: Optional[float] = None
+        self.recent = _Window(size=window)
+        self.periods = {name: _Window(seconds=seconds) for name, seconds in PERIODS.items()}
+    
+    def add(self, pnl: float, win: bool, closed_at: float):
+        """Registra uma operação fechada"""
+        if self.created_at is None:
+            self.created_at = closed_at
+        self.totals.add(pnl, win)
+        self.best = pnl if self.best is None else max(self.best, pnl)
+        self.worst = pnl if self.worst is None else min(self.worst, pnl)
+        
+        self.cumulative += pnl
+        self.peak = max(self.peak, self.cumulative)
+        self.max_drawdown = max(self.max_drawdown, self.peak - self.cumulative)
+        
+        if win:
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.max_win_streak = max(self.max_win_streak, self.streak)
+        else:
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            self.max_loss_streak = max(self.max_loss_streak, -self.streak)
+        
+        self.last_trade_at = closed_at if self.last_trade_at is None else max(self.last_trade_at, closed_at)
+        trade = (closed_at, pnl, win)
+        self.recent.add(trade)
+        for period in self.periods.values():
+            period.add(trade)
+            period.expire(closed_at)
+    
+    def restore(self, pnl: float, win: bool, closed_at: float):
+        """Recoloca nas janelas de tempo uma operação já contada nos totais (ao recarregar)"""
+        if self.created_at is None or closed_at < self.created_at:
+            return
+        for period in self.periods.values():
+            period.add((closed_at, pnl, win))
+    
+    def summary(self, now: Optional[float] = None) -> Dict:
+        """Retorna as estatísticas calculadas"""
+        now = time.time() if now is None else now
+        for period in self.periods.values():
+            period.expire(now)
+        
+        return {
+            **self.totals.summary(),
+            'best': self.best,
+            'worst': self.worst,
+            'max_drawdown': self.max_drawdown,
+            'current_drawdown': self.peak - self.cumulative,
+            'streak': {
+                'current': self.streak,
+                'max_wins': self.max_win_streak,
+                'max_losses': self.max_loss_streak
+            },
+            'windows': {
+                f"last_{self.window}": self.recent.totals.summary(),
+                **{name: period.totals.summary() for name, period in self.periods.items()}
+            }
+        }
+    
+    def state(self) -> Dict:
+        """
+        Estado para gravar e recarregar
+        
+        As operações das janelas de tempo não entram (o estado ficaria do
+        tamanho do histórico recente); ao recarregar, elas são recolocadas
+        com restore() a partir do histórico de operações.
+        """
+        return {
+            'window': self.window,
+            'created_at': self.created_at,
+            'totals': self.totals.state(),
+            'best': self.best,
+            'worst': self.worst,
+            'cumulative': self.cumulative,
+            'peak': self.peak,
+            'max_drawdown': self.max_drawdown,
+            'streak': [self.streak, self.max_win_streak, self.max_loss_streak],
+            'last_trade_at': self.last_trade_at,
+            'recent': list(self.recent.trades)
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict, window: int = 100) -> 'TradeStats':
+        """Recria as estatísticas a partir de state()"""
+        stats = cls(window, state['created_at'])
+        stats.totals = _Accumulator.from_state(state['totals'])
+        stats.best = state['best']
+        stats.worst = state['worst']
+        stats.cumulative = state['cumulative']
+        stats.peak = state['peak']
+        stats.max_drawdown = state['max_drawdown']
+        stats.streak, stats.max_win_streak, stats.max_loss_streak = state['streak']
+        stats.last_trade_at = state['last_trade_at']
+        
+        # A janela das últimas N é refeita pelas operações guardadas (N pode ter mudado)
+        for trade in state['recent']:
+            stats.recent.add(tuple(trade))
+        return stats
+
+
+class TradeAnalytics:
+    """
+    Estatísticas das operações fechadas em todos os escopos
+    
+    Cada operação atualiza quatro escopos: todas as operações, o símbolo, o
+    timeframe e o par (símbolo, timeframe) (ver scope_key). As consultas
+    leem o estado já calculado, então custam o mesmo com 10 ou 10 milhões
+    de operações. O tamanho da janela das últimas operações vem de
+    ANALYTICS_WINDOW (padrão 100).
+    """
+    
+    def __init__(self, window: Optional[int] = None):
+        self.window = window or int(os.getenv("ANALYTICS_WINDOW", "100"))
+        self.scopes: Dict[str, TradeStats] = {}
+    
+    def record(self, symbol: str, timeframe: Optional[str], pnl_pct: float, win: bool, closed_at: float) -> List[str]:
+        """
+        Registra uma operação fechada
+        
+        Returns:
+            Escopos alterados
+        """
+        keys = [scope_key(), scope_key(symbol)]
+        if timeframe:
+            keys += [scope_key(timeframe=timeframe), scope_key(symbol, timeframe)]
+        
+        for key in keys:
+            stats = self.scopes.get(key)
+            if stats is None:
+                stats = self.scopes[key] = TradeStats(self.window)
+            stats.add(pnl_pct, win, closed_at)
+        return keys
+    
+    def restore(self, symbol: str, timeframe: Optional[str], pnl_pct: float, win: bool, closed_at: float):
+        """Recoloca uma operação do histórico nas janelas de tempo dos escopos carregados"""
+        keys = [scope_key(), scope_key(symbol)]
+        if timeframe:
+            keys += [scope_key(timeframe=timeframe), scope_key(symbol, timeframe)]
+        for key in keys:
+            stats = self.scopes.get(key)
+            if stats is not None:
+                stats.restore(pnl_pct, win, closed_at)
+    
+    def summary(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> Dict:
+        """Estatísticas de um escopo (todas as operações, se nenhum filtro for informado)"""
+        stats = self.scopes.get(scope_key(symbol, timeframe))
+        if stats is None:
+            stats = TradeStats(self.window)
+        return {'scope': scope_key(symbol, timeframe), **stats.summary()}
+    
+    def reset(self, symbol: Optional[str] = None) -> List[str]:
+        """
+        Descarta as estatísticas de um símbolo (e dos seus timeframes), ou todas
+        
+        As de todas as operações e as por timeframe incluem o símbolo e não
+        mudam ao resetar só ele.
+        
+        Returns:
+            Escopos alterados
+        """
+        if symbol:
+            keys = [key for key in self.scopes if key == symbol or key.startswith(f"{symbol}@")]
+        else:
+            keys = list(self.scopes)
+        for key in keys:
+            del self.scopes[key]
+        if not symbol:
+            # Mantém o escopo global (vazio) gravado, marcando que as estatísticas foram resetadas
+            self.scopes[scope_key()] = TradeStats(self.window, time.time())
+            keys.append(scope_key())
+        return keys
+    
+    def state(self, key: str) -> Optional[Dict]:
+        stats = self.scopes.get(key)
+        return stats.state() if stats is not None else None
+    
+    def load(self, states: Dict[str, Dict]):
+        """Recria os escopos gravados (as janelas de tempo são recolocadas com restore())"""
+        self.scopes = {key: TradeStats.from_state(state, self.window) for key, state in states.items()}
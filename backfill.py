@@ -0,0 +1,261 @@
+"""
+Download de histórico longo de velas para o armazenamento local
+
+Uso:
+    python backfill.py --symbols BTC/USDT,ETH/USDT --timeframes 1m,1h --since 2024-01-01
+    python backfill.py --symbols BTC/USDT --timeframes 15m --since 2023-01-01 --until 2024-01-01 --workers 8
+
+O intervalo é dividido em blocos de até --chunk velas, buscados em paralelo
+pelo ExchangeClient (respeitando o limite de peso da exchange, com a menor
+prioridade). Os blocos são gravados em ordem no CandleStore, então uma
+execução interrompida continua da última vela gravada. Para testar sem rede,
+use EXCHANGE_BACKEND=replay (ver fake_exchange.ReplayExchange).
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from candle_store import CandleStore
+from exchange_client import ExchangeClient, OHLCV_PAGE_LIMIT
+from fake_exchange import parse_start
+from rate_limiter import PRIORITY_BACKFILL
+from resampler import timeframe_ms
+
+STAGING_DIR = '.backfill'
+
+
+class SeriesBackfill:
+    """
+    Histórico de um (símbolo, timeframe) sendo baixado
+    
+    Os blocos podem terminar fora de ordem; cada um fica guardado até que
+    todos os anteriores tenham sido gravados. Se a série já existe no
+    armazenamento e cobre o início do intervalo, o download continua da
+    última vela dela. Se ela só tem velas mais recentes (ex: gravadas pelo
+    monitoramento), o histórico é montado numa área separada e juntado à
+    série ao final.
+    """
+    
+    def __init__(self, store: CandleStore, staging: CandleStore, symbol: str, timeframe: str, since: int, until: int, chunk: int):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.until = until
+        self.store = store
+        self.staging = staging
+        self.period = timeframe_ms(timeframe)
+        
+        first = store.first_timestamp(symbol, timeframe)
+        if first is not None and first > since:
+            # Já existem velas mais recentes: baixa numa área separada e junta no final
+            self.target = staging
+        else:
+            self.target = store
+        
+        # Retoma a partir da última vela gravada (ela pode ter mudado e é buscada de novo)
+        last = self.target.last_timestamp(symbol, timeframe)
+        start = -(-since // self.period) * self.period
+        if last is not None and last >= start:
+            start = last
+        
+        step = chunk * self.period
+        self.chunks = [(begin, min(begin + step, until)) for begin in range(start, until, step)]
+        self.results: Dict[int, List[List]] = {}
+        self.next_chunk = 0
+        self.candles = 0
+        self.failed = False
+    
+    def complete(self, index: int, candles: List[List]):
+        """Recebe um bloco e grava, em ordem, todos os blocos já disponíveis"""
+        self.results[index] = candles
+        while self.next_chunk in self.results:
+            candles = self.results.pop(self.next_chunk)
+            if candles:
+                self.target.write(self.symbol, self.timeframe, candles)
+                self.candles += len(candles)
+            self.next_chunk += 1
+    
+    @property
+    def done(self) -> bool:
+        return self.next_chunk == len(self.chunks)
+    
+    def finish(self):
+        """Junta o histórico da área separada às velas que já existiam"""
+        if self.target is self.store or not self.done:
+            return
+        
+        history = self.staging.read(self.symbol, self.timeframe)
+        existing = self.store.read(self.symbol, self.timeframe)
+        rows = _rows(history)
+        if rows:
+            newer = existing[existing['timestamp'] > history['timestamp'].iloc[-1]]
+            self.store.replace(self.symbol, self.timeframe, rows)
+            self.store.write(self.symbol, self.timeframe, _rows(newer))
+        self.staging.delete(self.symbol, self.timeframe)
+
+
+def _rows(df) -> List[List]:
+    """DataFrame do CandleStore de volta para o formato ccxt"""
+    timestamps = df['timestamp'].astype('datetime64[ms]').astype('int64').tolist()
+    values = df[['open', 'high', 'low', 'close', 'volume']].values.tolist()
+    return [[timestamp] + row for timestamp, row in zip(timestamps, values)]
+
+
+async def fetch_chunk(client: ExchangeClient,
+                      series: SeriesBackfill,
+                      begin: int,
+                      end: int,
+                      retries: int = 5) -> List[List]:
+    """
+    Busca as velas de [begin, end), tentando de novo em erros temporários
+    
+    Blocos maiores que OHLCV_PAGE_LIMIT são buscados em várias páginas (a
+    exchange devolve só a primeira), até chegar em `end` ou vir uma página
+    vazia.
+    """
+    candles = []
+    since = begin
+    while since < end:
+        page = await fetch_page(client, series, since, end, retries)
+        if not page:
+            break
+        candles.extend(page)
+        since = page[-1][0] + series.period
+    return candles
+
+
+async def fetch_page(client: ExchangeClient,
+                     series: SeriesBackfill,
+                     begin: int,
+                     end: int,
+                     retries: int = 5) -> List[List]:
+    """Busca uma página de velas a partir de `begin`, limitada a [begin, end)"""
+    limit = min(-(-(end - begin) // series.period), OHLCV_PAGE_LIMIT)
+    delay = 1.0
+    for attempt in range(retries):
+        try:
+            candles = await client.fetch_ohlcv(series.symbol, series.timeframe, since=begin, limit=limit, priority=PRIORITY_BACKFILL)
+            return [candle for candle in candles if begin <= candle[0] < end]
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            print(f"Erro ao buscar {series.symbol} {series.timeframe} ({str(e)}), tentando de novo em {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay *= 2
+    return []
+
+
+async def backfill(client: ExchangeClient,
+                   store: CandleStore,
+                   symbols: List[str],
+                   timeframes: List[str],
+                   since: int,
+                   until: Optional[int] = None,
+                   chunk: int = 1000,
+                   workers: int = 8) -> Dict:
+    """
+    Baixa o histórico de vários símbolos e timeframes para o armazenamento
+    
+    Args:
+        client: Cliente da exchange (ccxt ou replay)
+        store: Armazenamento de velas de destino
+        symbols: Símbolos (ex: BTC/USDT)
+        timeframes: Timeframes (ex: 1m, 1h)
+        since: Início do intervalo em ms
+        until: Fim do intervalo em ms (None = agora no relógio da exchange)
+        chunk: Velas por bloco (até OHLCV_PAGE_LIMIT por requisição)
+        workers: Requisições simultâneas
+        
+    Returns:
+        Dict com velas gravadas por série, requisições e duração
+    """
+    until = until if until is not None else client.milliseconds()
+    staging = CandleStore(os.path.join(store.root, STAGING_DIR), store.exchange_id)
+    series = [
+        SeriesBackfill(store, staging, symbol, timeframe, since, until, chunk)
+        for symbol in symbols
+        for timeframe in timeframes
+    ]
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in series:
+        for index, (begin, end) in enumerate(item.chunks):
+            queue.put_nowait((item, index, begin, end))
+    
+    async def worker():
+        while True:
+            try:
+                item, index, begin, end = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if item.failed:
+                continue
+            try:
+                item.complete(index, await fetch_chunk(client, item, begin, end))
+            except Exception as e:
+                # Os blocos seguintes não podem ser gravados; a próxima execução continua daqui
+                item.failed = True
+                print(f"Falha no histórico de {item.symbol} {item.timeframe}: {str(e)}")
+    
+    started = time.perf_counter()
+    requests = client.requests
+    await asyncio.gather(*[worker() for _ in range(max(workers, 1))])
+    
+    for item in series:
+        item.finish()
+    
+    return {
+        'series': {
+            f"{item.symbol} {item.timeframe}": {
+                'candles': item.candles,
+                'chunks': len(item.chunks),
+                'complete': item.done
+            }
+            for item in series
+        },
+        'requests': client.requests - requests,
+        'duration_s': time.perf_counter() - started
+    }
+
+
+async def _run(args):
+    client = ExchangeClient()
+    store = CandleStore(args.store, client.id)
+    try:
+        await client.start()
+        result = await backfill(
+            client,
+            store,
+            [symbol.strip() for symbol in args.symbols.split(',') if symbol.strip()],
+            [timeframe.strip() for timeframe in args.timeframes.split(',') if timeframe.strip()],
+            since=parse_start(args.since),
+            until=parse_start(args.until) if args.until else None,
+            chunk=args.chunk,
+            workers=args.workers
+        )
+    finally:
+        await client.close()
+    
+    for name, info in result['series'].items():
+        status = 'ok' if info['complete'] else 'incompleto (execute de novo para continuar)'
+        print(f"{name}: {info['candles']} velas em {info['chunks']} blocos - {status}")
+    print(f"{result['requests']} requisições em {result['duration_s']:.1f}s")
+    return result
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Baixa histórico de velas para o armazenamento local')
+    parser.add_argument('--symbols', required=True, help='Símbolos separados por vírgula')
+    parser.add_argument('--timeframes', default='1m', help='Timeframes separados por vírgula')
+    parser.add_argument('--since', required=True, help='Início (ISO 8601, UTC)')
+    parser.add_argument('--until', default=None, help='Fim (ISO 8601, UTC; padrão: agora)')
+    parser.add_argument('--store', default=os.getenv("CANDLE_STORE_DIR") or 'data/candles', help='Diretório do armazenamento')
+    parser.add_argument('--chunk', type=int, default=1000, help='Velas por bloco (blocos maiores que o limite da exchange são paginados)')
+    parser.add_argument('--workers', type=int, default=int(os.getenv("EXCHANGE_CONCURRENCY", "20")), help='Requisições simultâneas')
+    result = asyncio.run(_run(parser.parse_args()))
+    if not all(info['complete'] for info in result['series'].values()):
+        raise SystemExit(1)
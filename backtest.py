@@ -0,0 +1,332 @@
+"""
+Backtest da estratégia GCM HRT sobre velas históricas
+
+Uso:
+    python backtest.py --symbols BTC/USDT,ETH/USDT --timeframe 15m
+    python backtest.py --symbols BTC/USDT --timeframe 1h --since 2023-01-01 --stop-loss 2 --take-profit 3
+
+Aplica as mesmas regras de TradingStrategy e PositionManager: entrada em
+sinais de força ≥ 3 no fechamento da vela, uma posição por símbolo, stop
+loss e take profit percentuais. As velas vêm do armazenamento local
+(CANDLE_STORE_DIR), preenchido pelo monitoramento ou por backfill.py.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from candle_store import CandleStore
+from fake_exchange import parse_start
+from indicator import GCMIndicator
+from trading import PositionManager
+
+
+def _signals(indicator: GCMIndicator, df: pd.DataFrame) -> tuple:
+    """
+    Sinal e força de cada vela, com a mesma prioridade de get_signal()
+    
+    O indicador é calculado uma vez sobre o histórico todo (as recorrências
+    começam na primeira vela, e não na janela de 100 velas do monitoramento).
+    """
+    graph = indicator._graph(df)
+    flags = dict(graph.signal_flags())
+    flags['rsi'] = graph.smoothed_rsi()
+    rules = indicator._signal_rules()
+    matched = np.select([condition(flags) for condition, _, _, _ in rules], np.arange(len(rules)), default=-1)
+    signal_types = np.array([rule[1] for rule in rules] + ['NONE'])[matched]
+    strengths = np.array([rule[2] for rule in rules] + [0])[matched]
+    messages = np.array([rule[3] for rule in rules] + [''], dtype=object)[matched]
+    return signal_types, strengths, messages, flags['rsi']
+
+
+def _exits(open_: np.ndarray,
+           high: np.ndarray,
+           low: np.ndarray,
+           entries: np.ndarray,
+           long: np.ndarray,
+           stop_loss: np.ndarray,
+           take_profit: np.ndarray) -> tuple:
+    """
+    Vela e preço de saída de cada entrada candidata pela máxima/mínima das velas seguintes
+    
+    Todas as entradas são buscadas juntas, em blocos de velas crescentes
+    (matriz entradas × velas do bloco); as que ainda não saíram passam para
+    o bloco seguinte. Se o stop e o alvo são atingidos na mesma vela, vale o
+    stop loss (a ordem de check_exit_conditions e a hipótese conservadora).
+    A saída é no nível atingido, ou na abertura se a vela abriu além dele.
+    
+    Returns:
+        (vela de saída ou -1 se a posição segue aberta, True se foi stop loss, preço de saída)
+    """
+    bars = len(high)
+    exit_bar = np.full(len(entries), -1)
+    hit_stop = np.zeros(len(entries), dtype=bool)
+    pending = np.arange(len(entries))
+    offset, size = 1, 64
+    
+    while len(pending):
+        window = entries[pending, None] + offset + np.arange(size)[None, :]
+        inside = window < bars
+        window = np.minimum(window, bars - 1)
+        is_long = long[pending, None]
+        sl = stop_loss[pending, None]
+        tp = take_profit[pending, None]
+        hit_sl = np.where(is_long, low[window] <= sl, high[window] >= sl) & inside
+        hit_tp = np.where(is_long, high[window] >= tp, low[window] <= tp) & inside
+        
+        hit = hit_sl | hit_tp
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)[found]
+        exit_bar[pending[found]] = window[found, first]
+        hit_stop[pending[found]] = hit_sl[found, first]
+        
+        pending = pending[~found & inside[:, -1]]
+        offset += size
+        size = min(size * 4, 4096)
+    
+    closed = exit_bar >= 0
+    level = np.where(hit_stop, stop_loss, take_profit)
+    exit_open = open_[np.maximum(exit_bar, 0)]
+    # Abertura além do nível: stop de compra / alvo de venda abaixo, os outros acima
+    below = long == hit_stop
+    exit_price = np.where(below, np.minimum(level, exit_open), np.maximum(level, exit_open))
+    return exit_bar, hit_stop, np.where(closed, exit_price, np.nan)
+
+
+def _statistics(exit_reason: np.ndarray, pnl_pct: np.ndarray) -> Dict:
+    """Estatísticas no formato de PositionManager.get_statistics(symbol), pela mesma regra de acerto"""
+    is_win = (exit_reason == 'TAKE_PROFIT') | (pnl_pct > 0)
+    wins = int(is_win.sum())
+    total = len(pnl_pct)
+    return {
+        'wins': wins,
+        'losses': total - wins,
+        'total': total,
+        'win_rate': (wins / total) * 100 if total > 0 else 0.0,
+        'total_pnl': float(pnl_pct.sum()),
+        'avg_win': float(pnl_pct[is_win].mean()) if wins else 0.0,
+        'avg_loss': float(pnl_pct[~is_win].mean()) if total > wins else 0.0
+    }
+
+
+def backtest_symbol(df: pd.DataFrame,
+                    symbol: str,
+                    indicator: Optional[GCMIndicator] = None,
+                    stop_loss_pct: float = 2.0,
+                    take_profit_pct: float = 3.0,
+                    timeframe: str = '15m') -> Dict:
+    """
+    Simula a estratégia sobre o histórico de um símbolo
+    
+    Os sinais, os níveis de stop/alvo e as saídas de todas as entradas
+    candidatas (força ≥ 3) são calculados com NumPy. Depois as operações são
+    encadeadas: cada uma começa na primeira entrada candidata após a saída
+    da anterior, então há uma posição por vez e, como em TradingStrategy, a
+    vela em que a posição fecha não abre outra.
+    
+    Args:
+        df: DataFrame OHLCV do símbolo (timestamp, open, high, low, close, volume)
+        symbol: Símbolo do ativo
+        indicator: Indicador (padrão: parâmetros padrão)
+        stop_loss_pct: Percentual de stop loss
+        take_profit_pct: Percentual de take profit
+        timeframe: Timeframe das velas (registrado nas posições)
+        
+    Returns:
+        Dict com statistics (formato de PositionManager.get_statistics), trades
+        (DataFrame) e a posição ainda aberta no final
+    """
+    indicator = indicator or GCMIndicator()
+    position_manager = PositionManager(stop_loss_pct=stop_loss_pct, take_profit_pct=take_profit_pct)
+    
+    signal_types, strengths, messages, rsi = _signals(indicator, df)
+    open_ = df['open'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    times = pd.to_datetime(df['timestamp']).to_numpy()
+    
+    entries = np.flatnonzero(strengths >= 3)
+    long = signal_types[entries] == 'BUY'
+    entry_price = close[entries]
+    stop_loss = np.where(
+        long,
+        position_manager.calculate_stop_loss(entry_price, 'LONG'),
+        position_manager.calculate_stop_loss(entry_price, 'SHORT')
+    )
+    take_profit = np.where(
+        long,
+        position_manager.calculate_take_profit(entry_price, 'LONG'),
+        position_manager.calculate_take_profit(entry_price, 'SHORT')
+    )
+    exit_bar, hit_stop, exit_price = _exits(open_, high, low, entries, long, stop_loss, take_profit)
+    
+    # Encadeia as operações: a próxima é a primeira entrada candidata após a saída
+    following = np.searchsorted(entries, exit_bar, side='right')
+    taken = []
+    k = 0
+    while k < len(entries):
+        taken.append(k)
+        if exit_bar[k] < 0:
+            break
+        k = following[k]
+    taken = np.array(taken, dtype=int)
+    
+    open_position = None
+    if len(taken) and exit_bar[taken[-1]] < 0:
+        k = taken[-1]
+        taken = taken[:-1]
+        open_position = position_manager.open_position(
+            symbol=symbol,
+            position_type='LONG' if long[k] else 'SHORT',
+            entry_price=float(entry_price[k]),
+            signal_strength=int(strengths[entries[k]]),
+            message=messages[entries[k]].format(rsi=rsi[entries[k]]),
+            timeframe=timeframe
+        )
+        open_position['entry_time'] = pd.Timestamp(times[entries[k]]).isoformat()
+    
+    direction = np.where(long[taken], 1.0, -1.0)
+    pnl_pct = (exit_price[taken] - entry_price[taken]) / entry_price[taken] * 100 * direction
+    exit_reason = np.where(hit_stop[taken], 'STOP_LOSS', 'TAKE_PROFIT')
+    
+    trades = pd.DataFrame({
+        'symbol': symbol,
+        'type': np.where(long[taken], 'LONG', 'SHORT'),
+        'entry_time': times[entries[taken]],
+        'entry_price': entry_price[taken],
+        'stop_loss': stop_loss[taken],
+        'take_profit': take_profit[taken],
+        'exit_time': times[exit_bar[taken]],
+        'exit_price': exit_price[taken],
+        'exit_reason': exit_reason,
+        'pnl_pct': pnl_pct,
+        'bars': exit_bar[taken] - entries[taken]
+    })
+    
+    return {
+        'symbol': symbol,
+        'bars': len(df),
+        'statistics': _statistics(exit_reason, pnl_pct),
+        'trades': trades,
+        'open_position': open_position
+    }
+
+
+def _backtest_batch(frames: Dict[str, pd.DataFrame], params: Dict, stop_loss_pct: float, take_profit_pct: float, timeframe: str) -> List[Dict]:
+    indicator = GCMIndicator(**params)
+    return [
+        backtest_symbol(df, symbol, indicator, stop_loss_pct, take_profit_pct, timeframe)
+        for symbol, df in frames.items()
+    ]
+
+
+def summarize(statistics: Dict[str, Dict]) -> Dict:
+    """Agrega as estatísticas por símbolo no mesmo formato de PositionManager.get_statistics(symbol)"""
+    wins = sum(stats['wins'] for stats in statistics.values())
+    losses = sum(stats['losses'] for stats in statistics.values())
+    total = wins + losses
+    return {
+        'wins': wins,
+        'losses': losses,
+        'total': total,
+        'win_rate': (wins / total) * 100 if total > 0 else 0.0,
+        'total_pnl': sum(stats['total_pnl'] for stats in statistics.values()),
+        'avg_win': sum(stats['avg_win'] * stats['wins'] for stats in statistics.values()) / wins if wins else 0.0,
+        'avg_loss': sum(stats['avg_loss'] * stats['losses'] for stats in statistics.values()) / losses if losses else 0.0
+    }
+
+
+def run_backtest(frames: Dict[str, pd.DataFrame],
+                 indicator: Optional[GCMIndicator] = None,
+                 stop_loss_pct: float = 2.0,
+                 take_profit_pct: float = 3.0,
+                 timeframe: str = '15m',
+                 workers: Optional[int] = None) -> Dict:
+    """
+    Roda o backtest de vários símbolos, distribuídos em processos
+    
+    Args:
+        frames: {símbolo: DataFrame OHLCV}
+        indicator: Indicador (padrão: parâmetros padrão)
+        stop_loss_pct: Percentual de stop loss
+        take_profit_pct: Percentual de take profit
+        timeframe: Timeframe das velas
+        workers: Número de processos (None = número de CPUs, 1 = sem pool)
+        
+    Returns:
+        Dict com statistics por símbolo, summary agregado, trades (DataFrame),
+        posições abertas no final, velas e duração
+    """
+    started = time.perf_counter()
+    params = (indicator or GCMIndicator()).get_params()
+    symbols = [symbol for symbol, df in frames.items() if len(df) > 0]
+    
+    workers = min(workers or os.cpu_count() or 1, max(len(symbols), 1))
+    batches = [symbols[k::workers] for k in range(workers)]
+    
+    if workers <= 1:
+        results = _backtest_batch({symbol: frames[symbol] for symbol in symbols}, params, stop_loss_pct, take_profit_pct, timeframe)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_backtest_batch, {symbol: frames[symbol] for symbol in batch}, params, stop_loss_pct, take_profit_pct, timeframe)
+                for batch in batches
+            ]
+            results = [result for future in futures for result in future.result()]
+    
+    order = {symbol: position for position, symbol in enumerate(symbols)}
+    results.sort(key=lambda result: order[result['symbol']])
+    statistics = {result['symbol']: result['statistics'] for result in results if result['statistics']['total'] > 0}
+    
+    return {
+        'statistics': statistics,
+        'summary': summarize(statistics),
+        'trades': pd.concat([result['trades'] for result in results], ignore_index=True) if results else pd.DataFrame(),
+        'open_positions': [result['open_position'] for result in results if result['open_position']],
+        'bars': sum(result['bars'] for result in results),
+        'duration_s': time.perf_counter() - started
+    }
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Backtest da estratégia sobre as velas armazenadas')
+    parser.add_argument('--symbols', required=True, help='Símbolos separados por vírgula')
+    parser.add_argument('--timeframe', default='15m', help='Timeframe das velas')
+    parser.add_argument('--since', default=None, help='Início (ISO 8601, UTC; padrão: todo o histórico)')
+    parser.add_argument('--until', default=None, help='Fim (ISO 8601, UTC)')
+    parser.add_argument('--store', default=os.getenv("CANDLE_STORE_DIR") or 'data/candles', help='Diretório do armazenamento')
+    parser.add_argument('--exchange', default=os.getenv("EXCHANGE", "binance"), help='Exchange das velas armazenadas')
+    parser.add_argument('--stop-loss', type=float, default=2.0, help='Stop loss em %%')
+    parser.add_argument('--take-profit', type=float, default=3.0, help='Take profit em %%')
+    parser.add_argument('--workers', type=int, default=None, help='Processos (padrão: número de CPUs)')
+    parser.add_argument('--trades', default=None, help='Arquivo CSV para as operações')
+    args = parser.parse_args()
+    
+    store = CandleStore(args.store, args.exchange)
+    frames = {}
+    for symbol in [symbol.strip() for symbol in args.symbols.split(',') if symbol.strip()]:
+        df = store.read(symbol, args.timeframe)
+        if args.since:
+            df = df[df['timestamp'] >= pd.Timestamp(parse_start(args.since), unit='ms')]
+        if args.until:
+            df = df[df['timestamp'] < pd.Timestamp(parse_start(args.until), unit='ms')]
+        if len(df) == 0:
+            print(f"{symbol}: sem velas {args.timeframe} no armazenamento")
+        frames[symbol] = df.reset_index(drop=True)
+    
+    result = run_backtest(frames, stop_loss_pct=args.stop_loss, take_profit_pct=args.take_profit, timeframe=args.timeframe, workers=args.workers)
+    
+    for symbol, stats in result['statistics'].items():
+        print(f"{symbol}: {stats['total']} operações | 🎯 {stats['win_rate']:.1f}% ({stats['wins']}W/{stats['losses']}L) | PnL {stats['total_pnl']:+.2f}%")
+    summary = result['summary']
+    print(f"Total: {summary['total']} operações | 🎯 {summary['win_rate']:.1f}% ({summary['wins']}W/{summary['losses']}L) | PnL {summary['total_pnl']:+.2f}%")
+    print(f"{result['bars']} velas em {result['duration_s']:.1f}s")
+    if args.trades:
+        result['trades'].to_csv(args.trades, index=False)
@@ -0,0 +1,242 @@
+"""
+Benchmarks do indicador, da estratégia e da serialização da API
+Usa apenas dados sintéticos (sem rede) e grava os resultados em JSON
+
+Uso:
+    python benchmark.py --output bench.json
+    python benchmark.py --output novo.json --baseline bench.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from indicator import GCMIndicator, chart_records
+from trading import PositionManager, AlertMonitor, TradingStrategy
+from telegram_bot import TelegramBot
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+
+
+def synthetic_ohlcv(bars: int, seed: int = 42, timeframe_ms: int = 15 * 60 * 1000) -> pd.DataFrame:
+    """
+    Gera velas OHLCV sintéticas (passeio aleatório) no formato de fetch_ohlcv
+    
+    Args:
+        bars: Número de velas
+        seed: Semente do gerador (mesma semente = mesmas velas)
+        timeframe_ms: Duração de cada vela em milissegundos
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.004, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.004, bars)))
+    volume = rng.uniform(100, 1000, bars)
+    timestamp = 1_700_000_000_000 + np.arange(bars, dtype=np.int64) * timeframe_ms
+    
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(timestamp, unit='ms'),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume
+    })
+
+
+def measure(func: Callable, repeat: int = 5) -> Dict:
+    """
+    Mede o tempo (várias repetições) e o pico de memória (uma execução) de func
+    
+    Returns:
+        Dict com min/mediana/média em segundos e pico de memória em KB
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'peak_memory_kb': peak / 1024
+    }
+
+
+def _replay_signals(indicator: GCMIndicator, df: pd.DataFrame) -> List[Dict]:
+    """Sinal de cada vela do histórico, como get_signal() retornaria vela a vela"""
+    rows = indicator.calculate(df).to_dict(orient='records')
+    return [indicator.signal_from_row(row) for row in rows]
+
+
+def _process_replay(signals: List[Dict], df: pd.DataFrame) -> Callable:
+    """Monta a função que passa todos os sinais pela estratégia, com estado novo"""
+    prices = df['close'].to_numpy()
+    timestamps = df['timestamp'].astype('int64').to_numpy() // 1_000_000
+    
+    def run():
+        strategy = TradingStrategy(PositionManager(), AlertMonitor())
+        for signal, price, candle_timestamp in zip(signals, prices, timestamps):
+            strategy.process_signal('BTC/USDT', signal, float(price), int(candle_timestamp))
+        return strategy
+    
+    return run
+
+
+def _chart_response(df: pd.DataFrame) -> bytes:
+    """Mesmo caminho de /api/chart: registros, jsonable_encoder e JSONResponse"""
+    payload = {'symbol': 'BTC/USDT', 'timeframe': '15m', 'data': chart_records(df)}
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def run_benchmarks(sizes: List[int] = None, repeat: int = 5, seed: int = 42) -> Dict:
+    """
+    Executa todos os benchmarks para cada tamanho de série
+    
+    Args:
+        sizes: Quantidades de velas (padrão 100, 1k, 10k e 100k)
+        repeat: Repetições de cada medição
+        seed: Semente das velas sintéticas
+        
+    Returns:
+        Dict com metadados da execução e a lista de resultados
+    """
+    sizes = sizes or DEFAULT_SIZES
+    indicator = GCMIndicator()
+    telegram_bot = TelegramBot(token='benchmark', chat_id='benchmark')
+    results = []
+    
+    for bars in sizes:
+        df = synthetic_ohlcv(bars, seed)
+        df_with_indicators = indicator.calculate(df)
+        
+        # Alertas reais gerados pela estratégia para formatar
+        signals = _replay_signals(indicator, df)
+        replay = _process_replay(signals, df)
+        alerts = replay().alert_monitor.get_alerts(limit=100) or [{
+            'timestamp': datetime.now().isoformat(),
+            'symbol': 'BTC/USDT',
+            'signal_type': 'INFO',
+            'message': 'Sem sinais',
+            'data': {}
+        }]
+        
+        cases = {
+            'indicator.calculate': lambda: indicator.calculate(df),
+            'indicator.calculate_signal_only': lambda: indicator.calculate(df, signal_only=True),
+            'indicator.get_signal': lambda: indicator.get_signal(df_with_indicators),
+            'strategy.process_signal': replay,
+            'telegram.format_signal_message': lambda: [telegram_bot.format_signal_message(a) for a in alerts],
+            'api.chart_serialization': lambda: _chart_response(df_with_indicators)
+        }
+        
+        for name, func in cases.items():
+            result = {'name': name, 'bars': bars}
+            result.update(measure(func, repeat))
+            if name == 'strategy.process_signal':
+                result['calls'] = len(signals)
+            elif name == 'telegram.format_signal_message':
+                result['calls'] = len(alerts)
+            elif name == 'indicator.calculate':
+                # Tempo de cada nó do grafo de intermediários
+                result['nodes'] = {}
+                indicator.calculate(df, timings=result['nodes'])
+            results.append(result)
+            print(f"{name:<34} {bars:>7} velas  {result['median_s'] * 1000:>10.3f} ms  "
+                  f"{result['peak_memory_kb']:>10.1f} KB")
+    
+    return {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'repeat': repeat,
+        'seed': seed,
+        'results': results
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.25) -> List[Dict]:
+    """
+    Compara duas execuções e retorna os casos mais lentos que o tolerado
+    
+    Args:
+        current: Resultado de run_benchmarks
+        baseline: Resultado anterior (mesmo formato)
+        tolerance: Aumento relativo aceito na mediana (0.25 = 25%)
+    """
+    previous = {(r['name'], r['bars']): r for r in baseline.get('results', [])}
+    regressions = []
+    
+    for result in current['results']:
+        base = previous.get((result['name'], result['bars']))
+        if not base or base['median_s'] <= 0:
+            continue
+        
+        ratio = result['median_s'] / base['median_s']
+        if ratio > 1 + tolerance:
+            regressions.append({
+                'name': result['name'],
+                'bars': result['bars'],
+                'baseline_s': base['median_s'],
+                'current_s': result['median_s'],
+                'ratio': ratio
+            })
+    
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks do sistema de sinais GCM HRT')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Quantidades de velas')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetições de cada medição')
+    parser.add_argument('--seed', type=int, default=42, help='Semente das velas sintéticas')
+    parser.add_argument('--output', default='benchmark.json', help='Arquivo JSON de saída')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Aumento relativo aceito (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+    
+    report = run_benchmarks(args.sizes, args.repeat, args.seed)
+    
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(report, baseline, args.tolerance)
+        for regression in report['regressions']:
+            print(f"⚠️ Regressão: {regression['name']} ({regression['bars']} velas) "
+                  f"{regression['ratio']:.2f}x mais lento")
+        if report['regressions']:
+            exit_code = 1
+    
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em {args.output}")
+    
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Cache dos resultados do indicador
+LRU limitado com expiração (TTL) por entrada, e agrupamento de buscas concorrentes
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+
+def candle_key(kind: str,
+               symbol: str,
+               timeframe: str,
+               limit: int,
+               df: pd.DataFrame,
+               params: Dict) -> tuple:
+    """
+    Monta a chave de cache para um conjunto de velas
+    
+    Além do timestamp da última vela, a chave inclui os valores OHLCV dela:
+    a última vela ainda está em formação e muda de preço sem mudar de
+    timestamp, então só reaproveitamos o resultado quando os dados são
+    exatamente os mesmos.
+    
+    Args:
+        kind: Tipo do resultado ('signal' ou 'frame')
+        symbol: Símbolo do ativo
+        timeframe: Timeframe das velas
+        limit: Quantidade de velas solicitada
+        df: DataFrame OHLCV usado no cálculo
+        params: Parâmetros do indicador
+    """
+    columns = [c for c in ('timestamp', 'open', 'high', 'low', 'close', 'volume') if c in df.columns]
+    last_candle = tuple(df[columns].iloc[-1]) if len(df) else ()
+    return (kind, symbol, timeframe, limit, len(df), last_candle, tuple(sorted(params.items())))
+
+
+class IndicatorCache:
+    """Cache LRU com TTL para frames e sinais calculados"""
+    
+    def __init__(self, max_size: int = 1024):
+        """
+        Inicializa o cache
+        
+        Args:
+            max_size: Número máximo de entradas (as menos usadas são descartadas)
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()  # {chave: (expira_em, valor)}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor em cache (ou default) e atualiza os contadores"""
+        entry = self._entries.get(key)
+        
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        
+        if entry is None:
+            self.misses += 1
+            return default
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key: Hashable, value: Any, ttl: float):
+        """
+        Armazena um valor
+        
+        Args:
+            key: Chave (ver candle_key)
+            value: Valor a armazenar
+            ttl: Tempo de vida em segundos (normalmente a duração do timeframe)
+        """
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self):
+        """Remove todas as entradas e zera os contadores"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get_stats(self) -> Dict:
+        """Retorna os contadores do cache"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) * 100 if lookups > 0 else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave em uma única execução
+    
+    Enquanto uma chamada para a chave está em andamento, as seguintes
+    aguardam o mesmo resultado em vez de repetir a busca. O resultado não é
+    guardado depois que a chamada termina. Cada chamada é contada pelo
+    rótulo de quem a fez, para medir quantas buscas foram economizadas.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+    
+    async def run(self, key: Hashable, func: Callable[..., Awaitable], *args, label: str = 'default', **kwargs) -> Any:
+        """
+        Executa func(*args, **kwargs) ou aguarda a execução em andamento para a mesma chave
+        
+        Args:
+            key: Chave que identifica chamadas equivalentes
+            func: Corrotina a executar
+            label: Origem da chamada nas estatísticas
+        """
+        counters = self.counters.setdefault(label, {'requests': 0, 'executed': 0, 'coalesced': 0})
+        counters['requests'] += 1
+        
+        call = self._calls.get(key)
+        if call is None:
+            counters['executed'] += 1
+            call = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            counters['coalesced'] += 1
+        
+        # Cancelar quem aguarda não cancela a execução compartilhada
+        return await asyncio.shield(call)
+    
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+    
+    def get_stats(self) -> Dict:
+        """Retorna chamadas feitas, executadas e agrupadas por origem"""
+        requests = sum(counters['requests'] for counters in self.counters.values())
+        coalesced = sum(counters['coalesced'] for counters in self.counters.values())
+        return {
+            'in_flight': len(self._calls),
+            'requests': requests,
+            'executed': requests - coalesced,
+            'coalesced': coalesced,
+            'saved_pct': (coalesced / requests) * 100 if requests > 0 else 0.0,
+            'by_origin': {label: dict(counters) for label, counters in self.counters.items()}
+        }
@@ -0,0 +1,242 @@
+"""
+Armazenamento local de velas OHLCV
+Um arquivo binário por coluna, com acréscimo no final e leitura por memmap
+"""
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64)
+]
+ITEM_SIZE = 8  # todas as colunas têm 8 bytes por vela
+
+
+class CandleStore:
+    """
+    Velas por (exchange, símbolo, timeframe) em disco
+    
+    Cada série é um diretório com um arquivo por coluna (timestamp int64 e
+    OHLCV float64, sem cabeçalho). Novas velas são acrescentadas no final
+    dos arquivos e a leitura usa np.memmap, então ler as últimas N velas não
+    carrega o histórico inteiro. A última vela guardada pode estar em
+    formação e é sobrescrita quando chega de novo com o mesmo timestamp.
+    """
+    
+    def __init__(self, root: str, exchange_id: str):
+        """
+        Args:
+            root: Diretório raiz do armazenamento
+            exchange_id: Identificador da exchange (ex: binance)
+        """
+        self.root = root
+        self.exchange_id = exchange_id
+    
+    def _directory(self, symbol: str, timeframe: str) -> str:
+        safe_symbol = symbol.replace('/', '-').replace(':', '_')
+        return os.path.join(self.root, self.exchange_id, safe_symbol, timeframe)
+    
+    def _file(self, directory: str, column: str) -> str:
+        return os.path.join(directory, f'{column}.bin')
+    
+    def length(self, symbol: str, timeframe: str) -> int:
+        """
+        Número de velas guardadas
+        
+        Se uma gravação foi interrompida e as colunas ficaram com tamanhos
+        diferentes, os arquivos são truncados para o menor tamanho.
+        """
+        directory = self._directory(symbol, timeframe)
+        sizes = []
+        for column, _ in COLUMNS:
+            path = self._file(directory, column)
+            sizes.append(os.path.getsize(path) // ITEM_SIZE if os.path.exists(path) else 0)
+        
+        length = min(sizes)
+        if any(size != length for size in sizes):
+            for column, _ in COLUMNS:
+                path = self._file(directory, column)
+                if os.path.exists(path):
+                    os.truncate(path, length * ITEM_SIZE)
+        return length
+    
+    def timeframes(self, symbol: str) -> List[str]:
+        """Timeframes com velas guardadas para o símbolo"""
+        directory = os.path.dirname(self._directory(symbol, 'x'))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            timeframe for timeframe in os.listdir(directory)
+            if self.length(symbol, timeframe) > 0
+        )
+    
+    def first_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Timestamp (ms) da primeira vela guardada, ou None se não houver velas"""
+        if self.length(symbol, timeframe) == 0:
+            return None
+        
+        with open(self._file(self._directory(symbol, timeframe), 'timestamp'), 'rb') as f:
+            return int(np.frombuffer(f.read(ITEM_SIZE), dtype=np.int64)[0])
+    
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Timestamp (ms) da última vela guardada, ou None se não houver velas"""
+        length = self.length(symbol, timeframe)
+        if length == 0:
+            return None
+        
+        with open(self._file(self._directory(symbol, timeframe), 'timestamp'), 'rb') as f:
+            f.seek((length - 1) * ITEM_SIZE)
+            return int(np.frombuffer(f.read(ITEM_SIZE), dtype=np.int64)[0])
+    
+    def read(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Lê as últimas velas no mesmo formato de fetch_ohlcv
+        
+        Args:
+            symbol: Símbolo do ativo
+            timeframe: Timeframe das velas
+            limit: Número máximo de velas (None = todas)
+        """
+        directory = self._directory(symbol, timeframe)
+        length = self.length(symbol, timeframe)
+        start = max(length - limit, 0) if limit is not None else 0
+        
+        data = {}
+        for column, dtype in COLUMNS:
+            if length == 0:
+                data[column] = np.empty(0, dtype=dtype)
+                continue
+            values = np.memmap(self._file(directory, column), dtype=dtype, mode='r', shape=(length,))
+            data[column] = np.array(values[start:])
+        
+        df = pd.DataFrame(data)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+    
+    def write(self, symbol: str, timeframe: str, candles: Iterable[List]) -> int:
+        """
+        Grava velas no formato ccxt [timestamp, open, high, low, close, volume]
+        
+        Velas com timestamp igual ao da última guardada a substituem; as mais
+        novas são acrescentadas e as mais antigas são ignoradas.
+        
+        Returns:
+            Número de velas acrescentadas
+        """
+        rows = self._rows(candles)
+        if len(rows) == 0:
+            return 0
+        
+        directory = self._directory(symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+        length = self.length(symbol, timeframe)
+        last = self.last_timestamp(symbol, timeframe)
+        
+        if last is not None:
+            revised = [row for row in rows if row[0] == last]
+            if revised:
+                self._overwrite(directory, length - 1, revised[0])
+            rows = [row for row in rows if row[0] > last]
+        
+        self._append(directory, rows)
+        return len(rows)
+    
+    def prepend(self, symbol: str, timeframe: str, candles: Iterable[List]) -> int:
+        """
+        Grava velas anteriores à primeira guardada, antes dela
+        
+        Velas com timestamp igual ou posterior ao da primeira guardada são
+        ignoradas. As colunas são regravadas em arquivos temporários e
+        trocadas no final.
+        
+        Returns:
+            Número de velas acrescentadas
+        """
+        first = self.first_timestamp(symbol, timeframe)
+        if first is None:
+            return self.write(symbol, timeframe, candles)
+        
+        rows = [row for row in self._rows(candles) if row[0] < first]
+        if not rows:
+            return 0
+        
+        directory = self._directory(symbol, timeframe)
+        length = self.length(symbol, timeframe)
+        staging = os.path.join(directory, '.prepend')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        self._append(staging, rows)
+        for column, dtype in COLUMNS:
+            existing = np.memmap(self._file(directory, column), dtype=dtype, mode='r', shape=(length,))
+            with open(self._file(staging, column), 'ab') as f:
+                np.asarray(existing).tofile(f)
+            del existing
+        
+        # O timestamp é trocado por último, como em _append
+        for column, _ in COLUMNS[1:] + COLUMNS[:1]:
+            os.replace(self._file(staging, column), self._file(directory, column))
+        os.rmdir(staging)
+        return len(rows)
+    
+    def replace(self, symbol: str, timeframe: str, candles: Iterable[List]) -> int:
+        """Substitui a série inteira pelas velas informadas"""
+        directory = self._directory(symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+        for column, _ in COLUMNS:
+            open(self._file(directory, column), 'wb').close()
+        
+        rows = self._rows(candles)
+        self._append(directory, rows)
+        return len(rows)
+    
+    def delete(self, symbol: str, timeframe: str):
+        """Remove a série"""
+        shutil.rmtree(self._directory(symbol, timeframe), ignore_errors=True)
+    
+    def _rows(self, candles: Iterable[List]) -> List[List]:
+        """Ordena por timestamp e remove duplicadas (fica a última ocorrência)"""
+        unique = {int(candle[0]): [float(value) for value in candle[1:6]] for candle in candles}
+        return [[timestamp] + unique[timestamp] for timestamp in sorted(unique)]
+    
+    def _append(self, directory: str, rows: List[List]):
+        if not rows:
+            return
+        
+        values = np.asarray([row[1:6] for row in rows], dtype=np.float64)
+        # O timestamp é gravado por último: se a gravação for interrompida,
+        # length() descarta a vela incompleta
+        for index, (column, dtype) in enumerate(COLUMNS[1:]):
+            with open(self._file(directory, column), 'ab') as f:
+                values[:, index].astype(dtype).tofile(f)
+        with open(self._file(directory, 'timestamp'), 'ab') as f:
+            np.asarray([row[0] for row in rows], dtype=np.int64).tofile(f)
+    
+    def _overwrite(self, directory: str, position: int, row: List):
+        for index, (column, dtype) in enumerate(COLUMNS):
+            with open(self._file(directory, column), 'r+b') as f:
+                f.seek(position * ITEM_SIZE)
+                f.write(np.asarray([row[index]], dtype=dtype).tobytes())
+    
+    def get_stats(self) -> Dict:
+        """Retorna o número de séries e o espaço usado em disco"""
+        series = 0
+        size = 0
+        for directory, _, files in os.walk(os.path.join(self.root, self.exchange_id)):
+            if 'timestamp.bin' in files:
+                series += 1
+            size += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        
+        return {
+            'root': self.root,
+            'exchange': self.exchange_id,
+            'series': series,
+            'size_kb': size / 1024
+        }
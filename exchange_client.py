@@ -0,0 +1,205 @@
+"""
+Cliente assíncrono da exchange
+ccxt.async_support sobre uma sessão aiohttp compartilhada (conexões keep-alive)
+"""
+import os
+from typing import Dict, List, Optional
+
+import aiohttp
+import ccxt.async_support as ccxt_async
+
+from rate_limiter import RequestScheduler, PRIORITY_API
+
+# Cabeçalhos em que a exchange informa o peso já usado no intervalo
+USED_WEIGHT_HEADERS = ('x-mbx-used-weight-1m',)
+
+# Máximo de velas que a exchange devolve por busca; intervalos maiores são paginados
+OHLCV_PAGE_LIMIT = 1000
+
+# Peso de uma busca de velas por faixa de `limit` (Binance klines): (limit abaixo de, peso)
+OHLCV_WEIGHT_TIERS = ((100, 1), (500, 2), (OHLCV_PAGE_LIMIT + 1, 5))
+OHLCV_MAX_WEIGHT = 10
+OHLCV_DEFAULT_LIMIT = 500  # velas devolvidas quando a busca não informa `limit`
+
+
+class ExchangeClient:
+    """
+    Cliente assíncrono com pool de conexões e limite de requisições
+    
+    Todas as requisições usam a mesma sessão aiohttp, então as conexões
+    TCP/TLS com a exchange são reaproveitadas entre símbolos e ciclos. Cada
+    requisição passa pelo RequestScheduler, que respeita o limite de peso da
+    exchange, a prioridade de quem pediu (monitoramento antes do dashboard)
+    e o número de requisições simultâneas; o throttle próprio do ccxt fica
+    desativado.
+    
+    O backend é a exchange real via ccxt ou, com EXCHANGE_BACKEND=replay,
+    velas gravadas servidas por fake_exchange.ReplayExchange num relógio
+    virtual (ver clock() e speed).
+    
+    Configuração por variáveis de ambiente:
+        EXCHANGE_BACKEND: ccxt (padrão) ou replay
+        EXCHANGE: id da exchange no ccxt (padrão binance)
+        EXCHANGE_MAX_CONNECTIONS: tamanho do pool de conexões (padrão 50)
+        EXCHANGE_CONCURRENCY: requisições simultâneas (padrão 20)
+        EXCHANGE_OHLCV_WEIGHT: peso fixo de uma busca de velas (padrão: pelas
+            faixas de `limit` em OHLCV_WEIGHT_TIERS)
+        EXCHANGE_RATE_LIMIT_BACKOFF: pausa em segundos após erro de limite (padrão 10)
+    """
+    
+    def __init__(self,
+                 exchange_id: Optional[str] = None,
+                 max_connections: Optional[int] = None,
+                 concurrency: Optional[int] = None,
+                 config: Optional[Dict] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 backend: Optional[str] = None):
+        """
+        Inicializa o cliente (a sessão só é aberta em start() ou no primeiro uso)
+        
+        Args:
+            exchange_id: Id da exchange no ccxt
+            max_connections: Máximo de conexões abertas no pool
+            concurrency: Máximo de requisições simultâneas
+            config: Configuração extra repassada ao ccxt (ex: API keys)
+            scheduler: Agendador das requisições (padrão: criado a partir do ambiente)
+            backend: 'ccxt' ou 'replay' (padrão EXCHANGE_BACKEND)
+        """
+        self.backend = backend or os.getenv("EXCHANGE_BACKEND", "ccxt")
+        self.exchange_id = exchange_id or os.getenv("EXCHANGE", "binance")
+        self.max_connections = max_connections or int(os.getenv("EXCHANGE_MAX_CONNECTIONS", "50"))
+        self.concurrency = concurrency or int(os.getenv("EXCHANGE_CONCURRENCY", "20"))
+        self.config = {'enableRateLimit': False, **(config or {})}
+        self.fixed_ohlcv_weight = float(os.getenv("EXCHANGE_OHLCV_WEIGHT") or 0) or None
+        self.rate_limit_backoff = float(os.getenv("EXCHANGE_RATE_LIMIT_BACKOFF", "10"))
+        
+        if self.backend == 'replay':
+            from fake_exchange import ReplayExchange
+            self.exchange = ReplayExchange.from_env()
+        elif self.backend == 'ccxt':
+            self.exchange = getattr(ccxt_async, self.exchange_id)(self.config)
+        else:
+            raise ValueError(f"EXCHANGE_BACKEND inválido: {self.backend} (use ccxt ou replay)")
+        self.scheduler = scheduler or RequestScheduler(concurrency=self.concurrency)
+        self.session: Optional[aiohttp.ClientSession] = None
+        
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    @property
+    def id(self) -> str:
+        return self.exchange.id
+    
+    @property
+    def speed(self) -> float:
+        """Velocidade do relógio da exchange em relação ao real (1 fora do replay)"""
+        return getattr(self.exchange, 'speed', 1.0)
+    
+    def milliseconds(self) -> int:
+        """Horário atual em milissegundos (mesmo relógio do ccxt ou do replay)"""
+        return self.exchange.milliseconds()
+    
+    def clock(self) -> float:
+        """Horário atual em segundos (epoch) no relógio da exchange"""
+        return self.exchange.milliseconds() / 1000
+    
+    async def start(self):
+        """Abre a sessão aiohttp compartilhada (chamado no startup da API)"""
+        if self.session is not None and not self.session.closed:
+            return
+        
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+            enable_cleanup_closed=True
+        )
+        self.session = aiohttp.ClientSession(connector=connector, trust_env=True)
+        
+        # O ccxt usa a sessão informada e não a fecha sozinho
+        self.exchange.session = self.session
+        self.exchange.own_session = False
+    
+    async def close(self):
+        """Fecha o cliente e a sessão (chamado no shutdown da API)"""
+        await self.exchange.close()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def fetch_ohlcv(self,
+                          symbol: str,
+                          timeframe: str = '15m',
+                          since: Optional[int] = None,
+                          limit: Optional[int] = None,
+                          priority: int = PRIORITY_API) -> List[List]:
+        """
+        Busca velas no formato ccxt [timestamp, open, high, low, close, volume]
+        
+        Raises:
+            QueueFullError: Se a fila do agendador estiver cheia
+        """
+        if self.session is None:
+            await self.start()
+        
+        async with self.scheduler.request(self.ohlcv_weight(limit), priority):
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                ohlcv = await self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+                self._sync_used_weight()
+                return ohlcv
+            except (ccxt_async.RateLimitExceeded, ccxt_async.DDoSProtection):
+                self.errors += 1
+                self.scheduler.throttle(self.rate_limit_backoff)
+                raise
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+    
+    def ohlcv_weight(self, limit: Optional[int]) -> float:
+        """Peso de uma busca de velas com `limit` velas (páginas maiores custam mais)"""
+        if self.fixed_ohlcv_weight is not None:
+            return self.fixed_ohlcv_weight
+        
+        limit = OHLCV_DEFAULT_LIMIT if limit is None else limit
+        for below, weight in OHLCV_WEIGHT_TIERS:
+            if limit < below:
+                return weight
+        return OHLCV_MAX_WEIGHT
+    
+    def _sync_used_weight(self):
+        """Atualiza o agendador com o peso usado informado pela exchange, se houver"""
+        headers = getattr(self.exchange, 'last_response_headers', None)
+        if not headers:
+            return
+        
+        for name, value in headers.items():
+            if name.lower() in USED_WEIGHT_HEADERS:
+                try:
+                    self.scheduler.sync_used_weight(float(value))
+                except ValueError:
+                    pass
+                return
+    
+    def get_stats(self) -> Dict:
+        """Retorna a configuração e os contadores do cliente"""
+        stats = {
+            'backend': self.backend,
+            'exchange': self.exchange.id,
+            'max_connections': self.max_connections,
+            'concurrency': self.concurrency,
+            'requests': self.requests,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'scheduler': self.scheduler.get_stats()
+        }
+        if self.backend == 'replay':
+            stats['replay'] = self.exchange.get_stats()
+        return stats
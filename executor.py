@@ -0,0 +1,135 @@
+"""
+Execução do indicador fora do event loop
+Pool de threads ou processos para o cálculo e medição do atraso do event loop
+"""
+import asyncio
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional
+
+
+class IndicatorExecutor:
+    """
+    Executa os cálculos do indicador (CPU) em um pool, sem bloquear o event loop
+    
+    Configuração por variáveis de ambiente:
+        INDICATOR_EXECUTOR: 'thread' (padrão) ou 'process'
+        INDICATOR_WORKERS: tamanho do pool (padrão: número de CPUs, até 4)
+    
+    No modo 'process' a função e os argumentos são enviados por pickle, então
+    devem ser funções de módulo ou métodos de objetos simples (como
+    GCMIndicator) e DataFrames; o cache continua no processo principal.
+    """
+    
+    def __init__(self, kind: Optional[str] = None, workers: Optional[int] = None):
+        """
+        Inicializa o executor (o pool só é criado no primeiro uso)
+        
+        Args:
+            kind: 'thread' ou 'process' (padrão: INDICATOR_EXECUTOR)
+            workers: Tamanho do pool (padrão: INDICATOR_WORKERS)
+        """
+        self.kind = (kind or os.getenv("INDICATOR_EXECUTOR", "thread")).lower()
+        if self.kind not in ('thread', 'process'):
+            raise ValueError(f"INDICATOR_EXECUTOR inválido: {self.kind} (use 'thread' ou 'process')")
+        
+        self.workers = workers or int(os.getenv("INDICATOR_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+        self._pool: Optional[Executor] = None
+        self.tasks = 0
+        self.busy_time = 0.0
+    
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == 'process':
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='indicator')
+        return self._pool
+    
+    async def run(self, func: Callable, *args, **kwargs):
+        """Executa func(*args, **kwargs) no pool e aguarda o resultado"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self.pool, partial(func, *args, **kwargs))
+        finally:
+            self.tasks += 1
+            self.busy_time += time.perf_counter() - start
+    
+    def shutdown(self):
+        """Encerra o pool (um novo é criado se o executor for usado de novo)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+    
+    def get_stats(self) -> Dict:
+        """Retorna a configuração e os contadores do executor"""
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'tasks': self.tasks,
+            'avg_task_ms': (self.busy_time / self.tasks) * 1000 if self.tasks > 0 else 0.0
+        }
+
+
+class EventLoopLagMonitor:
+    """
+    Mede o atraso do event loop
+    
+    Uma tarefa dorme `interval` segundos repetidamente; a diferença entre o
+    tempo real e o esperado é o tempo em que o loop ficou ocupado sem poder
+    atender outras corrotinas (requisições HTTP, por exemplo).
+    """
+    
+    def __init__(self, interval: float = 0.02, max_samples: int = 5000):
+        """
+        Args:
+            interval: Intervalo entre amostras em segundos
+            max_samples: Quantidade máxima de amostras guardadas
+        """
+        self.interval = interval
+        self.samples: deque = deque(maxlen=max_samples)
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Inicia a amostragem no event loop atual (sem efeito se já estiver rodando)"""
+        if not self.is_running:
+            self._task = asyncio.get_running_loop().create_task(self._sample())
+    
+    def stop(self):
+        """Para a amostragem"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    def reset(self):
+        """Descarta as amostras (ex: no início de cada ciclo de monitoramento)"""
+        self.samples.clear()
+    
+    async def _sample(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(time.perf_counter() - start - self.interval, 0.0))
+    
+    def get_stats(self) -> Dict:
+        """Retorna o atraso médio, p95 e máximo (em ms) das amostras atuais"""
+        samples = sorted(self.samples)
+        if not samples:
+            return {'samples': 0, 'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        
+        return {
+            'samples': len(samples),
+            'mean_ms': statistics.fmean(samples) * 1000,
+            'p95_ms': samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000,
+            'max_ms': samples[-1] * 1000
+        }
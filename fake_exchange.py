@@ -0,0 +1,512 @@
+"""
+Exchange local para testes sem rede
+Servidor WebSocket que reproduz velas gravadas no formato de streams de kline da Binance,
+e backend de replay para o ExchangeClient (EXCHANGE_BACKEND=replay)
+
+Uso:
+    python fake_exchange.py gravacao.json --timeframe 1m --port 8765
+    KLINE_STREAM_URL=ws://127.0.0.1:8765 STREAM_MODE=1 uvicorn main:app
+    EXCHANGE_BACKEND=replay REPLAY_SOURCE=data/candles REPLAY_SPEED=60 uvicorn main:app
+
+O arquivo de gravação é um JSON {símbolo: [[timestamp, open, high, low, close, volume], ...]}.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import ccxt
+import numpy as np
+from aiohttp import WSCloseCode, web
+
+from candle_store import CandleStore
+from kline_stream import market_id
+from resampler import timeframe_ms
+
+
+def load_recording(path: str) -> Dict[str, List[List]]:
+    """Lê uma gravação de velas em JSON"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def kline_message(symbol: str, timeframe: str, candle: List, closed: bool, period_ms: int) -> Dict:
+    """Monta uma mensagem de stream combinado da Binance para a vela"""
+    stream_symbol = market_id(symbol)
+    return {
+        'stream': f"{stream_symbol.lower()}@kline_{timeframe}",
+        'data': {
+            'e': 'kline',
+            'E': int(candle[0]) + period_ms - 1,
+            's': stream_symbol,
+            'k': {
+                't': int(candle[0]),
+                'T': int(candle[0]) + period_ms - 1,
+                's': stream_symbol,
+                'i': timeframe,
+                'o': str(candle[1]),
+                'h': str(candle[2]),
+                'l': str(candle[3]),
+                'c': str(candle[4]),
+                'v': str(candle[5]),
+                'x': closed
+            }
+        }
+    }
+
+
+def partial_candle(candle: List, fraction: float) -> List:
+    """
+    Estado de uma vela gravada quando só `fraction` da sua duração passou
+    
+    O fechamento vai da abertura até o fechamento final; máxima, mínima e
+    volume crescem junto, terminando nos valores da vela gravada.
+    """
+    timestamp, open_, high, low, close, volume = candle[:6]
+    price = open_ + (close - open_) * fraction
+    return [
+        timestamp,
+        open_,
+        max(open_, price, open_ + (high - open_) * fraction),
+        min(open_, price, open_ + (low - open_) * fraction),
+        price,
+        volume * fraction
+    ]
+
+
+def forming_updates(candle: List, updates: int) -> List[List]:
+    """Estados intermediários de uma vela em formação, antes da vela fechada"""
+    return [partial_candle(candle, step / (updates + 1)) for step in range(1, updates + 1)]
+
+
+class FakeKlineServer:
+    """
+    Servidor WebSocket que reproduz velas gravadas
+    
+    Cada conexão recebe, para cada vela e cada stream assinado, algumas
+    atualizações da vela em formação seguidas da vela fechada. Streams
+    (`<símbolo>@kline_<timeframe>`) de timeframes maiores que o gravado, e
+    múltiplos dele, são agregados a partir das velas gravadas: a cada vela
+    gravada chega o estado da vela agregada, fechada na última vela do
+    período. Outros timeframes são recusados (a conexão é fechada com
+    código 1008). Quando a gravação termina a conexão é fechada (o cliente
+    vê o stream cair); drop_connections() derruba as conexões a qualquer
+    momento.
+    """
+    
+    def __init__(self,
+                 recording: Dict[str, List[List]],
+                 timeframe: str = '1m',
+                 interval: float = 0.05,
+                 updates_per_candle: int = 2,
+                 host: str = '127.0.0.1',
+                 port: int = 0):
+        """
+        Args:
+            recording: {símbolo: velas no formato ccxt}
+            timeframe: Timeframe das velas gravadas
+            interval: Segundos entre velas reproduzidas
+            updates_per_candle: Atualizações da vela em formação antes da fechada
+            host: Endereço de escuta
+            port: Porta (0 = escolhe uma livre)
+        """
+        self.recording = recording
+        self.timeframe = timeframe
+        self.interval = interval
+        self.updates_per_candle = updates_per_candle
+        self.host = host
+        self.port = port
+        self.period_ms = timeframe_ms(timeframe)
+        self._by_id = {market_id(symbol): symbol for symbol in recording}
+        self._runner: Optional[web.AppRunner] = None
+        self._connections: set = set()
+        self.messages_sent = 0
+    
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+    
+    async def start(self):
+        """Inicia o servidor"""
+        app = web.Application()
+        app.router.add_get('/stream', self._handle)
+        app.router.add_get('/ws', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        """Encerra o servidor e as conexões"""
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def drop_connections(self):
+        """Fecha todas as conexões abertas (simula queda do stream)"""
+        for ws in list(self._connections):
+            await ws.close()
+    
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._connections.add(ws)
+        
+        try:
+            subscriptions = self._subscriptions(request.query.get('streams', '').split('/'))
+        except ValueError as e:
+            self._connections.discard(ws)
+            await ws.close(code=WSCloseCode.POLICY_VIOLATION, message=str(e).encode())
+            return ws
+        
+        # Vela agregada em formação por (símbolo, timeframe)
+        aggregated: Dict[Tuple[str, str], List] = {}
+        try:
+            length = max((len(self.recording[symbol]) for symbol, _ in subscriptions), default=0)
+            for index in range(length):
+                for symbol, timeframe in subscriptions:
+                    candles = self.recording[symbol]
+                    if index >= len(candles):
+                        continue
+                    candle = candles[index]
+                    if timeframe == self.timeframe:
+                        for state in forming_updates(candle, self.updates_per_candle):
+                            await self._send(ws, kline_message(symbol, timeframe, state, False, self.period_ms))
+                        await self._send(ws, kline_message(symbol, timeframe, candle, True, self.period_ms))
+                        continue
+                    
+                    period = timeframe_ms(timeframe)
+                    bucket = int(candle[0]) - int(candle[0]) % period
+                    current = aggregated.get((symbol, timeframe))
+                    if current is None or current[0] != bucket:
+                        current = [bucket] + list(candle[1:6])
+                    else:
+                        current = [bucket, current[1], max(current[2], candle[2]), min(current[3], candle[3]), candle[4], current[5] + candle[5]]
+                    aggregated[(symbol, timeframe)] = current
+                    closed = int(candle[0]) + self.period_ms >= bucket + period
+                    await self._send(ws, kline_message(symbol, timeframe, current, closed, period))
+                await asyncio.sleep(self.interval)
+        except ConnectionResetError:
+            pass
+        finally:
+            self._connections.discard(ws)
+            await ws.close()
+        
+        return ws
+    
+    def _subscriptions(self, streams: List[str]) -> List[Tuple[str, str]]:
+        """
+        (símbolo, timeframe) dos streams pedidos que têm velas gravadas
+        
+        Raises:
+            ValueError: Se um timeframe não pode ser servido a partir do gravado
+        """
+        subscriptions = []
+        for stream in streams:
+            market, _, kind = stream.partition('@')
+            if not stream or market.upper() not in self._by_id:
+                continue
+            timeframe = kind[len('kline_'):] if kind.startswith('kline_') else self.timeframe
+            if timeframe != self.timeframe and not self._derivable(timeframe):
+                raise ValueError(f"Timeframe {timeframe} não pode ser derivado de {self.timeframe}")
+            subscriptions.append((self._by_id[market.upper()], timeframe))
+        return subscriptions
+    
+    def _derivable(self, timeframe: str) -> bool:
+        """Se o timeframe é um múltiplo maior do gravado (semanas e meses não se alinham ao epoch)"""
+        if timeframe[-1:] in ('w', 'M') or self.timeframe[-1] in ('w', 'M'):
+            return False
+        try:
+            period = timeframe_ms(timeframe)
+        except Exception:
+            return False
+        return period > self.period_ms and period % self.period_ms == 0
+    
+    async def _send(self, ws: web.WebSocketResponse, message: Dict):
+        if ws.closed:
+            raise ConnectionResetError
+        await ws.send_str(json.dumps(message))
+        self.messages_sent += 1
+
+
+class ReplayExchange:
+    """
+    Backend de exchange que serve velas gravadas em um relógio virtual
+    
+    Implementa a parte da interface do ccxt usada pelo ExchangeClient
+    (fetch_ohlcv, milliseconds, close). O relógio começa em `start` e anda
+    `speed` vezes mais rápido que o real; só velas abertas até o horário
+    virtual são retornadas, e a última aparece em formação, proporcional ao
+    tempo já passado dela. Timeframes não gravados são agregados a partir do
+    maior timeframe gravado que os divide. Latência e erros (de rede e de
+    limite) podem ser injetados para testes de carga.
+    
+    Configuração por variáveis de ambiente (ver from_env):
+        REPLAY_SOURCE: diretório do CandleStore ou arquivo JSON de gravação (padrão data/candles)
+        REPLAY_EXCHANGE: exchange das velas no CandleStore (padrão binance)
+        REPLAY_TIMEFRAME: timeframe do arquivo JSON (padrão 1m)
+        REPLAY_START: início do replay (ISO 8601, UTC); padrão: REPLAY_WARMUP velas após a primeira gravada
+        REPLAY_WARMUP: velas gravadas antes do início, para o histórico (padrão 1000)
+        REPLAY_SPEED: velocidade do relógio (padrão 1, até 1000)
+        REPLAY_LATENCY_MS / REPLAY_LATENCY_JITTER_MS: latência por requisição (padrão 0)
+        REPLAY_ERROR_RATE: fração de requisições com erro de rede (padrão 0)
+        REPLAY_RATE_LIMIT_RATE: fração de requisições com erro de limite (padrão 0)
+        REPLAY_SEED: semente dos sorteios de latência e erros
+    """
+    
+    id = 'replay'
+    MAX_SPEED = 1000
+    
+    def __init__(self,
+                 source: str,
+                 exchange_id: str = 'binance',
+                 timeframe: str = '1m',
+                 start: Optional[int] = None,
+                 warmup: int = 1000,
+                 speed: float = 1.0,
+                 latency_ms: float = 0.0,
+                 latency_jitter_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            source: Diretório do CandleStore ou arquivo JSON {símbolo: velas}
+            exchange_id: Exchange das velas no CandleStore
+            timeframe: Timeframe das velas do arquivo JSON
+            start: Início do relógio virtual em ms (None = após `warmup` velas)
+            warmup: Velas gravadas antes do início quando `start` não é informado
+            speed: Velocidade do relógio virtual (até 1000)
+            latency_ms: Latência média por requisição
+            latency_jitter_ms: Variação máxima (±) da latência
+            error_rate: Fração de requisições que falham com erro de rede
+            rate_limit_rate: Fração de requisições que falham com erro de limite
+            seed: Semente dos sorteios
+        """
+        if not 0 < speed <= self.MAX_SPEED:
+            raise ValueError(f"Velocidade do replay deve estar entre 0 e {self.MAX_SPEED}")
+        
+        self.source = source
+        self.speed = speed
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        
+        # Séries gravadas: {(símbolo, timeframe): (timestamps, valores OHLCV)}
+        self._series: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._recorded: Dict[str, List[str]] = {}
+        self._store: Optional[CandleStore] = None
+        if os.path.isdir(source):
+            self._store = CandleStore(source, exchange_id)
+        else:
+            for symbol, candles in load_recording(source).items():
+                self._set_series(symbol, timeframe, candles)
+        
+        self.start = start if start is not None else self._default_start(warmup)
+        self._started_at = time.monotonic()
+        
+        # Atributos lidos ou definidos pelo ExchangeClient
+        self.session = None
+        self.own_session = True
+        self.last_response_headers: Dict = {}
+        
+        self.requests = 0
+        self.injected_errors = 0
+    
+    @classmethod
+    def from_env(cls) -> 'ReplayExchange':
+        """Cria o backend a partir das variáveis REPLAY_*"""
+        start = os.getenv("REPLAY_START")
+        seed = os.getenv("REPLAY_SEED")
+        return cls(
+            source=os.getenv("REPLAY_SOURCE", "data/candles"),
+            exchange_id=os.getenv("REPLAY_EXCHANGE", "binance"),
+            timeframe=os.getenv("REPLAY_TIMEFRAME", "1m"),
+            start=parse_start(start) if start else None,
+            warmup=int(os.getenv("REPLAY_WARMUP", "1000")),
+            speed=float(os.getenv("REPLAY_SPEED", "1")),
+            latency_ms=float(os.getenv("REPLAY_LATENCY_MS", "0")),
+            latency_jitter_ms=float(os.getenv("REPLAY_LATENCY_JITTER_MS", "0")),
+            error_rate=float(os.getenv("REPLAY_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv("REPLAY_RATE_LIMIT_RATE", "0")),
+            seed=int(seed) if seed else None
+        )
+    
+    def _set_series(self, symbol: str, timeframe: str, candles: List[List]):
+        candles = sorted(candles, key=lambda candle: candle[0])
+        timestamps = np.array([candle[0] for candle in candles], dtype=np.int64)
+        values = np.array([candle[1:6] for candle in candles], dtype=np.float64).reshape(-1, 5)
+        self._series[(symbol, timeframe)] = (timestamps, values)
+        self._recorded.setdefault(symbol, []).append(timeframe)
+    
+    def _recorded_timeframes(self, symbol: str) -> List[str]:
+        if self._store is not None and symbol not in self._recorded:
+            self._recorded[symbol] = self._store.timeframes(symbol)
+        return self._recorded.get(symbol, [])
+    
+    def _load(self, symbol: str, timeframe: str) -> Tuple[np.ndarray, np.ndarray]:
+        series = self._series.get((symbol, timeframe))
+        if series is None:
+            df = self._store.read(symbol, timeframe)
+            timestamps = df['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+            values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=np.float64)
+            series = self._series[(symbol, timeframe)] = (timestamps, values)
+        return series
+    
+    def _default_start(self, warmup: int) -> int:
+        """Horário da vela `warmup` da série gravada de menor timeframe (ou o horário atual)"""
+        if self._store is not None:
+            directory = os.path.join(self._store.root, self._store.exchange_id)
+            names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+            for name in names:
+                # O CandleStore troca '/' por '-' e ':' por '_' no nome do diretório
+                symbol = name.replace('-', '/').replace('_', ':')
+                for timeframe in self._recorded_timeframes(symbol):
+                    self._load(symbol, timeframe)
+        
+        series = [(timeframe_ms(tf), timestamps) for (_, tf), (timestamps, _) in self._series.items() if len(timestamps)]
+        if not series:
+            return int(time.time() * 1000)
+        
+        _, timestamps = min(series, key=lambda item: (item[0], item[1][0]))
+        return int(timestamps[min(warmup, len(timestamps) - 1)])
+    
+    def milliseconds(self) -> int:
+        """Horário atual do relógio virtual em ms"""
+        return int(self.start + (time.monotonic() - self._started_at) * self.speed * 1000)
+    
+    def _source_timeframe(self, symbol: str, timeframe: str) -> str:
+        """Timeframe gravado usado para servir `timeframe` (o próprio ou o maior que o divide)"""
+        recorded = self._recorded_timeframes(symbol)
+        if not recorded:
+            raise ccxt.BadSymbol(f"{symbol} não tem velas gravadas em {self.source}")
+        if timeframe in recorded:
+            return timeframe
+        
+        period = timeframe_ms(timeframe)
+        if timeframe[-1] not in ('w', 'M'):
+            divisors = [tf for tf in recorded if tf[-1] not in ('w', 'M') and period % timeframe_ms(tf) == 0]
+            if divisors:
+                return max(divisors, key=timeframe_ms)
+        raise ccxt.BadRequest(f"{symbol}: timeframe {timeframe} não pode ser derivado de {recorded}")
+    
+    def fetch_ohlcv_sync(self,
+                         symbol: str,
+                         timeframe: str = '1m',
+                         since: Optional[int] = None,
+                         limit: Optional[int] = None) -> List[List]:
+        """Velas até o horário virtual atual, no formato ccxt (sem latência nem erros)"""
+        limit = min(limit or 500, 1000)
+        source = self._source_timeframe(symbol, timeframe)
+        timestamps, values = self._load(symbol, source)
+        base = timeframe_ms(source)
+        period = timeframe_ms(timeframe)
+        
+        now = self.milliseconds()
+        if since is None:
+            first = now - now % period - (limit - 1) * period
+        else:
+            first = -(-since // period) * period
+        lo = int(np.searchsorted(timestamps, first, 'left'))
+        hi = int(np.searchsorted(timestamps, now, 'right'))
+        if hi <= lo:
+            return []
+        
+        rows = np.column_stack([timestamps[lo:hi].astype(np.float64), values[lo:hi]])
+        elapsed = now - int(timestamps[hi - 1])
+        if elapsed < base:
+            rows[-1] = partial_candle(rows[-1].tolist(), elapsed / base)
+        
+        if period != base:
+            buckets = timestamps[lo:hi] - timestamps[lo:hi] % period
+            _, starts = np.unique(buckets, return_index=True)
+            ends = np.append(starts[1:], len(rows)) - 1
+            rows = np.column_stack([
+                buckets[starts].astype(np.float64),
+                rows[starts, 1],
+                np.maximum.reduceat(rows[:, 2], starts),
+                np.minimum.reduceat(rows[:, 3], starts),
+                rows[ends, 4],
+                np.add.reduceat(rows[:, 5], starts)
+            ])
+        
+        return [[int(row[0])] + row[1:].tolist() for row in rows[:limit]]
+    
+    async def fetch_ohlcv(self,
+                          symbol: str,
+                          timeframe: str = '1m',
+                          since: Optional[int] = None,
+                          limit: Optional[int] = None,
+                          params: Optional[Dict] = None) -> List[List]:
+        """Mesma interface do ccxt, com a latência e os erros configurados"""
+        self.requests += 1
+        latency = self.latency_ms + self._random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+        
+        draw = self._random.random()
+        if draw < self.error_rate:
+            self.injected_errors += 1
+            raise ccxt.NetworkError("replay: erro de rede simulado")
+        if draw < self.error_rate + self.rate_limit_rate:
+            self.injected_errors += 1
+            raise ccxt.RateLimitExceeded("replay: limite de requisições simulado")
+        
+        return self.fetch_ohlcv_sync(symbol, timeframe, since, limit)
+    
+    async def close(self):
+        pass
+    
+    def get_stats(self) -> Dict:
+        """Retorna o relógio virtual e os contadores do replay"""
+        return {
+            'source': self.source,
+            'speed': self.speed,
+            'clock': datetime.fromtimestamp(self.milliseconds() / 1000, tz=timezone.utc).isoformat(),
+            'requests': self.requests,
+            'injected_errors': self.injected_errors
+        }
+
+
+def parse_start(value: str) -> int:
+    """Converte um horário ISO 8601 (UTC se sem fuso) em ms"""
+    start = datetime.fromisoformat(value)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return int(start.timestamp() * 1000)
+
+
+async def _serve(args):
+    server = FakeKlineServer(
+        load_recording(args.recording),
+        timeframe=args.timeframe,
+        interval=args.interval,
+        updates_per_candle=args.updates,
+        host=args.host,
+        port=args.port
+    )
+    await server.start()
+    print(f"Exchange local em {server.url} ({len(server.recording)} símbolos)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='WebSocket local que reproduz velas gravadas')
+    parser.add_argument('recording', help='JSON {símbolo: [[timestamp, open, high, low, close, volume], ...]}')
+    parser.add_argument('--timeframe', default='1m', help='Timeframe das velas gravadas')
+    parser.add_argument('--interval', type=float, default=1.0, help='Segundos entre velas')
+    parser.add_argument('--updates', type=int, default=2, help='Atualizações da vela em formação')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    asyncio.run(_serve(parser.parse_args()))
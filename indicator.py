@@ -2,8 +2,317 @@
 GCM Heikin Ashi RSI Trend Cloud (GCM HRTC) Indicator
 Adaptado do código Pine Script para Python
 """
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
 import pandas as pd
 import numpy as np
+from pandas.api.indexers import BaseIndexer
+
+
+def _shift(values: np.ndarray, fill) -> np.ndarray:
+    """Desloca uma posição para frente no eixo das velas (equivalente a Series.shift(1))"""
+    shifted = np.empty_like(values)
+    shifted[..., 0:1] = fill
+    shifted[..., 1:] = values[..., :-1]
+    return shifted
+
+
+class _PanelWindowIndexer(BaseIndexer):
+    """
+    Janelas móveis sobre um painel achatado (símbolos concatenados)
+    
+    Cada janela é cortada no início da linha do seu símbolo, então o kernel do
+    pandas reinicia o acumulador a cada símbolo e o resultado é idêntico ao
+    rolling() de cada série isolada, com uma única chamada para o painel todo.
+    """
+    
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        row_start = (end - 1) // self.bars * self.bars
+        start = np.maximum(end - self.window_size, row_start)
+        return start, end
+
+
+def _rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """Média móvel simples no eixo das velas (vetor 1-D ou painel símbolos × velas)"""
+    if values.ndim == 1:
+        return pd.Series(values).rolling(window=period).mean().to_numpy()
+    
+    indexer = _PanelWindowIndexer(window_size=period, bars=values.shape[1])
+    flat = pd.Series(values.ravel()).rolling(indexer, min_periods=period).mean()
+    return flat.to_numpy().reshape(values.shape)
+
+
+def _rsi_from_averages(gain: np.ndarray, loss: np.ndarray) -> np.ndarray:
+    """RSI a partir das médias de ganhos e perdas"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+
+def _rsi(values: np.ndarray, period: int) -> np.ndarray:
+    """RSI com médias móveis simples de ganhos e perdas (mesmas operações do pandas)"""
+    delta = np.diff(values, prepend=np.nan)
+    gain = _rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = _rolling_mean(-np.where(delta < 0, delta, 0.0), period)
+    return _rsi_from_averages(gain, loss)
+
+
+def _valid_runs(values: np.ndarray):
+    """Retorna pares (início, fim) dos trechos contíguos sem NaN"""
+    valid = ~np.isnan(values)
+    edges = np.diff(np.concatenate(([0], valid.view(np.int8), [0])))
+    return zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Filtro linear y[i] = (1 - alpha) * y[i-1] + alpha * x[i], com y[0] = x[0]
+    
+    Usa a implementação em Cython do pandas (ewm com adjust=False), sem loop
+    Python por linha. Para alpha = 0.5 o resultado é idêntico bit a bit à
+    fórmula (y[i-1] + x[i]) / 2.
+    """
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _smooth_half(zrsi: np.ndarray) -> np.ndarray:
+    """
+    Suavização s[i] = (s[i-1] + z[i]) / 2
+    
+    Um NaN na entrada gera NaN na saída e a série recomeça em z[i] no
+    próximo valor válido, como no cálculo original elemento a elemento.
+    """
+    smoothed = np.full(len(zrsi), np.nan)
+    for start, end in _valid_runs(zrsi):
+        smoothed[start:end] = _ewm(zrsi[start:end], 0.5)
+    return smoothed
+
+
+def _heikin_ashi_open(seed: np.ndarray, ha_close: np.ndarray, smoothing: int) -> np.ndarray:
+    """
+    Abertura suavizada do Heikin Ashi RSI
+    
+    Equivale ao loop original:
+        ha_open[i] = seed[i]                                       se i < smoothing ou ha_open[i-smoothing] é NaN
+        ha_open[i] = (ha_open[i-1] * smoothing + ha_close[i-1]) / (smoothing + 1)   caso contrário
+    
+    O vetor é processado em trechos (semente / recorrência); o número de
+    iterações depende apenas da quantidade de NaNs, não do tamanho da série.
+    """
+    n = len(seed)
+    if smoothing <= 0:
+        return seed.copy()
+    
+    ha_open = np.full(n, np.nan)
+    alpha = 1.0 / (smoothing + 1)
+    i = 0
+    while i < n:
+        # Trecho de semente: continua enquanto ha_open[i-smoothing] for NaN
+        lo = max(i - smoothing, 0)
+        known = ~np.isnan(ha_open[lo:i])
+        ahead = ~np.isnan(seed[i:max(n - smoothing, i)])
+        valid = np.flatnonzero(np.concatenate((known, ahead)))
+        end = n if len(valid) == 0 else min(lo + valid[0] + smoothing, n)
+        ha_open[i:end] = seed[i:end]
+        i = end
+        if i >= n:
+            break
+        
+        # Trecho de recorrência a partir de ha_open[i-1]
+        chain = np.concatenate((ha_open[i - 1:i], ha_close[i - 1:n - 1]))
+        nans = np.flatnonzero(np.isnan(chain))
+        if len(nans):
+            chain = chain[:nans[0]]
+        broken = i + len(chain) - 1  # primeira posição NaN da recorrência
+        gaps = np.flatnonzero(np.isnan(ha_open[i - smoothing:min(i, n - smoothing)]))
+        end = min(broken + smoothing, n)
+        if len(gaps):
+            end = min(end, i + gaps[0])
+        filled = min(end, broken)
+        if filled > i:
+            ha_open[i:filled] = _ewm(chain, alpha)[1:filled - i + 1]
+        i = end
+    
+    return ha_open
+
+
+def _smooth_half_panel(zrsi: np.ndarray) -> np.ndarray:
+    """Versão de _smooth_half para painel símbolos × velas (vetorizada entre símbolos)"""
+    smoothed = np.empty_like(zrsi)
+    prev = np.full(zrsi.shape[0], np.nan)
+    for i in range(zrsi.shape[1]):
+        z = zrsi[:, i]
+        prev = np.where(np.isnan(prev), z, (prev + z) / 2)
+        smoothed[:, i] = prev
+    return smoothed
+
+
+def _heikin_ashi_open_panel(seed: np.ndarray, ha_close: np.ndarray, smoothing: int) -> np.ndarray:
+    """Versão de _heikin_ashi_open para painel símbolos × velas (vetorizada entre símbolos)"""
+    ha_open = np.empty_like(seed)
+    for i in range(seed.shape[1]):
+        if smoothing <= 0 or i < smoothing:
+            ha_open[:, i] = seed[:, i]
+        else:
+            recurrence = (ha_open[:, i - 1] * smoothing + ha_close[:, i - 1]) / (smoothing + 1)
+            ha_open[:, i] = np.where(np.isnan(ha_open[:, i - smoothing]), seed[:, i], recurrence)
+    return ha_open
+
+
+def _heikin_ashi(close: np.ndarray,
+                 high_raw: np.ndarray,
+                 low_raw: np.ndarray,
+                 smoothing: int,
+                 with_range: bool = True) -> dict:
+    """
+    Velas Heikin Ashi sobre os RSIs centrados em zero de close, high e low
+    
+    Aceita vetores 1-D ou painéis símbolos × velas. Com with_range=False
+    apenas ha_open e ha_close são calculados (os únicos usados pelos sinais).
+    """
+    # Ajusta high e low (mesma semântica de max/min do Python com NaN)
+    high_rsi = np.where(low_raw > high_raw, low_raw, high_raw)
+    low_rsi = np.where(low_raw < high_raw, low_raw, high_raw)
+    
+    # Calcula Heikin Ashi
+    prev_close = _shift(close, np.nan)
+    prev_close = np.where(np.isnan(prev_close), close, prev_close)
+    ha_close = (close + high_rsi + low_rsi + prev_close) / 4
+    
+    # Calcula abertura suavizada
+    seed = (close + prev_close) / 2
+    if close.ndim == 1:
+        ha_open = _heikin_ashi_open(seed, ha_close, smoothing)
+    else:
+        ha_open = _heikin_ashi_open_panel(seed, ha_close, smoothing)
+    
+    if not with_range:
+        return {'ha_open': ha_open, 'ha_close': ha_close}
+    
+    # Calcula high e low finais
+    ha_high = np.where(ha_open > high_rsi, ha_open, high_rsi)
+    ha_high = np.where(ha_close > ha_high, ha_close, ha_high)
+    ha_low = np.where(ha_open < low_rsi, ha_open, low_rsi)
+    ha_low = np.where(ha_close < ha_low, ha_close, ha_low)
+    
+    return {
+        'ha_open': ha_open,
+        'ha_high': ha_high,
+        'ha_low': ha_low,
+        'ha_close': ha_close
+    }
+
+
+class _IndicatorGraph:
+    """
+    Grafo de intermediários de uma chamada do indicador
+    
+    Cada nó (diferenças, ganhos/perdas, médias móveis, RSIs, Heikin Ashi e
+    sinais) é calculado uma única vez e reaproveitado por todos os nós que
+    dependem dele. Os nós são identificados pela fonte e pelo período, então
+    quando len_rsi == len_harsi o RSI de close é compartilhado entre o RSI
+    suavizado e o Heikin Ashi. O tempo de cada nó (sem contar as
+    dependências) fica em `timings`.
+    
+    Aceita vetores 1-D ou painéis símbolos × velas.
+    """
+    
+    def __init__(self,
+                 indicator: 'GCMIndicator',
+                 columns: Dict[str, np.ndarray],
+                 first_valid: Optional[np.ndarray] = None):
+        """
+        Args:
+            indicator: Indicador com os parâmetros
+            columns: {fonte: array} com close, high e low
+            first_valid: Primeira vela válida de cada símbolo (painéis preenchidos com NaN à esquerda)
+        """
+        self.indicator = indicator
+        self.columns = columns
+        self.first_valid = first_valid
+        self.values: Dict[str, object] = {}
+        self.timings: Dict[str, float] = {}
+        self._nested = [0.0]
+    
+    def _node(self, name: str, compute):
+        """Calcula o nó na primeira vez e retorna o valor guardado nas seguintes"""
+        if name in self.values:
+            return self.values[name]
+        
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+        self.timings[name] = elapsed - self._nested.pop()
+        self._nested[-1] += elapsed
+        
+        self.values[name] = value
+        return value
+    
+    def delta(self, source: str) -> np.ndarray:
+        return self._node(f'delta[{source}]', lambda: np.diff(self.columns[source], prepend=np.nan))
+    
+    def gain(self, source: str) -> np.ndarray:
+        def compute():
+            delta = self.delta(source)
+            return np.where(delta > 0, delta, 0.0)
+        return self._node(f'gain[{source}]', compute)
+    
+    def loss(self, source: str) -> np.ndarray:
+        def compute():
+            delta = self.delta(source)
+            return -np.where(delta < 0, delta, 0.0)
+        return self._node(f'loss[{source}]', compute)
+    
+    def avg_gain(self, source: str, period: int) -> np.ndarray:
+        return self._node(f'avg_gain[{source},{period}]', lambda: _rolling_mean(self.gain(source), period))
+    
+    def avg_loss(self, source: str, period: int) -> np.ndarray:
+        return self._node(f'avg_loss[{source},{period}]', lambda: _rolling_mean(self.loss(source), period))
+    
+    def zrsi(self, source: str, period: int) -> np.ndarray:
+        """RSI centrado em zero (RSI - 50)"""
+        def compute():
+            rsi = _rsi_from_averages(self.avg_gain(source, period), self.avg_loss(source, period))
+            if self.first_valid is not None:
+                bar_index = np.arange(rsi.shape[-1])[None, :]
+                rsi[bar_index < self.first_valid + period - 1] = np.nan
+            return rsi - 50
+        return self._node(f'zrsi[{source},{period}]', compute)
+    
+    def smoothed_rsi(self) -> np.ndarray:
+        def compute():
+            zrsi = self.zrsi('close', self.indicator.len_rsi)
+            return _smooth_half(zrsi) if zrsi.ndim == 1 else _smooth_half_panel(zrsi)
+        return self._node('smoothed_rsi', compute)
+    
+    def heikin_ashi(self, with_range: bool = True) -> dict:
+        def compute():
+            period = self.indicator.len_harsi
+            return _heikin_ashi(
+                self.zrsi('close', period),
+                self.zrsi('high', period),
+                self.zrsi('low', period),
+                self.indicator.smoothing,
+                with_range=with_range
+            )
+        return self._node('heikin_ashi' if with_range else 'heikin_ashi_open_close', compute)
+    
+    def signal_flags(self, tail: Optional[int] = None) -> dict:
+        """Sinais booleanos (apenas das últimas `tail` velas, se informado)"""
+        def compute():
+            window = slice(-tail, None) if tail else slice(None)
+            ha_rsi = self.heikin_ashi(with_range=tail is None)
+            return self.indicator._signal_flags(
+                self.smoothed_rsi()[..., window],
+                ha_rsi['ha_open'][..., window],
+                ha_rsi['ha_close'][..., window]
+            )
+        return self._node('signal_flags', compute)
 
 
 class GCMIndicator:
@@ -37,15 +346,21 @@ class GCMIndicator:
         self.upper_extreme = upper_extreme
         self.lower_extreme = lower_extreme
     
+    def get_params(self) -> dict:
+        """Retorna os parâmetros do indicador"""
+        return {
+            'len_harsi': self.len_harsi,
+            'smoothing': self.smoothing,
+            'len_rsi': self.len_rsi,
+            'upper': self.upper,
+            'lower': self.lower,
+            'upper_extreme': self.upper_extreme,
+            'lower_extreme': self.lower_extreme
+        }
+    
     def calculate_rsi(self, series: pd.Series, period: int) -> pd.Series:
         """Calcula o RSI (Relative Strength Index)"""
-        delta = series.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        return pd.Series(_rsi(series.to_numpy(dtype=float), period), index=series.index)
     
     def calculate_zrsi(self, series: pd.Series, period: int) -> pd.Series:
         """Calcula o Zero-centered RSI (RSI - 50)"""
@@ -57,14 +372,7 @@ class GCMIndicator:
         zrsi = self.calculate_zrsi(df[source_col], self.len_rsi)
         
         # Suavização
-        smoothed = pd.Series(index=df.index, dtype=float)
-        for i in range(len(df)):
-            if i == 0 or pd.isna(smoothed.iloc[i-1]):
-                smoothed.iloc[i] = zrsi.iloc[i]
-            else:
-                smoothed.iloc[i] = (smoothed.iloc[i-1] + zrsi.iloc[i]) / 2
-        
-        return smoothed
+        return pd.Series(_smooth_half(zrsi.to_numpy(dtype=float)), index=df.index)
     
     def calculate_heikin_ashi_rsi(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -78,79 +386,129 @@ class GCMIndicator:
         high_rsi_raw = self.calculate_zrsi(df['high'], self.len_harsi)
         low_rsi_raw = self.calculate_zrsi(df['low'], self.len_harsi)
         
-        # Ajusta high e low
-        high_rsi = pd.Series([max(h, l) for h, l in zip(high_rsi_raw, low_rsi_raw)], index=df.index)
-        low_rsi = pd.Series([min(h, l) for h, l in zip(high_rsi_raw, low_rsi_raw)], index=df.index)
-        
-        # Calcula Heikin Ashi
-        ha_close = (close_rsi + high_rsi + low_rsi + close_rsi.shift(1).fillna(close_rsi)) / 4
-        
-        # Calcula abertura suavizada
-        ha_open = pd.Series(index=df.index, dtype=float)
-        for i in range(len(df)):
-            if i < self.smoothing or pd.isna(ha_open.iloc[i-self.smoothing]):
-                ha_open.iloc[i] = (close_rsi.iloc[i] + close_rsi.shift(1).fillna(close_rsi).iloc[i]) / 2
-            else:
-                ha_open.iloc[i] = (ha_open.iloc[i-1] * self.smoothing + ha_close.iloc[i-1]) / (self.smoothing + 1)
+        ha_rsi = _heikin_ashi(
+            close_rsi.to_numpy(dtype=float),
+            high_rsi_raw.to_numpy(dtype=float),
+            low_rsi_raw.to_numpy(dtype=float),
+            self.smoothing
+        )
         
-        # Calcula high e low finais
-        ha_high = pd.Series([max(h, o, c) for h, o, c in zip(high_rsi, ha_open, ha_close)], index=df.index)
-        ha_low = pd.Series([min(l, o, c) for l, o, c in zip(low_rsi, ha_open, ha_close)], index=df.index)
-        
-        return pd.DataFrame({
-            'ha_open': ha_open,
-            'ha_high': ha_high,
-            'ha_low': ha_low,
-            'ha_close': ha_close
-        })
+        return pd.DataFrame(ha_rsi, index=df.index)
     
-    def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _graph(self, df: pd.DataFrame) -> _IndicatorGraph:
+        """Grafo de intermediários para as velas de df"""
+        columns = {source: df[source].to_numpy(dtype=float) for source in ('close', 'high', 'low')}
+        return _IndicatorGraph(self, columns)
+    
+    def calculate(self, df: pd.DataFrame, signal_only: bool = False, timings: Optional[dict] = None):
         """
         Calcula todos os indicadores
         
         Args:
             df: DataFrame com colunas OHLCV (open, high, low, close, volume)
-            
+            signal_only: Se True, calcula apenas o necessário para o sinal da
+                última vela e retorna o dict de get_signal() diretamente
+            timings: Dict opcional que recebe o tempo (em segundos) gasto em
+                cada nó do cálculo, sem contar as dependências
+                
         Returns:
-            DataFrame com todos os indicadores calculados
+            DataFrame com todos os indicadores calculados (ou o dict do sinal
+            quando signal_only=True)
         """
-        result = df.copy()
+        if signal_only:
+            return self._calculate_last_signal(df, timings)
+        
+        graph = self._graph(df)
+        
+        # RSI suavizado, Heikin Ashi RSI e sinais (intermediários compartilhados)
+        rsi = graph.smoothed_rsi()
+        ha_rsi = graph.heikin_ashi()
+        flags = graph.signal_flags()
+        
+        columns = {'rsi': rsi}
+        columns.update(ha_rsi)
+        columns.update(flags)
+        
+        result = graph._node('frame', lambda: pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1))
+        
+        if timings is not None:
+            timings.update(graph.timings)
+        
+        return result
+    
+    def _calculate_last_signal(self, df: pd.DataFrame, timings: Optional[dict] = None) -> dict:
+        """
+        Caminho rápido de calculate(): sinal da última vela sem montar o DataFrame
+        
+        As recorrências (RSI suavizado e ha_open) ainda percorrem o histórico,
+        mas só em arrays NumPy; ha_high/ha_low não são calculados e os sinais
+        são avaliados apenas nas três últimas velas, o mínimo para os
+        cruzamentos e reversões da última.
+        """
+        if len(df) == 0:
+            return {'signal': 'NONE', 'strength': 0, 'message': 'Sem dados'}
+        
+        graph = self._graph(df)
+        rsi = graph.smoothed_rsi()
+        ha_rsi = graph.heikin_ashi(with_range=False)
+        flags = graph.signal_flags(tail=3)
+        
+        last_row = {name: values[-1] for name, values in flags.items()}
+        last_row.update({
+            'rsi': rsi[-1],
+            'ha_open': ha_rsi['ha_open'][-1],
+            'ha_close': ha_rsi['ha_close'][-1],
+            'close': graph.columns['close'][-1]
+        })
+        
+        if timings is not None:
+            timings.update(graph.timings)
         
-        # Calcula o RSI suavizado
-        result['rsi'] = self.calculate_smoothed_rsi(df)
+        return self.signal_from_row(last_row)
+    
+    def _signal_flags(self, rsi: np.ndarray, ha_open: np.ndarray, ha_close: np.ndarray) -> dict:
+        """
+        Calcula as colunas booleanas de tendência, cruzamento e reversão
         
-        # Calcula o Heikin Ashi RSI
-        ha_rsi = self.calculate_heikin_ashi_rsi(df)
-        result = pd.concat([result, ha_rsi], axis=1)
+        Returns:
+            dict {nome_da_coluna: array booleano}, na ordem das colunas do resultado
+        """
+        prev_rsi = _shift(rsi, np.nan)
+        flags = {}
         
         # Identifica tendência
-        result['rsi_rising'] = result['rsi'] >= result['rsi'].shift(1)
-        result['ha_bullish'] = result['ha_close'] > result['ha_open']
+        rsi_rising = rsi >= prev_rsi
+        ha_bullish = ha_close > ha_open
+        ha_bearish = ha_close < ha_open
+        flags['rsi_rising'] = rsi_rising
+        flags['ha_bullish'] = ha_bullish
         
         # Sinais de cruzamento
-        result['cross_upper'] = (result['rsi'] > self.upper) & (result['rsi'].shift(1) <= self.upper)
-        result['cross_lower'] = (result['rsi'] < self.lower) & (result['rsi'].shift(1) >= self.lower)
+        flags['cross_upper'] = (rsi > self.upper) & (prev_rsi <= self.upper)
+        flags['cross_lower'] = (rsi < self.lower) & (prev_rsi >= self.lower)
         
         # Sinais de cruzamento extremo
-        result['cross_upper_extreme'] = (result['rsi'] > self.upper_extreme) & (result['rsi'].shift(1) <= self.upper_extreme)
-        result['cross_lower_extreme'] = (result['rsi'] < self.lower_extreme) & (result['rsi'].shift(1) >= self.lower_extreme)
+        flags['cross_upper_extreme'] = (rsi > self.upper_extreme) & (prev_rsi <= self.upper_extreme)
+        flags['cross_lower_extreme'] = (rsi < self.lower_extreme) & (prev_rsi >= self.lower_extreme)
         
         # Sinais de reversão (baseado no HARSI)
-        result['harsi_bull'] = (result['ha_close'] > result['ha_open']) & ~(result['ha_close'].shift(1) > result['ha_open'].shift(1)).fillna(False)
-        result['harsi_bear'] = (result['ha_close'] < result['ha_open']) & ~(result['ha_close'].shift(1) < result['ha_open'].shift(1)).fillna(False)
+        flags['harsi_bull'] = ha_bullish & ~_shift(ha_bullish, False)
+        flags['harsi_bear'] = ha_bearish & ~_shift(ha_bearish, False)
         
         # Sinais de reversão (baseado no RSI)
-        result['rsi_bull'] = result['rsi_rising'].fillna(False) & ~result['rsi_rising'].shift(1).fillna(True)
-        result['rsi_bear'] = ~result['rsi_rising'].fillna(True) & result['rsi_rising'].shift(1).fillna(False)
+        rsi_bull = rsi_rising & ~_shift(rsi_rising, True)
+        rsi_bear = ~rsi_rising & _shift(rsi_rising, False)
+        flags['rsi_bull'] = rsi_bull
+        flags['rsi_bear'] = rsi_bear
         
         # Sinais confirmados nas zonas críticas
         # COMPRA: RSI em sobrevenda (-20) + reversão bullish (bolinha verde)
-        result['confirmed_buy'] = (result['rsi'] <= self.lower) & result['rsi_bull']
+        flags['confirmed_buy'] = (rsi <= self.lower) & rsi_bull
         
         # VENDA: RSI em sobrecompra (+20) + reversão bearish (bolinha vermelha)
-        result['confirmed_sell'] = (result['rsi'] >= self.upper) & result['rsi_bear']
+        flags['confirmed_sell'] = (rsi >= self.upper) & rsi_bear
         
-        return result
+        return flags
     
     def get_signal(self, df: pd.DataFrame) -> dict:
         """
@@ -162,52 +520,26 @@ class GCMIndicator:
         if len(df) == 0:
             return {'signal': 'NONE', 'strength': 0, 'message': 'Sem dados'}
         
-        last_row = df.iloc[-1]
+        return self.signal_from_row(df.iloc[-1])
+    
+    def signal_from_row(self, last_row) -> dict:
+        """
+        Monta o dict de sinal a partir de uma única linha calculada
         
+        Args:
+            last_row: Linha (Series ou dict) com as colunas geradas por calculate()
+        """
         signal_type = 'NONE'
         strength = 0
         message = ''
         rsi_value = float(last_row['rsi'])
         
-        # PRIORIDADE 1: Sinais confirmados nas zonas críticas (+20/-20)
-        if last_row['confirmed_buy']:
-            signal_type = 'BUY'
-            strength = 3
-            message = f'🟢 COMPRA: RSI em {rsi_value:.1f} (sobrevenda) + reversão bullish (bolinha verde)'
-        elif last_row['confirmed_sell']:
-            signal_type = 'SELL'
-            strength = 3
-            message = f'🔴 VENDA: RSI em {rsi_value:.1f} (sobrecompra) + reversão bearish (bolinha vermelha)'
-        
-        # PRIORIDADE 2: Cruzamentos extremos
-        elif last_row['cross_lower_extreme']:
-            signal_type = 'BUY'
-            strength = 2
-            message = f'RSI cruzou {self.lower_extreme} (sobrevenda extrema)'
-        elif last_row['cross_upper_extreme']:
-            signal_type = 'SELL'
-            strength = 2
-            message = f'RSI cruzou {self.upper_extreme} (sobrecompra extrema)'
-        
-        # PRIORIDADE 3: Alertas de zona (sem reversão ainda)
-        elif last_row['cross_lower']:
-            signal_type = 'BUY'
-            strength = 1
-            message = f'⚠️ Alerta: RSI cruzou {self.lower} (aguardando reversão)'
-        elif last_row['cross_upper']:
-            signal_type = 'SELL'
-            strength = 1
-            message = f'⚠️ Alerta: RSI cruzou {self.upper} (aguardando reversão)'
-        
-        # PRIORIDADE 4: Reversões fora das zonas
-        elif last_row['rsi_bull'] and rsi_value > self.lower:
-            signal_type = 'BUY'
-            strength = 1
-            message = f'Reversão bullish no RSI (fora da zona de sobrevenda)'
-        elif last_row['rsi_bear'] and rsi_value < self.upper:
-            signal_type = 'SELL'
-            strength = 1
-            message = f'Reversão bearish no RSI (fora da zona de sobrecompra)'
+        for condition, rule_signal, rule_strength, template in self._signal_rules():
+            if condition(last_row):
+                signal_type = rule_signal
+                strength = rule_strength
+                message = template.format(rsi=rsi_value)
+                break
         
         return {
             'signal': signal_type,
@@ -219,3 +551,357 @@ class GCMIndicator:
             'ha_bullish': bool(last_row['ha_bullish']),
             'price': float(last_row['close'])
         }
+    
+    def _signal_rules(self) -> list:
+        """
+        Regras de sinal em ordem de prioridade
+        
+        Cada regra é (condição, sinal, força, mensagem). As condições usam
+        apenas operadores elemento a elemento, então servem tanto para uma
+        linha quanto para os arrays do cálculo em lote. A mensagem aceita o
+        placeholder {rsi}.
+        """
+        return [
+            # PRIORIDADE 1: Sinais confirmados nas zonas críticas (+20/-20)
+            (lambda r: r['confirmed_buy'], 'BUY', 3,
+             '🟢 COMPRA: RSI em {rsi:.1f} (sobrevenda) + reversão bullish (bolinha verde)'),
+            (lambda r: r['confirmed_sell'], 'SELL', 3,
+             '🔴 VENDA: RSI em {rsi:.1f} (sobrecompra) + reversão bearish (bolinha vermelha)'),
+            
+            # PRIORIDADE 2: Cruzamentos extremos
+            (lambda r: r['cross_lower_extreme'], 'BUY', 2,
+             f'RSI cruzou {self.lower_extreme} (sobrevenda extrema)'),
+            (lambda r: r['cross_upper_extreme'], 'SELL', 2,
+             f'RSI cruzou {self.upper_extreme} (sobrecompra extrema)'),
+            
+            # PRIORIDADE 3: Alertas de zona (sem reversão ainda)
+            (lambda r: r['cross_lower'], 'BUY', 1,
+             f'⚠️ Alerta: RSI cruzou {self.lower} (aguardando reversão)'),
+            (lambda r: r['cross_upper'], 'SELL', 1,
+             f'⚠️ Alerta: RSI cruzou {self.upper} (aguardando reversão)'),
+            
+            # PRIORIDADE 4: Reversões fora das zonas
+            (lambda r: r['rsi_bull'] & (r['rsi'] > self.lower), 'BUY', 1,
+             'Reversão bullish no RSI (fora da zona de sobrevenda)'),
+            (lambda r: r['rsi_bear'] & (r['rsi'] < self.upper), 'SELL', 1,
+             'Reversão bearish no RSI (fora da zona de sobrecompra)'),
+        ]
+    
+    def calculate_batch(self,
+                        high: np.ndarray,
+                        low: np.ndarray,
+                        close: np.ndarray,
+                        symbols: Optional[List[str]] = None,
+                        timings: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Calcula o indicador para vários símbolos de uma vez
+        
+        Todos os passos (RSIs, suavização, Heikin Ashi e sinais) são
+        vetorizados entre símbolos, sem DataFrame por símbolo. Séries mais
+        curtas devem ser preenchidas com NaN à esquerda; o resultado de cada
+        símbolo é o mesmo de calculate() sobre a série sem preenchimento.
+        
+        Args:
+            high: Painel símbolos × velas com as máximas
+            low: Painel símbolos × velas com as mínimas
+            close: Painel símbolos × velas com os fechamentos
+            symbols: Nomes dos símbolos (índice da tabela de saída)
+            timings: Dict opcional que recebe o tempo de cada nó do cálculo
+            
+        Returns:
+            DataFrame indexado por símbolo com as colunas do dict de get_signal()
+        """
+        high = np.atleast_2d(np.asarray(high, dtype=float))
+        low = np.atleast_2d(np.asarray(low, dtype=float))
+        close = np.atleast_2d(np.asarray(close, dtype=float))
+        if symbols is None:
+            symbols = list(range(close.shape[0]))
+        
+        if close.shape[1] == 0:
+            return pd.DataFrame({
+                'signal': 'NONE', 'strength': 0, 'message': 'Sem dados'
+            }, index=pd.Index(symbols, name='symbol'))
+        
+        # Primeira vela válida de cada símbolo (para séries preenchidas com NaN)
+        first_valid = np.argmax(~np.isnan(close), axis=1)[:, None]
+        
+        graph = _IndicatorGraph(self, {'close': close, 'high': high, 'low': low}, first_valid)
+        rsi = graph.smoothed_rsi()
+        ha_rsi = graph.heikin_ashi(with_range=False)
+        flags = graph.signal_flags(tail=3)
+        
+        if timings is not None:
+            timings.update(graph.timings)
+        
+        # Apenas a última vela de cada símbolo entra na tabela
+        last = {name: values[:, -1] for name, values in flags.items()}
+        last['rsi'] = rsi[:, -1]
+        
+        rules = self._signal_rules()
+        matched = np.select(
+            [condition(last) for condition, _, _, _ in rules],
+            np.arange(len(rules)),
+            default=-1
+        )
+        signal_types = np.array([rule[1] for rule in rules] + ['NONE'])
+        strengths = np.array([rule[2] for rule in rules] + [0])
+        messages = [
+            rules[k][3].format(rsi=rsi_value) if k >= 0 else ''
+            for k, rsi_value in zip(matched, last['rsi'])
+        ]
+        
+        return pd.DataFrame({
+            'signal': signal_types[matched],
+            'strength': strengths[matched],
+            'message': messages,
+            'rsi': last['rsi'],
+            'ha_open': ha_rsi['ha_open'][:, -1],
+            'ha_close': ha_rsi['ha_close'][:, -1],
+            'ha_bullish': last['ha_bullish'],
+            'price': close[:, -1]
+        }, index=pd.Index(symbols, name='symbol'))
+    
+    def calculate_frames(self, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Monta o painel a partir de DataFrames OHLCV por símbolo e chama calculate_batch()
+        
+        Args:
+            frames: {símbolo: DataFrame com colunas high, low, close}
+        """
+        symbols = list(frames)
+        bars = max((len(df) for df in frames.values()), default=0)
+        panel = np.full((3, len(symbols), bars), np.nan)
+        
+        for row, symbol in enumerate(symbols):
+            df = frames[symbol]
+            panel[:, row, bars - len(df):] = df[['high', 'low', 'close']].to_numpy(dtype=float).T
+        
+        return self.calculate_batch(panel[0], panel[1], panel[2], symbols)
+
+
+class _RollingRSI:
+    """RSI incremental: mantém a janela de ganhos e perdas do período"""
+    
+    def __init__(self, period: int):
+        self.period = period
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+        self.last_price = math.nan
+    
+    def copy(self) -> '_RollingRSI':
+        """Cópia independente do estado da janela"""
+        clone = _RollingRSI.__new__(_RollingRSI)
+        clone.period = self.period
+        clone.gains = self.gains.copy()
+        clone.losses = self.losses.copy()
+        clone.last_price = self.last_price
+        return clone
+    
+    def update(self, price: float) -> float:
+        """Adiciona um preço e retorna o RSI atual (NaN durante o aquecimento)"""
+        delta = price - self.last_price
+        self.last_price = price
+        self.gains.append(delta if delta > 0 else 0.0)
+        self.losses.append(-delta if delta < 0 else 0.0)
+        
+        if len(self.gains) < self.period:
+            return math.nan
+        
+        gain = math.fsum(self.gains) / self.period
+        loss = math.fsum(self.losses) / self.period
+        
+        # Mesma semântica IEEE do cálculo vetorizado (x/0 = inf, 0/0 = NaN)
+        if loss == 0:
+            return 100.0 if gain > 0 else math.nan
+        return 100 - (100 / (1 + gain / loss))
+
+
+class StreamingGCMIndicator(GCMIndicator):
+    """
+    Versão incremental do GCM HRT para um único símbolo
+    
+    Mantém as janelas do RSI, o RSI suavizado e a recorrência do ha_open, de
+    modo que cada nova vela custa O(1), independente do tamanho do histórico.
+    A última vela pode ser revisada (vela ainda em formação) enviando outra
+    atualização com o mesmo timestamp.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reset()
+    
+    def reset(self):
+        """Descarta todo o estado acumulado"""
+        self._state = self._initial_state()
+        self._previous_state = None
+        self.last_timestamp = None
+        self.last_row: Optional[dict] = None
+    
+    def _initial_state(self) -> dict:
+        return {
+            'count': 0,
+            'rsi_close': _RollingRSI(self.len_rsi),
+            'harsi_close': _RollingRSI(self.len_harsi),
+            'harsi_high': _RollingRSI(self.len_harsi),
+            'harsi_low': _RollingRSI(self.len_harsi),
+            'rsi': math.nan,
+            'rsi_rising': False,
+            'close_rsi': math.nan,
+            'ha_open_history': deque(maxlen=max(self.smoothing, 1)),
+            'ha_close': math.nan,
+            'ha_bullish': False,
+            'ha_bearish': False,
+        }
+    
+    @staticmethod
+    def _copy_state(state: dict) -> dict:
+        """Cópia do estado sem deepcopy (apenas janelas e deques são mutáveis)"""
+        clone = dict(state)
+        for key, value in state.items():
+            if isinstance(value, (_RollingRSI, deque)):
+                clone[key] = value.copy()
+        return clone
+    
+    @staticmethod
+    def _parse_candle(candle) -> tuple:
+        """Aceita lista no formato do ccxt [ts, o, h, l, c, v] ou dict/Series com as colunas OHLCV"""
+        if isinstance(candle, (list, tuple)):
+            timestamp, open_, high, low, close = candle[:5]
+            volume = candle[5] if len(candle) > 5 else 0.0
+        else:
+            timestamp = candle.get('timestamp')
+            open_, high, low, close = candle['open'], candle['high'], candle['low'], candle['close']
+            volume = candle.get('volume', 0.0)
+        return timestamp, float(open_), float(high), float(low), float(close), float(volume)
+    
+    def load(self, df: pd.DataFrame) -> dict:
+        """
+        Reinicia o estado e processa um histórico completo
+        
+        Returns:
+            Sinal da última vela do histórico
+        """
+        self.reset()
+        signal = {'signal': 'NONE', 'strength': 0, 'message': 'Sem dados'}
+        for candle in df.to_dict(orient='records'):
+            signal = self.update(candle)
+        return signal
+    
+    def update(self, candle) -> dict:
+        """
+        Processa uma vela nova ou revisa a última vela recebida
+        
+        Args:
+            candle: Vela OHLCV (lista do ccxt ou dict com timestamp, open, high, low, close, volume)
+            
+        Returns:
+            dict com informações do sinal, no mesmo formato de get_signal()
+        """
+        timestamp, open_, high, low, close, volume = self._parse_candle(candle)
+        
+        revision = (timestamp is not None and self.last_timestamp is not None
+                    and timestamp == self.last_timestamp)
+        
+        if revision:
+            # Vela em formação: refaz o cálculo a partir do estado anterior
+            self._state = self._copy_state(self._previous_state)
+        elif timestamp is not None and self.last_timestamp is not None and timestamp < self.last_timestamp:
+            raise ValueError(f'Vela fora de ordem: {timestamp} < {self.last_timestamp}')
+        else:
+            self._previous_state = self._copy_state(self._state)
+        
+        self.last_timestamp = timestamp
+        self.last_row = self._step(timestamp, open_, high, low, close, volume)
+        return self.signal_from_row(self.last_row)
+    
+    def _step(self, timestamp, open_: float, high: float, low: float, close: float, volume: float) -> dict:
+        """Avança o estado em uma vela e retorna a linha equivalente à de calculate()"""
+        state = self._state
+        index = state['count']
+        state['count'] += 1
+        
+        # RSI suavizado
+        zrsi = state['rsi_close'].update(close) - 50
+        prev_rsi = state['rsi']
+        rsi = zrsi if math.isnan(prev_rsi) else (prev_rsi + zrsi) / 2
+        
+        # Heikin Ashi RSI
+        close_rsi = state['harsi_close'].update(close) - 50
+        high_raw = state['harsi_high'].update(high) - 50
+        low_raw = state['harsi_low'].update(low) - 50
+        high_rsi = max(high_raw, low_raw)
+        low_rsi = min(high_raw, low_raw)
+        
+        prev_close = state['close_rsi']
+        if math.isnan(prev_close):
+            prev_close = close_rsi
+        ha_close = (close_rsi + high_rsi + low_rsi + prev_close) / 4
+        
+        history = state['ha_open_history']
+        if self.smoothing <= 0 or index < self.smoothing or math.isnan(history[0]):
+            ha_open = (close_rsi + prev_close) / 2
+        else:
+            ha_open = (history[-1] * self.smoothing + state['ha_close']) / (self.smoothing + 1)
+        history.append(ha_open)
+        
+        ha_high = max(high_rsi, ha_open, ha_close)
+        ha_low = min(low_rsi, ha_open, ha_close)
+        
+        # Tendência e sinais
+        rsi_rising = rsi >= prev_rsi
+        ha_bullish = ha_close > ha_open
+        ha_bearish = ha_close < ha_open
+        rsi_bull = rsi_rising and not state['rsi_rising']
+        rsi_bear = not rsi_rising and state['rsi_rising']
+        
+        row = {
+            'timestamp': timestamp,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume,
+            'rsi': rsi,
+            'ha_open': ha_open,
+            'ha_high': ha_high,
+            'ha_low': ha_low,
+            'ha_close': ha_close,
+            'rsi_rising': rsi_rising,
+            'ha_bullish': ha_bullish,
+            'cross_upper': rsi > self.upper and prev_rsi <= self.upper,
+            'cross_lower': rsi < self.lower and prev_rsi >= self.lower,
+            'cross_upper_extreme': rsi > self.upper_extreme and prev_rsi <= self.upper_extreme,
+            'cross_lower_extreme': rsi < self.lower_extreme and prev_rsi >= self.lower_extreme,
+            'harsi_bull': ha_bullish and not state['ha_bullish'],
+            'harsi_bear': ha_bearish and not state['ha_bearish'],
+            'rsi_bull': rsi_bull,
+            'rsi_bear': rsi_bear,
+            'confirmed_buy': rsi <= self.lower and rsi_bull,
+            'confirmed_sell': rsi >= self.upper and rsi_bear,
+        }
+        
+        state['rsi'] = rsi
+        state['rsi_rising'] = rsi_rising
+        state['close_rsi'] = close_rsi
+        state['ha_close'] = ha_close
+        state['ha_bullish'] = ha_bullish
+        state['ha_bearish'] = ha_bearish
+        
+        return row
+
+
+def chart_records(df: pd.DataFrame) -> List[Dict]:
+    """
+    Converte o resultado de calculate() em registros serializáveis em JSON
+    
+    Valores ausentes (início das médias) viram None e o timestamp é
+    convertido para string ISO, como espera o endpoint /api/chart.
+    """
+    records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    
+    # Converte timestamp para string
+    for item in records:
+        if item.get('timestamp') is not None:
+            item['timestamp'] = item['timestamp'].isoformat()
+    
+    return records
@@ -0,0 +1,223 @@
+"""
+Recebimento de velas por WebSocket (streams de kline no formato da Binance)
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+import aiohttp
+
+DEFAULT_STREAM_URL = "wss://stream.binance.com:9443"
+
+# Máximo de streams assinados por conexão na Binance
+MAX_STREAMS_PER_CONNECTION = 1024
+
+# on_candle(símbolo, timeframe, [timestamp, open, high, low, close, volume], fechada)
+CandleHandler = Callable[[str, str, List, bool], Awaitable[None]]
+
+
+def market_id(symbol: str) -> str:
+    """Converte o símbolo unificado (BTC/USDT) no id do mercado (BTCUSDT)"""
+    return symbol.replace('/', '').upper()
+
+
+def parse_kline(message: Dict) -> Optional[Dict]:
+    """
+    Extrai a vela de uma mensagem de kline (stream combinado ou simples)
+    
+    Returns:
+        Dict com market_id, timeframe, candle (formato ccxt) e closed, ou None
+    """
+    data = message.get('data', message)
+    if data.get('e') != 'kline':
+        return None
+    
+    kline = data['k']
+    return {
+        'market_id': kline['s'],
+        'timeframe': kline['i'],
+        'candle': [
+            int(kline['t']),
+            float(kline['o']),
+            float(kline['h']),
+            float(kline['l']),
+            float(kline['c']),
+            float(kline['v'])
+        ],
+        'closed': bool(kline['x'])
+    }
+
+
+class KlineStream:
+    """
+    Assina os streams de kline dos símbolos (em um ou mais timeframes) e entrega cada atualização de vela
+    
+    Os streams (um por símbolo e timeframe) são divididos em conexões de
+    até `max_streams` cada. Cada conexão é refeita automaticamente com
+    espera crescente quando cai. O stream é considerado saudável enquanto
+    todas as conexões estão abertas e recebendo mensagens; quando não está,
+    o monitoramento volta a buscar por REST.
+    """
+    
+    def __init__(self,
+                 symbols: List[str],
+                 timeframes: Union[str, List[str]],
+                 on_candle: CandleHandler,
+                 url: Optional[str] = None,
+                 stale_timeout: float = 30.0,
+                 reconnect_delay: float = 1.0,
+                 max_reconnect_delay: float = 30.0,
+                 max_streams: Optional[int] = None):
+        """
+        Args:
+            symbols: Símbolos no formato unificado (ex: BTC/USDT)
+            timeframes: Timeframe das velas, ou lista de timeframes
+            on_candle: Corrotina chamada a cada atualização de vela
+            url: Endereço base do WebSocket (padrão KLINE_STREAM_URL ou Binance)
+            stale_timeout: Segundos sem mensagens para considerar o stream parado
+            reconnect_delay: Espera inicial entre tentativas de reconexão
+            max_reconnect_delay: Espera máxima entre tentativas
+            max_streams: Streams por conexão (padrão KLINE_STREAM_MAX_STREAMS ou 1024)
+        """
+        self.symbols = list(symbols)
+        self.timeframes = [timeframes] if isinstance(timeframes, str) else list(timeframes)
+        self.on_candle = on_candle
+        self.url = (url or os.getenv("KLINE_STREAM_URL", DEFAULT_STREAM_URL)).rstrip('/')
+        self.stale_timeout = stale_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_streams = max_streams or int(os.getenv("KLINE_STREAM_MAX_STREAMS", str(MAX_STREAMS_PER_CONNECTION)))
+        
+        self._symbols_by_id = {market_id(symbol): symbol for symbol in self.symbols}
+        self._task: Optional[asyncio.Task] = None
+        self._open: List[bool] = []
+        self._last_message: List[Optional[float]] = []
+        self.messages = 0
+        self.closed_candles = 0
+        self.connections = 0
+        self.errors = 0
+    
+    @property
+    def stream_urls(self) -> List[str]:
+        """Endereço de cada conexão, com até `max_streams` streams"""
+        streams = [
+            f"{market_id(symbol).lower()}@kline_{timeframe}"
+            for symbol in self.symbols
+            for timeframe in self.timeframes
+        ]
+        return [
+            f"{self.url}/stream?streams={'/'.join(streams[start:start + self.max_streams])}"
+            for start in range(0, len(streams), self.max_streams)
+        ]
+    
+    @property
+    def connected(self) -> bool:
+        """True se todas as conexões estão abertas"""
+        return bool(self._open) and all(self._open)
+    
+    @property
+    def last_message_at(self) -> Optional[float]:
+        """Horário (monotônico) da mensagem mais recente da conexão mais parada"""
+        if not self._last_message or None in self._last_message:
+            return None
+        return min(self._last_message)
+    
+    @property
+    def healthy(self) -> bool:
+        """True se todas as conexões estão abertas e com mensagem recente"""
+        if not self.connected or self.last_message_at is None:
+            return False
+        return time.monotonic() - self.last_message_at < self.stale_timeout
+    
+    def start(self):
+        """Inicia o stream em uma tarefa do event loop atual"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+    
+    async def stop(self):
+        """Encerra o stream"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._open = [False] * len(self._open)
+    
+    async def run(self):
+        """Mantém as conexões abertas, reconectando cada uma quando ela cai"""
+        urls = self.stream_urls
+        self._open = [False] * len(urls)
+        self._last_message = [None] * len(urls)
+        
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*[self._run_connection(session, index, url) for index, url in enumerate(urls)])
+    
+    async def _run_connection(self, session: aiohttp.ClientSession, index: int, url: str):
+        delay = self.reconnect_delay
+        
+        while True:
+            try:
+                async with session.ws_connect(url, heartbeat=self.stale_timeout) as ws:
+                    self._open[index] = True
+                    self.connections += 1
+                    self._last_message[index] = time.monotonic()
+                    delay = self.reconnect_delay
+                    
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            if msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                                break
+                            continue
+                        self._last_message[index] = time.monotonic()
+                        await self._handle(msg.data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro no stream de velas: {str(e)}")
+            finally:
+                self._open[index] = False
+            
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+    
+    async def _handle(self, raw: str):
+        kline = parse_kline(json.loads(raw))
+        if kline is None or kline['market_id'] not in self._symbols_by_id:
+            return
+        
+        self.messages += 1
+        if kline['closed']:
+            self.closed_candles += 1
+        
+        try:
+            await self.on_candle(
+                self._symbols_by_id[kline['market_id']],
+                kline['timeframe'],
+                kline['candle'],
+                kline['closed']
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"Erro ao processar vela de {kline['market_id']}: {str(e)}")
+    
+    def get_stats(self) -> Dict:
+        """Retorna o estado e os contadores do stream"""
+        return {
+            'url': self.url,
+            'symbols': len(self.symbols),
+            'timeframes': self.timeframes,
+            'connected': self.connected,
+            'open_connections': sum(self._open),
+            'max_streams_per_connection': self.max_streams,
+            'healthy': self.healthy,
+            'connections': self.connections,
+            'messages': self.messages,
+            'closed_candles': self.closed_candles,
+            'errors': self.errors,
+            'seconds_since_message': time.monotonic() - self.last_message_at if self.last_message_at else None
+        }
@@ -7,6 +7,7 @@ from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
 import ccxt
 import pandas as pd
 import asyncio
@@ -14,15 +15,43 @@ from datetime import datetime
 import os
 from dotenv import load_dotenv
 
-from indicator import GCMIndicator
+from indicator import GCMIndicator, chart_records
+from cache import IndicatorCache, SingleFlight, candle_key
+from executor import IndicatorExecutor, EventLoopLagMonitor
+from resampler import CandleResampler, closed_candles, timeframe_ms
+from candle_store import CandleStore
+from exchange_client import ExchangeClient, OHLCV_PAGE_LIMIT
+from rate_limiter import PRIORITY_MONITOR, PRIORITY_API, PRIORITY_CHART, PRIORITY_NAMES
+from scheduler import MultiTimeframeScheduler
+from kline_stream import KlineStream
+from shards import ShardCoordinator
+from position_store import PositionStore
 from trading import PositionManager, AlertMonitor, TradingStrategy
 from telegram_bot import TelegramBot
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida da API: abre o cliente da exchange e libera os recursos no shutdown"""
+    await exchange.start()
+    yield
+    monitoring_state['is_running'] = False
+    if shard_coordinator is not None:
+        await shard_coordinator.stop()
+    if monitoring_state['stream'] is not None:
+        await monitoring_state['stream'].stop()
+    loop_lag_monitor.stop()
+    position_manager.flush()
+    if position_store is not None:
+        position_store.close()
+    await exchange.close()
+    indicator_executor.shutdown()
+
+
 # Inicializa FastAPI
-app = FastAPI(title="Sistema de Sinais GCM HRT", version="1.0.0")
+app = FastAPI(title="Sistema de Sinais GCM HRT", version="1.0.0", lifespan=lifespan)
 
 # Configurar CORS
 app.add_middleware(
@@ -35,9 +64,19 @@ app.add_middleware(
 
 # Inicializa componentes
 indicator = GCMIndicator()
+indicator_cache = IndicatorCache(max_size=int(os.getenv("INDICATOR_CACHE_SIZE", "1024")))
+ohlcv_flights = SingleFlight()
+indicator_executor = IndicatorExecutor()
+loop_lag_monitor = EventLoopLagMonitor()
+resampler = CandleResampler(base_timeframe=os.getenv("BASE_TIMEFRAME", "1m"))
+resampler_locks: Dict[str, asyncio.Lock] = {}
+# Posições e estatísticas persistidas em SQLite (POSITION_DB vazio desativa)
+POSITION_DB = os.getenv("POSITION_DB", "data/positions.db")
+position_store = PositionStore(POSITION_DB) if POSITION_DB else None
 position_manager = PositionManager(
     stop_loss_pct=2.0,
-    take_profit_pct=3.0
+    take_profit_pct=3.0,
+    store=position_store
 )
 alert_monitor = AlertMonitor()
 strategy = TradingStrategy(position_manager, alert_monitor)
@@ -55,9 +94,23 @@ else:
     print("⚠️ Erro ao conectar com o Telegram")
 
 # Exchange (modo demo - sem API keys)
-exchange = ccxt.binance({
-    'enableRateLimit': True,
-})
+exchange = ExchangeClient()
+
+# Armazenamento local de velas (CANDLE_STORE_DIR vazio desativa)
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR", "data/candles")
+candle_store = CandleStore(CANDLE_STORE_DIR, exchange.id) if CANDLE_STORE_DIR else None
+candle_store_locks: Dict[tuple, asyncio.Lock] = {}
+candle_store_stats = {'full_fetches': 0, 'delta_fetches': 0, 'history_fetches': 0, 'candles_fetched': 0}
+# Primeira vela de cada série cujo histórico anterior a exchange não tem mais
+candle_store_exhausted: Dict[tuple, int] = {}
+
+# Recebimento de velas por WebSocket (STREAM_MODE=1); sem stream saudável o monitoramento volta ao REST
+STREAM_MODE = os.getenv("STREAM_MODE", "0") == "1"
+STREAM_MIN_INTERVAL = float(os.getenv("STREAM_MIN_INTERVAL", "1"))
+STREAM_CHECK_INTERVAL = 5
+stream_frames: Dict[tuple, pd.DataFrame] = {}
+stream_last_analysis: Dict[tuple, float] = {}
+stream_loading: Dict[tuple, asyncio.Task] = {}
 
 # Estado do monitoramento
 monitoring_state = {
@@ -68,16 +121,28 @@ monitoring_state = {
         'LINK/USDT', 'UNI/USDT', 'ATOM/USDT', 'LTC/USDT', 'ETC/USDT',
         'NEAR/USDT', 'APT/USDT', 'ARB/USDT', 'OP/USDT', 'SUI/USDT'
     ],
-    'timeframe': '15m',
-    'last_update': None
+    'timeframe': '15m',      # Primeiro dos timeframes (compatibilidade)
+    'timeframes': ['15m'],   # Timeframes monitorados ao mesmo tempo, cada um no seu ritmo
+    'last_update': None,
+    'last_cycle': None,
+    'scheduler': None,
+    'stream': None
 }
 
+# Última vela processada pela estratégia no monitoramento, por (símbolo, timeframe)
+last_processed_candle: Dict[tuple, tuple] = {}
+
+# Monitoramento dividido entre processos (SHARDS=N); 0 roda tudo neste processo
+SHARDS = int(os.getenv("SHARDS", "0"))
+shard_results: Dict[tuple, Dict] = {}
+
 
 # ==================== MODELOS ====================
 
 class SymbolConfig(BaseModel):
     symbols: List[str]
     timeframe: str = '15m'
+    timeframes: Optional[List[str]] = None  # Vários timeframes; substitui `timeframe`
 
 
 class PositionConfig(BaseModel):
@@ -87,15 +152,27 @@ class PositionConfig(BaseModel):
 
 # ==================== FUNÇÕES AUXILIARES ====================
 
-async def fetch_ohlcv(symbol: str, timeframe: str = '15m', limit: int = 100):
-    """Busca dados OHLCV de uma exchange"""
+async def fetch_ohlcv(symbol: str, timeframe: str = '15m', limit: int = 100, priority: int = PRIORITY_API):
+    """
+    Busca dados OHLCV de uma exchange (priority: classe da requisição no agendador da exchange)
+    
+    Buscas simultâneas do mesmo (símbolo, timeframe, limit) compartilham uma
+    única requisição e o mesmo DataFrame, que não deve ser alterado.
+    """
+    return await ohlcv_flights.run(
+        (symbol, timeframe, limit),
+        fetch_ohlcv_direct, symbol, timeframe, limit, priority,
+        label=PRIORITY_NAMES[priority]
+    )
+
+
+async def fetch_ohlcv_direct(symbol: str, timeframe: str = '15m', limit: int = 100, priority: int = PRIORITY_API):
+    """Busca dados OHLCV sem agrupar com buscas simultâneas"""
+    if candle_store is not None:
+        return await fetch_ohlcv_stored(symbol, timeframe, limit, priority)
+    
     try:
-        ohlcv = await asyncio.to_thread(
-            exchange.fetch_ohlcv,
-            symbol,
-            timeframe,
-            limit=limit
-        )
+        ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit, priority=priority)
         
         df = pd.DataFrame(
             ohlcv,
@@ -109,11 +186,271 @@ async def fetch_ohlcv(symbol: str, timeframe: str = '15m', limit: int = 100):
         return None
 
 
-async def analyze_symbol(symbol: str, timeframe: str = '15m') -> Dict:
+async def fetch_ohlcv_stored(symbol: str, timeframe: str, limit: int = 100, priority: int = PRIORITY_API):
+    """
+    Busca dados OHLCV usando o armazenamento local de velas
+    
+    Só as velas a partir da última guardada (que pode ter mudado) são
+    buscadas na exchange, em páginas até a vela atual; o restante da janela
+    é lido do disco. A série só é buscada inteira quando ainda não existe.
+    Se ela tem menos de `limit` velas, as que faltam são buscadas antes da
+    primeira guardada, até a exchange não ter mais histórico (o que fica
+    registrado para não repetir a busca a cada ciclo). O histórico já
+    gravado (ex: pelo backfill.py) nunca é descartado.
+    """
+    lock = candle_store_locks.setdefault((symbol, timeframe), asyncio.Lock())
+    
+    async with lock:
+        try:
+            period = timeframe_ms(timeframe)
+            last = candle_store.last_timestamp(symbol, timeframe)
+            
+            if last is None:
+                ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit, priority=priority)
+                candle_store.write(symbol, timeframe, ohlcv)
+                candle_store_stats['full_fetches'] += 1
+                candle_store_stats['candles_fetched'] += len(ohlcv)
+            else:
+                await _fetch_newer(symbol, timeframe, last, period, priority)
+            
+            stored = candle_store.length(symbol, timeframe)
+            if stored < limit and candle_store_exhausted.get((symbol, timeframe)) != candle_store.first_timestamp(symbol, timeframe):
+                await _fetch_older(symbol, timeframe, limit - stored, period, priority)
+            
+            return candle_store.read(symbol, timeframe, limit)
+        except Exception as e:
+            print(f"Erro ao buscar dados para {symbol}: {str(e)}")
+            return None
+
+
+async def _fetch_newer(symbol: str, timeframe: str, last: int, period: int, priority: int):
+    """Grava as velas a partir da última guardada (que pode ter mudado) até a vela atual"""
+    since = last
+    while True:
+        missing = (exchange.milliseconds() - since) // period + 1
+        limit = min(max(int(missing), 1), OHLCV_PAGE_LIMIT)
+        ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit, priority=priority)
+        candle_store.write(symbol, timeframe, ohlcv)
+        candle_store_stats['delta_fetches'] += 1
+        candle_store_stats['candles_fetched'] += len(ohlcv)
+        if len(ohlcv) < limit or ohlcv[-1][0] < since or limit == missing:
+            return
+        since = ohlcv[-1][0] + period
+
+
+async def _fetch_older(symbol: str, timeframe: str, count: int, period: int, priority: int):
+    """Grava até `count` velas anteriores à primeira guardada e registra se o histórico acabou"""
+    first = candle_store.first_timestamp(symbol, timeframe)
+    since = first - count * period
+    ohlcv = []
+    while since < first:
+        limit = min(-(-(first - since) // period), OHLCV_PAGE_LIMIT)
+        page = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit, priority=priority)
+        candle_store_stats['history_fetches'] += 1
+        page = [candle for candle in page if since <= candle[0] < first]
+        if not page:
+            break
+        ohlcv.extend(page)
+        since = page[-1][0] + period
+    
+    candle_store_stats['candles_fetched'] += len(ohlcv)
+    candle_store.prepend(symbol, timeframe, ohlcv)
+    if len(ohlcv) < count:
+        candle_store_exhausted[(symbol, timeframe)] = candle_store.first_timestamp(symbol, timeframe)
+
+
+async def fetch_candles(symbol: str,
+                        timeframe: str,
+                        since: Optional[int] = None,
+                        limit: int = 1000,
+                        priority: int = PRIORITY_API):
+    """Busca velas no formato da exchange ([timestamp, open, high, low, close, volume])"""
+    try:
+        return await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit, priority=priority)
+    except Exception as e:
+        print(f"Erro ao buscar dados para {symbol}: {str(e)}")
+        return None
+
+
+async def fetch_multi_timeframe(symbol: str,
+                                timeframes: List[str],
+                                limit: int = 100,
+                                priority: int = PRIORITY_API) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Busca as velas de vários timeframes a partir da série base do resampler
+    
+    A cada chamada apenas as velas base novas são buscadas (a partir da
+    última, que pode ter sido revisada). O histórico de cada timeframe é
+    buscado uma única vez, quando ele aparece pela primeira vez para o
+    símbolo; depois disso todos os timeframes são derivados localmente.
+    """
+    lock = resampler_locks.setdefault(symbol, asyncio.Lock())
+    
+    async with lock:
+        since = resampler.last_base_timestamp(symbol)
+        if since is None:
+            # Começa no início da vela atual do maior timeframe, para derivar a vela em formação
+            largest = max(timeframes, key=timeframe_ms)
+            since = resampler.bucket_start(exchange.milliseconds(), largest)
+        
+        # Pagina até alcançar a vela atual
+        while True:
+            candles = await fetch_candles(symbol, resampler.base_timeframe, since=since, priority=priority)
+            if candles is None:
+                return None
+            resampler.update(symbol, candles)
+            if len(candles) < 1000 or candles[-1][0] <= since:
+                break
+            since = candles[-1][0]
+        
+        missing = [tf for tf in timeframes if not resampler.has_timeframe(symbol, tf)]
+        
+        # Timeframes novos: a série base precisa cobrir a vela atual deles
+        if missing:
+            last = resampler.last_base_timestamp(symbol)
+            start = min(resampler.bucket_start(last, tf) for tf in missing)
+            first = resampler.first_base_timestamp(symbol)
+            while start < first:
+                candles = await fetch_candles(symbol, resampler.base_timeframe, since=start, priority=priority)
+                if not candles:
+                    break
+                resampler.prepend(symbol, candles)
+                if candles[-1][0] >= first or len(candles) < 1000:
+                    break
+                start = candles[-1][0] + 1
+        
+        histories = await asyncio.gather(*[
+            fetch_candles(symbol, tf, limit=limit, priority=priority)
+            for tf in missing
+        ])
+        for tf, history in zip(missing, histories):
+            if history is None:
+                return None
+            resampler.load_history(symbol, tf, history)
+        
+        return {tf: resampler.get_ohlcv(symbol, tf, limit) for tf in timeframes}
+
+
+def shared_timeframes(timeframes: List[str]) -> List[str]:
+    """
+    Timeframes cujas velas o monitoramento deriva de uma série base compartilhada
+    
+    Com dois ou mais timeframes deriváveis do resampler (múltiplos da base,
+    maiores que ela e menores que 1w), uma única busca incremental da série
+    base por símbolo atende a todos. Os demais são buscados diretamente.
+    """
+    shared = []
+    for tf in timeframes:
+        try:
+            resampler.check_timeframe(tf)
+        except ValueError:
+            continue
+        if tf != resampler.base_timeframe:
+            shared.append(tf)
+    return shared if len(shared) > 1 else []
+
+
+async def fetch_timeframes(symbols: List[str],
+                           timeframes: List[str],
+                           shared: List[str],
+                           priority: int = PRIORITY_API) -> Dict[str, Dict[str, Optional[pd.DataFrame]]]:
+    """
+    Busca as velas dos símbolos nos timeframes de um ciclo
+    
+    Os timeframes em `shared` (ver shared_timeframes) vêm de uma única busca
+    da série base por símbolo; os outros, e os de símbolos cuja série base
+    não pôde ser buscada, de uma busca por (símbolo, timeframe). Retorna
+    {timeframe: {símbolo: DataFrame ou None}}.
+    """
+    derived = [tf for tf in timeframes if tf in shared]
+    direct = [tf for tf in timeframes if tf not in shared]
+    
+    requests = [fetch_multi_timeframe(symbol, derived, 100, priority) for symbol in symbols] if derived else []
+    requests += [fetch_ohlcv(symbol, tf, limit=100, priority=priority) for tf in direct for symbol in symbols]
+    fetched = await asyncio.gather(*requests)
+    
+    frames = {}
+    if derived:
+        multi, fetched = fetched[:len(symbols)], fetched[len(symbols):]
+        for tf in derived:
+            frames[tf] = {symbol: frame[tf] if frame else None for symbol, frame in zip(symbols, multi)}
+        
+        failed = [symbol for symbol, frame in zip(symbols, multi) if frame is None]
+        if failed:
+            retried = await asyncio.gather(*[fetch_ohlcv(symbol, tf, limit=100, priority=priority) for tf in derived for symbol in failed])
+            for index, tf in enumerate(derived):
+                frames[tf].update(zip(failed, retried[index * len(failed):(index + 1) * len(failed)]))
+    for index, tf in enumerate(direct):
+        frames[tf] = dict(zip(symbols, fetched[index * len(symbols):(index + 1) * len(symbols)]))
+    return frames
+
+
+def process_symbol_signal(symbol: str, df: pd.DataFrame, signal: Dict, timeframe: str) -> Dict:
+    """Aplica a estratégia ao sinal de um símbolo e envia o alerta pelo Telegram"""
+    current_price = float(df['close'].iloc[-1])
+    # Converte timestamp do pandas para int (milissegundos)
+    if 'timestamp' in df.columns:
+        ts = df['timestamp'].iloc[-1]
+        candle_timestamp = int(ts.timestamp() * 1000) if hasattr(ts, 'timestamp') else int(ts)
+    else:
+        candle_timestamp = None
+    strategy_result = strategy.process_signal(symbol, signal, current_price, candle_timestamp, timeframe)
+    
+    # Envia alerta pelo Telegram se houver uma ação
+    if strategy_result['action'] != 'NONE' and strategy_result.get('alert'):
+        try:
+            telegram_bot.send_alert(strategy_result['alert'])
+        except Exception as e:
+            print(f"Erro ao enviar alerta para Telegram: {str(e)}")
+    
+    return {
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'success': True,
+        'price': current_price,
+        'signal': signal,
+        'strategy_action': strategy_result,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def indicator_ttl(timeframe: str) -> float:
+    """Tempo de vida das entradas do cache: a duração de uma vela do timeframe"""
+    try:
+        return ccxt.Exchange.parse_timeframe(timeframe)
+    except Exception:
+        return 60
+
+
+async def calculate_indicators(symbol: str, timeframe: str, limit: int, df: pd.DataFrame) -> pd.DataFrame:
+    """Calcula o DataFrame com indicadores, reaproveitando o cache quando as velas não mudaram"""
+    key = candle_key('frame', symbol, timeframe, limit, df, indicator.get_params())
+    df_with_indicators = indicator_cache.get(key)
+    
+    if df_with_indicators is None:
+        df_with_indicators = await indicator_executor.run(indicator.calculate, df)
+        indicator_cache.put(key, df_with_indicators, indicator_ttl(timeframe))
+    
+    return df_with_indicators
+
+
+async def calculate_signal(symbol: str, timeframe: str, limit: int, df: pd.DataFrame) -> Dict:
+    """Calcula o sinal atual de um símbolo, reaproveitando o cache quando as velas não mudaram"""
+    key = candle_key('signal', symbol, timeframe, limit, df, indicator.get_params())
+    signal = indicator_cache.get(key)
+    
+    if signal is None:
+        signal = await indicator_executor.run(indicator.calculate, df, signal_only=True)
+        indicator_cache.put(key, signal, indicator_ttl(timeframe))
+    
+    return signal
+
+
+async def analyze_symbol(symbol: str, timeframe: str = '15m', priority: int = PRIORITY_API) -> Dict:
     """Analisa um símbolo e retorna sinais"""
     try:
         # Busca dados
-        df = await fetch_ohlcv(symbol, timeframe, limit=100)
+        df = await fetch_ohlcv(symbol, timeframe, limit=100, priority=priority)
         
         if df is None or len(df) == 0:
             return {
@@ -122,37 +459,11 @@ async def analyze_symbol(symbol: str, timeframe: str = '15m') -> Dict:
                 'success': False
             }
         
-        # Calcula indicadores
-        df_with_indicators = indicator.calculate(df)
-        
-        # Obtém sinal
-        signal = indicator.get_signal(df_with_indicators)
+        # Calcula indicadores e obtém sinal
+        signal = await calculate_signal(symbol, timeframe, 100, df)
         
         # Processa com a estratégia
-        current_price = float(df['close'].iloc[-1])
-        # Converte timestamp do pandas para int (milissegundos)
-        if 'timestamp' in df.columns:
-            ts = df['timestamp'].iloc[-1]
-            candle_timestamp = int(ts.timestamp() * 1000) if hasattr(ts, 'timestamp') else int(ts)
-        else:
-            candle_timestamp = None
-        strategy_result = strategy.process_signal(symbol, signal, current_price, candle_timestamp, timeframe)
-        
-        # Envia alerta pelo Telegram se houver uma ação
-        if strategy_result['action'] != 'NONE' and strategy_result.get('alert'):
-            try:
-                telegram_bot.send_alert(strategy_result['alert'])
-            except Exception as e:
-                print(f"Erro ao enviar alerta para Telegram: {str(e)}")
-        
-        return {
-            'symbol': symbol,
-            'success': True,
-            'price': current_price,
-            'signal': signal,
-            'strategy_action': strategy_result,
-            'timestamp': datetime.now().isoformat()
-        }
+        return process_symbol_signal(symbol, df, signal, timeframe)
     
     except Exception as e:
         return {
@@ -162,35 +473,349 @@ async def analyze_symbol(symbol: str, timeframe: str = '15m') -> Dict:
         }
 
 
+async def analyze_symbols(symbols: List[str],
+                          timeframe: str = '15m',
+                          skip_unchanged: bool = False,
+                          priority: int = PRIORITY_API,
+                          frames: Optional[Dict[str, Optional[pd.DataFrame]]] = None,
+                          closed_only: bool = False) -> List[Dict]:
+    """
+    Analisa vários símbolos calculando o indicador em lote
+    
+    As velas são buscadas em paralelo e o indicador roda uma única vez para
+    todos os símbolos (GCMIndicator.calculate_frames), sem DataFrame de
+    resultado por símbolo.
+    
+    Com skip_unchanged=True, símbolos cuja última vela é idêntica à do
+    ciclo anterior não passam pela estratégia (resultado com 'skipped').
+    A vela só é registrada depois que a estratégia a processou, então uma
+    falha na busca, no indicador ou na estratégia é tentada de novo no
+    ciclo seguinte.
+    `priority` é a classe das buscas no agendador da exchange. `frames`
+    recebe velas já buscadas por símbolo (ex: por fetch_timeframes).
+    Com closed_only=True a vela em formação é descartada e o sinal, a
+    deduplicação e o cache usam a última vela fechada (ciclos no
+    fechamento da vela).
+    """
+    if frames is None:
+        fetched = await asyncio.gather(*[
+            fetch_ohlcv(symbol, timeframe, limit=100, priority=priority)
+            for symbol in symbols
+        ])
+        frames = dict(zip(symbols, fetched))
+    valid_frames = {
+        symbol: df
+        for symbol, df in frames.items()
+        if df is not None and len(df) > 0
+    }
+    if closed_only:
+        now = exchange.milliseconds()
+        valid_frames = {symbol: closed_candles(df, timeframe, now) for symbol, df in valid_frames.items()}
+        valid_frames = {symbol: df for symbol, df in valid_frames.items() if len(df) > 0}
+    
+    # Símbolos sem vela nova ou alterada desde o último ciclo
+    skipped = set()
+    if skip_unchanged:
+        for symbol, df in valid_frames.items():
+            last_candle = tuple(df.iloc[-1])
+            if last_processed_candle.get((symbol, timeframe)) == last_candle:
+                skipped.add(symbol)
+        valid_frames = {symbol: df for symbol, df in valid_frames.items() if symbol not in skipped}
+    
+    # Sinais já calculados para as mesmas velas vêm do cache; o restante é calculado em lote
+    params = indicator.get_params()
+    keys = {
+        symbol: candle_key('signal', symbol, timeframe, 100, df, params)
+        for symbol, df in valid_frames.items()
+    }
+    signals = {symbol: indicator_cache.get(key) for symbol, key in keys.items()}
+    pending = {symbol: valid_frames[symbol] for symbol, signal in signals.items() if signal is None}
+    
+    if pending:
+        try:
+            computed = await indicator_executor.run(indicator.calculate_frames, pending)
+            computed = computed.to_dict(orient='index')
+        except Exception as e:
+            return [{'symbol': symbol, 'timeframe': timeframe, 'error': str(e), 'success': False} for symbol in symbols]
+        
+        for symbol, signal in computed.items():
+            indicator_cache.put(keys[symbol], signal, indicator_ttl(timeframe))
+        signals.update(computed)
+    
+    results = []
+    for symbol in symbols:
+        if symbol in skipped:
+            results.append({
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'success': True,
+                'skipped': True,
+                'strategy_action': {'action': 'NONE', 'message': 'Vela sem alteração', 'position': None, 'alert': None},
+                'timestamp': datetime.now().isoformat()
+            })
+            continue
+        
+        if symbol not in valid_frames:
+            results.append({
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'error': 'Não foi possível buscar dados',
+                'success': False
+            })
+            continue
+        
+        try:
+            results.append(process_symbol_signal(symbol, valid_frames[symbol], signals[symbol], timeframe))
+            if skip_unchanged:
+                last_processed_candle[(symbol, timeframe)] = tuple(valid_frames[symbol].iloc[-1])
+        except Exception as e:
+            results.append({
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'error': str(e),
+                'success': False
+            })
+    
+    return results
+
+
+async def handle_stream_candle(symbol: str, timeframe: str, candle: List, closed: bool):
+    """
+    Recebe uma atualização de vela do stream e passa o símbolo pela análise
+    
+    A janela de velas do símbolo é carregada por REST antes de o stream
+    começar (ver update_stream) e depois mantida com as velas do stream. A
+    leitura do WebSocket espera esta corrotina, então ela nunca espera uma
+    busca REST: se a janela de um símbolo ainda não existe, ela é buscada
+    numa tarefa à parte e a análise começa na atualização seguinte. Os stops
+    e alvos das posições são verificados a cada atualização (pelo livro de
+    gatilhos, sem o indicador). Velas fechadas são sempre analisadas;
+    atualizações da vela em formação no máximo a cada STREAM_MIN_INTERVAL
+    segundos por símbolo.
+    """
+    key = (symbol, timeframe)
+    df = stream_frames.get(key)
+    if df is None:
+        if key not in stream_loading:
+            stream_loading[key] = asyncio.create_task(load_stream_frame(symbol, timeframe))
+        check_stream_exits(symbol, float(candle[4]))
+        return
+    
+    row = pd.DataFrame([candle], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    row['timestamp'] = pd.to_datetime(row['timestamp'], unit='ms')
+    last_timestamp = df['timestamp'].iloc[-1]
+    if row['timestamp'].iloc[0] < last_timestamp:
+        return
+    if row['timestamp'].iloc[0] == last_timestamp:
+        df = df.iloc[:-1]
+    df = pd.concat([df, row], ignore_index=True).tail(100).reset_index(drop=True)
+    stream_frames[key] = df
+    
+    if candle_store is not None:
+        candle_store.write(symbol, timeframe, [candle])
+    
+    check_stream_exits(symbol, float(candle[4]))
+    
+    now = asyncio.get_running_loop().time()
+    if not closed and now - stream_last_analysis.get(key, float('-inf')) < STREAM_MIN_INTERVAL:
+        return
+    stream_last_analysis[key] = now
+    
+    signal = await calculate_signal(symbol, timeframe, 100, df)
+    result = process_symbol_signal(symbol, df, signal, timeframe)
+    last_processed_candle[key] = tuple(df.iloc[-1])
+    
+    action = result['strategy_action']['action']
+    if action != 'NONE':
+        print(f"  {symbol} {timeframe}: {action} - {result['strategy_action']['message']}")
+
+
+def check_stream_exits(symbol: str, price: float):
+    """Verifica stops e alvos das posições do símbolo com o preço do stream"""
+    for exit_result in strategy.process_price(symbol, price):
+        print(f"  {symbol}: EXIT - {exit_result['message']}")
+        try:
+            telegram_bot.send_alert(exit_result['alert'])
+        except Exception as e:
+            print(f"Erro ao enviar alerta para Telegram: {str(e)}")
+
+
+async def load_stream_frame(symbol: str, timeframe: str):
+    """Busca a janela de velas de um símbolo que não foi carregada antes do stream"""
+    key = (symbol, timeframe)
+    try:
+        df = await fetch_ohlcv(symbol, timeframe, limit=100, priority=PRIORITY_MONITOR)
+        if df is not None and len(df) > 0 and key not in stream_frames:
+            stream_frames[key] = df
+    finally:
+        stream_loading.pop(key, None)
+
+
+async def update_stream(stream: Optional[KlineStream]) -> Optional[KlineStream]:
+    """
+    Inicia o stream de velas ou o recria quando os símbolos ou os timeframes mudam
+    
+    As janelas de velas de todos os símbolos são buscadas antes, de uma vez
+    (como num ciclo por REST), para que a leitura do stream não precise
+    buscá-las.
+    """
+    symbols = monitoring_state['symbols']
+    timeframes = monitoring_state['timeframes']
+    if stream is not None and stream.symbols == symbols and stream.timeframes == timeframes:
+        return stream
+    
+    if stream is not None:
+        await stream.stop()
+    for task in stream_loading.values():
+        task.cancel()
+    stream_loading.clear()
+    stream_frames.clear()
+    
+    frames = await fetch_timeframes(symbols, timeframes, shared_timeframes(timeframes), priority=PRIORITY_MONITOR)
+    for timeframe, by_symbol in frames.items():
+        for symbol, df in by_symbol.items():
+            if df is not None and len(df) > 0:
+                stream_frames[(symbol, timeframe)] = df
+    
+    stream = KlineStream(symbols, timeframes, handle_stream_candle)
+    stream.start()
+    monitoring_state['stream'] = stream
+    return stream
+
+
 async def monitor_loop():
-    """Loop de monitoramento contínuo"""
+    """
+    Loop de monitoramento contínuo
+    
+    Cada timeframe monitorado tem seu próprio ritmo: um ciclo começa no
+    fechamento de uma vela do timeframe (mais o atraso de acomodação) ou nos
+    intervalos intermediários configurados. Timeframes que fecham juntos
+    rodam no mesmo ciclo, com as velas buscadas uma vez para todos (ver
+    shared_timeframes); símbolos cuja última vela não mudou desde o ciclo
+    anterior são pulados.
+    
+    Com STREAM_MODE=1 as velas chegam pelo WebSocket e são analisadas assim
+    que chegam; os ciclos por REST só rodam enquanto o stream está caído.
+    """
+    loop_lag_monitor.start()
+    scheduler = None
+    stream = None
+    due: List[str] = []
+    
     while monitoring_state['is_running']:
         try:
-            print(f"[{datetime.now()}] Executando análise...")
+            # Recria o agendador se os timeframes mudaram; o primeiro ciclo roda todos
+            if scheduler is None or scheduler.timeframes != monitoring_state['timeframes']:
+                scheduler = MultiTimeframeScheduler(monitoring_state['timeframes'], clock=exchange.clock, speed=exchange.speed)
+                shared = shared_timeframes(scheduler.timeframes)
+                due = scheduler.timeframes
+            
+            if STREAM_MODE:
+                stream = await update_stream(stream)
+                if stream.healthy:
+                    # Verifica o stream com frequência para voltar ao REST logo que ele cair
+                    await asyncio.sleep(STREAM_CHECK_INTERVAL)
+                    position_manager.flush()
+                    due = scheduler.timeframes
+                    continue
+                print(f"[{datetime.now()}] Stream de velas indisponível, buscando por REST")
             
-            # Analisa todos os símbolos
-            tasks = [
-                analyze_symbol(symbol, monitoring_state['timeframe'])
-                for symbol in monitoring_state['symbols']
-            ]
+            print(f"[{datetime.now()}] Executando análise ({', '.join(due)})...")
             
-            results = await asyncio.gather(*tasks)
+            # Analisa todos os símbolos, medindo o atraso do event loop durante o ciclo
+            loop_lag_monitor.reset()
+            cycle_start = datetime.now()
+            symbols = monitoring_state['symbols']
+            frames = await fetch_timeframes(symbols, due, shared, priority=PRIORITY_MONITOR)
+            results = []
+            for timeframe in due:
+                results += await analyze_symbols(
+                    symbols,
+                    timeframe,
+                    skip_unchanged=True,
+                    priority=PRIORITY_MONITOR,
+                    frames=frames[timeframe],
+                    # No fechamento da vela o sinal é o da vela que acabou de fechar
+                    closed_only=timeframe not in scheduler.forming
+                )
+                scheduler.record_cycle(timeframe, (datetime.now() - cycle_start).total_seconds())
+            duration = (datetime.now() - cycle_start).total_seconds()
+            position_manager.flush()
             
             monitoring_state['last_update'] = datetime.now().isoformat()
+            monitoring_state['last_cycle'] = {
+                'timeframes': due,
+                'duration_s': duration,
+                'skipped_symbols': sum(1 for result in results if result.get('skipped')),
+                'event_loop_lag': loop_lag_monitor.get_stats()
+            }
             
             # Log dos resultados
             for result in results:
                 if result['success']:
                     action = result['strategy_action']['action']
                     if action != 'NONE':
-                        print(f"  {result['symbol']}: {action} - {result['strategy_action']['message']}")
+                        print(f"  {result['symbol']} {result['timeframe']}: {action} - {result['strategy_action']['message']}")
             
-            # Aguarda intervalo (1 minuto para M15)
-            await asyncio.sleep(60)
+            # Aguarda o fechamento da próxima vela de algum timeframe (ou o próximo intervalo dentro dela)
+            monitoring_state['scheduler'] = scheduler
+            due = await scheduler.wait()
             
         except Exception as e:
             print(f"Erro no loop de monitoramento: {str(e)}")
             await asyncio.sleep(60)
+    
+    if stream is not None:
+        await stream.stop()
+        if monitoring_state['stream'] is stream:
+            monitoring_state['stream'] = None
+    
+    # Um novo loop pode ter sido iniciado enquanto este aguardava
+    if not monitoring_state['is_running']:
+        loop_lag_monitor.stop()
+
+
+def handle_shard_report(shard: int, report: Dict):
+    """
+    Incorpora o relatório de um shard ao estado da API
+    
+    Posições e estatísticas dos símbolos do shard substituem as da API; os
+    alertas gerados no ciclo são registrados e enviados pelo Telegram.
+    """
+    position_manager.merge(report['positions'], report['statistics'])
+    
+    for result in report['results']:
+        shard_results[(result['symbol'], result['timeframe'])] = result
+        action = result.get('strategy_action')
+        if not action or action['action'] == 'NONE' or not action.get('alert'):
+            continue
+        
+        alert = action['alert']
+        alert_monitor.add_alert(alert['symbol'], alert['signal_type'], alert['message'], alert['data'], timeframe=alert.get('timeframe'))
+        print(f"  [shard {shard}] {result['symbol']} {result['timeframe']}: {action['action']} - {action['message']}")
+        try:
+            telegram_bot.send_alert(alert)
+        except Exception as e:
+            print(f"Erro ao enviar alerta para Telegram: {str(e)}")
+    
+    monitoring_state['last_update'] = datetime.now().isoformat()
+    position_manager.flush()
+
+
+def shard_state(symbols: List[str]) -> Dict:
+    """
+    Posições e estatísticas salvas dos símbolos de um shard (enviadas quando ele conecta)
+    
+    Chamada no event loop; devolve cópias, que são enviadas por outra thread.
+    """
+    symbols = set(symbols)
+    return {
+        'positions': {key: dict(position) for key, position in position_manager.positions.items() if key[0] in symbols},
+        'statistics': {symbol: dict(position_manager.statistics[symbol]) for symbol in symbols if symbol in position_manager.statistics}
+    }
+
+
+shard_coordinator = ShardCoordinator(SHARDS, on_report=handle_shard_report, state=shard_state) if SHARDS > 0 else None
 
 
 # ==================== ROTAS ====================
@@ -208,6 +833,7 @@ async def get_status():
         'monitoring': monitoring_state['is_running'],
         'symbols': monitoring_state['symbols'],
         'timeframe': monitoring_state['timeframe'],
+        'timeframes': monitoring_state['timeframes'],
         'last_update': monitoring_state['last_update'],
         'open_positions': len(position_manager.get_open_positions()),
         'total_positions': len(position_manager.get_all_positions())
@@ -228,15 +854,42 @@ async def analyze_single_symbol(symbol: str, timeframe: str = '15m'):
     return result
 
 
+@app.get("/api/analyze-multi/{symbol}")
+async def analyze_multi_timeframe(symbol: str, timeframes: str = '15m,1h,4h', limit: int = 100):
+    """Sinais de vários timeframes derivados da mesma série base"""
+    symbol = symbol.replace('-', '/')
+    timeframe_list = [tf.strip() for tf in timeframes.split(',') if tf.strip()]
+    
+    try:
+        for tf in timeframe_list:
+            resampler.check_timeframe(tf)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    frames = await fetch_multi_timeframe(symbol, timeframe_list, limit)
+    
+    if frames is None:
+        raise HTTPException(status_code=400, detail="Não foi possível buscar dados")
+    
+    signals = await asyncio.gather(*[
+        calculate_signal(symbol, tf, limit, df)
+        for tf, df in frames.items()
+    ])
+    
+    return {
+        'symbol': symbol,
+        'base_timeframe': resampler.base_timeframe,
+        'signals': dict(zip(frames, signals)),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
 @app.get("/api/analyze-all")
 async def analyze_all_symbols():
-    """Analisa todos os símbolos configurados"""
-    tasks = [
-        analyze_symbol(symbol, monitoring_state['timeframe'])
-        for symbol in monitoring_state['symbols']
-    ]
-    
-    results = await asyncio.gather(*tasks)
+    """Analisa todos os símbolos configurados, em todos os timeframes monitorados"""
+    results = []
+    for timeframe in monitoring_state['timeframes']:
+        results += await analyze_symbols(monitoring_state['symbols'], timeframe)
     
     return {
         'results': results,
@@ -249,20 +902,16 @@ async def get_chart_data(symbol: str, timeframe: str = '1d', limit: int = 100):
     """Retorna dados do gráfico com indicadores"""
     symbol = symbol.replace('-', '/')
     
-    df = await fetch_ohlcv(symbol, timeframe, limit)
+    df = await fetch_ohlcv(symbol, timeframe, limit, priority=PRIORITY_CHART)
     
     if df is None:
         raise HTTPException(status_code=400, detail="Não foi possível buscar dados")
     
     # Calcula indicadores
-    df_with_indicators = indicator.calculate(df)
+    df_with_indicators = await calculate_indicators(symbol, timeframe, limit, df)
     
     # Converte para formato JSON
-    chart_data = df_with_indicators.to_dict(orient='records')
-    
-    # Converte timestamp para string
-    for item in chart_data:
-        item['timestamp'] = item['timestamp'].isoformat() if pd.notna(item['timestamp']) else None
+    chart_data = chart_records(df_with_indicators)
     
     return {
         'symbol': symbol,
@@ -271,6 +920,54 @@ async def get_chart_data(symbol: str, timeframe: str = '1d', limit: int = 100):
     }
 
 
+@app.get("/api/cache")
+async def get_cache_stats():
+    """Retorna os contadores do cache de indicadores"""
+    return {
+        'cache': indicator_cache.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+@app.get("/api/candles")
+async def get_candle_store_stats():
+    """Retorna os contadores do armazenamento local de velas"""
+    if candle_store is None:
+        return {'enabled': False}
+    
+    return {
+        'enabled': True,
+        'store': candle_store.get_stats(),
+        'fetches': candle_store_stats,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+@app.get("/api/performance")
+async def get_performance():
+    """Retorna o executor do indicador e o atraso do event loop"""
+    return {
+        'executor': indicator_executor.get_stats(),
+        'exchange': exchange.get_stats(),
+        'coalescing': ohlcv_flights.get_stats(),
+        'event_loop_lag': loop_lag_monitor.get_stats(),
+        'last_cycle': monitoring_state['last_cycle'],
+        'scheduler': monitoring_state['scheduler'].get_stats() if monitoring_state['scheduler'] else None,
+        'stream': monitoring_state['stream'].get_stats() if monitoring_state['stream'] else None,
+        'shards': shard_coordinator.get_stats() if shard_coordinator else None,
+        'position_store': position_store.get_stats() if position_store else None,
+        'triggers': position_manager.triggers.get_stats(),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+@app.delete("/api/cache")
+async def clear_cache():
+    """Limpa o cache de indicadores"""
+    indicator_cache.clear()
+    return {'message': 'Cache limpo'}
+
+
 @app.post("/api/monitoring/start")
 async def start_monitoring(background_tasks: BackgroundTasks):
     """Inicia o monitoramento automático"""
@@ -278,6 +975,16 @@ async def start_monitoring(background_tasks: BackgroundTasks):
         return {'message': 'Monitoramento já está ativo'}
     
     monitoring_state['is_running'] = True
+    
+    if shard_coordinator is not None:
+        shard_coordinator.start(
+            monitoring_state['symbols'],
+            monitoring_state['timeframes'],
+            position_manager.stop_loss_pct,
+            position_manager.take_profit_pct
+        )
+        return {'message': f'Monitoramento iniciado em {SHARDS} shards'}
+    
     background_tasks.add_task(monitor_loop)
     
     return {'message': 'Monitoramento iniciado'}
@@ -287,19 +994,35 @@ async def start_monitoring(background_tasks: BackgroundTasks):
 async def stop_monitoring():
     """Para o monitoramento automático"""
     monitoring_state['is_running'] = False
+    if shard_coordinator is not None:
+        await shard_coordinator.stop()
     return {'message': 'Monitoramento parado'}
 
 
 @app.post("/api/monitoring/config")
 async def configure_monitoring(config: SymbolConfig):
-    """Configura os símbolos e timeframe para monitoramento"""
+    """Configura os símbolos e os timeframes para monitoramento"""
+    # Remove repetidos mantendo a ordem
+    timeframes = list(dict.fromkeys(tf.strip() for tf in (config.timeframes or [config.timeframe]) if tf.strip()))
+    if not timeframes:
+        raise HTTPException(status_code=400, detail="Informe ao menos um timeframe")
+    for tf in timeframes:
+        try:
+            ccxt.Exchange.parse_timeframe(tf)
+        except Exception:
+            raise HTTPException(status_code=400, detail=f"Timeframe inválido: {tf}")
+    
     monitoring_state['symbols'] = config.symbols
-    monitoring_state['timeframe'] = config.timeframe
+    monitoring_state['timeframe'] = timeframes[0]
+    monitoring_state['timeframes'] = timeframes
+    if shard_coordinator is not None:
+        shard_coordinator.configure(config.symbols, timeframes, position_manager.stop_loss_pct, position_manager.take_profit_pct)
     
     return {
         'message': 'Configuração atualizada',
         'symbols': config.symbols,
-        'timeframe': config.timeframe
+        'timeframe': timeframes[0],
+        'timeframes': timeframes
     }
 
 
@@ -312,45 +1035,77 @@ async def get_positions():
     }
 
 
-@app.get("/api/positions/{symbol}")
-async def get_position(symbol: str):
-    """Retorna informações de uma posição específica"""
-    symbol = symbol.replace('-', '/')
+@app.get("/api/trades")
+async def get_trades(symbol: str = None, limit: int = 100, timeframe: Optional[str] = None):
+    """Retorna o histórico de operações fechadas (mais recentes primeiro)"""
+    if position_store is None:
+        return {'enabled': False, 'trades': []}
+    if symbol:
+        symbol = symbol.replace('-', '/')
     
-    position = position_manager.get_position(symbol)
+    return {
+        'enabled': True,
+        'trades': position_store.trades(symbol, limit, timeframe)
+    }
+
+
+def find_position(symbol: str, timeframe: Optional[str], open_only: bool = False) -> Dict:
+    """
+    Posição do símbolo no timeframe informado
     
-    if not position:
-        raise HTTPException(status_code=404, detail="Posição não encontrada")
+    Sem timeframe, vale a única posição do símbolo; com posições em mais de
+    um timeframe, o timeframe precisa ser informado.
+    """
+    if timeframe:
+        positions = [position_manager.get_position(symbol, timeframe)]
+    else:
+        positions = position_manager.get_symbol_positions(symbol)
+    positions = [p for p in positions if p and (not open_only or p['status'] == 'OPEN')]
     
-    return position
+    if not positions:
+        raise HTTPException(status_code=404, detail="Posição aberta não encontrada" if open_only else "Posição não encontrada")
+    if len(positions) > 1:
+        timeframes = ', '.join(p['timeframe'] for p in positions)
+        raise HTTPException(status_code=400, detail=f"Posições em vários timeframes ({timeframes}); informe o timeframe")
+    return positions[0]
 
 
-@app.post("/api/positions/{symbol}/close")
-async def close_position_manual(symbol: str):
-    """Fecha uma posição manualmente"""
+@app.get("/api/positions/{symbol}")
+async def get_position(symbol: str, timeframe: Optional[str] = None):
+    """Retorna informações de uma posição específica (do timeframe informado)"""
     symbol = symbol.replace('-', '/')
     
-    position = position_manager.get_position(symbol)
+    return find_position(symbol, timeframe)
+
+
+@app.post("/api/positions/{symbol}/close")
+async def close_position_manual(symbol: str, timeframe: Optional[str] = None):
+    """Fecha uma posição manualmente (do timeframe informado)"""
+    symbol = symbol.replace('-', '/')
     
-    if not position or position['status'] != 'OPEN':
-        raise HTTPException(status_code=404, detail="Posição aberta não encontrada")
+    position = find_position(symbol, timeframe, open_only=True)
+    timeframe = position['timeframe']
     
-    # Busca preço atual
-    df = await fetch_ohlcv(symbol, '1m', limit=1)
-    if df is None:
+    # Busca preço atual (direto na exchange: uma vela não passa pelo armazenamento)
+    ohlcv = await fetch_candles(symbol, '1m', limit=1)
+    if not ohlcv:
         raise HTTPException(status_code=400, detail="Não foi possível obter preço atual")
     
-    current_price = float(df['close'].iloc[-1])
+    current_price = float(ohlcv[-1][4])
     
-    # Fecha posição
-    closed_position = position_manager.close_position(symbol, current_price, 'MANUAL')
+    # Fecha posição (e no shard responsável pelo símbolo, que mantém a posição)
+    closed_position = position_manager.close_position(symbol, current_price, 'MANUAL', timeframe)
+    if shard_coordinator is not None:
+        shard_coordinator.close_position(symbol, timeframe, current_price)
+    position_manager.flush()
     
     # Adiciona alerta (sem notificação Telegram)
     alert_monitor.add_alert(
         symbol=symbol,
         signal_type='INFO',
         message=f"Posição fechada manualmente",
-        data=closed_position
+        data=closed_position,
+        timeframe=timeframe
     )
     
     return closed_position
@@ -361,6 +1116,8 @@ async def configure_position_settings(config: PositionConfig):
     """Configura stop loss e take profit"""
     position_manager.stop_loss_pct = config.stop_loss_pct
     position_manager.take_profit_pct = config.take_profit_pct
+    if shard_coordinator is not None:
+        shard_coordinator.configure(monitoring_state['symbols'], monitoring_state['timeframes'], config.stop_loss_pct, config.take_profit_pct)
     
     return {
         'message': 'Configurações atualizadas',
@@ -370,10 +1127,32 @@ async def configure_position_settings(config: PositionConfig):
 
 
 @app.get("/api/alerts")
-async def get_alerts(limit: int = 50):
-    """Retorna os alertas mais recentes"""
+async def get_alerts(limit: int = 50,
+                     since: Optional[int] = None,
+                     before: Optional[int] = None,
+                     symbol: Optional[str] = None,
+                     signal_type: Optional[str] = None):
+    """
+    Retorna os alertas mais recentes (do mais novo para o mais antigo)
+    
+    `since` traz apenas os alertas novos desde o `cursor` de uma resposta
+    anterior; `before` pagina o histórico a partir do menor id recebido.
+    """
+    if symbol:
+        symbol = symbol.replace('-', '/')
+    
+    alerts = alert_monitor.get_alerts(
+        min(limit, 1000),
+        since=since,
+        before=before,
+        symbol=symbol,
+        signal_type=signal_type.upper() if signal_type else None
+    )
+    
     return {
-        'alerts': alert_monitor.get_alerts(limit)
+        'alerts': alerts,
+        'cursor': alert_monitor.cursor,
+        'total': len(alert_monitor)
     }
 
 
@@ -385,8 +1164,14 @@ async def clear_alerts():
 
 
 @app.get("/api/statistics")
-async def get_statistics(symbol: str = None):
-    """Retorna estatísticas de assertividade"""
+async def get_statistics(symbol: str = None, timeframe: Optional[str] = None):
+    """
+    Retorna estatísticas de assertividade
+    
+    `analytics` traz as métricas de risco e desempenho do escopo pedido
+    (todas as operações, o símbolo, o timeframe ou os dois), já calculadas
+    a cada operação fechada.
+    """
     if symbol:
         symbol = symbol.replace('-', '/')
     
@@ -394,6 +1179,7 @@ async def get_statistics(symbol: str = None):
     
     return {
         'statistics': stats,
+        'analytics': position_manager.analytics.summary(symbol, timeframe),
         'timestamp': datetime.now().isoformat()
     }
 
@@ -405,6 +1191,7 @@ async def reset_statistics(symbol: str = None):
         symbol = symbol.replace('-', '/')
     
     position_manager.reset_statistics(symbol)
+    position_manager.flush()
     
     return {
         'message': f'Estatísticas {"do símbolo " + symbol if symbol else "de todos os símbolos"} resetadas'
@@ -0,0 +1,215 @@
+"""
+Persistência das posições e estatísticas da estratégia
+SQLite em modo WAL, com gravações agrupadas por ciclo do monitoramento
+"""
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+POSITIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS positions (
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (symbol, timeframe)
+)"""
+
+SCHEMA = POSITIONS_TABLE + """;
+CREATE TABLE IF NOT EXISTS statistics (
+    symbol TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    timeframe TEXT,
+    exit_time TEXT,
+    exit_reason TEXT,
+    pnl_pct REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_symbol ON trades (symbol, id);
+CREATE INDEX IF NOT EXISTS trades_symbol_timeframe ON trades (symbol, timeframe, id);
+CREATE INDEX IF NOT EXISTS trades_exit_time ON trades (exit_time);
+CREATE TABLE IF NOT EXISTS analytics (
+    scope TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# Timeframe das posições gravadas antes de as posições serem por (símbolo, timeframe)
+LEGACY_TIMEFRAME = '15m'
+
+
+
+def _dumps(value: Dict) -> str:
+    # Valores NumPy (ex: força do sinal vinda de um DataFrame) viram tipos nativos
+    return json.dumps(value, default=lambda item: item.item() if hasattr(item, 'item') else str(item))
+
+
+class PositionStore:
+    """
+    Posições, estatísticas e histórico de operações em um arquivo SQLite
+    
+    As tabelas positions, statistics e analytics guardam o estado atual (uma
+    linha por (símbolo, timeframe), por símbolo e por escopo das
+    estatísticas) e são as únicas lidas na inicialização, então o tempo de carga
+    não depende do tamanho do histórico. Cada operação fechada é acrescentada
+    em trades. O PositionManager acumula as mudanças e chama save() uma vez
+    por ciclo, em uma única transação.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Caminho do arquivo do banco (ex: data/positions.db)
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Usado só pelo event loop da API, que pode não ser a thread que criou o objeto
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+        self._db.executescript(SCHEMA)
+        
+        self.saves = 0
+        self.rows_written = 0
+        self.last_save_ms = 0.0
+        self.load_ms = 0.0
+    
+    def _columns(self, table: str) -> List[str]:
+        return [row[1] for row in self._db.execute(f'PRAGMA table_info({table})')]
+    
+    def _migrate(self):
+        """Converte um banco com uma posição por símbolo para posições por (símbolo, timeframe)"""
+        trades = self._columns('trades')
+        if trades and 'timeframe' not in trades:
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.execute('ALTER TABLE trades ADD COLUMN timeframe TEXT')
+                self._db.execute("UPDATE trades SET timeframe = json_extract(data, '$.timeframe')")
+        
+        positions = self._columns('positions')
+        if positions and 'timeframe' not in positions:
+            rows = []
+            for symbol, data in self._db.execute('SELECT symbol, data FROM positions').fetchall():
+                position = json.loads(data)
+                position['timeframe'] = position.get('timeframe') or LEGACY_TIMEFRAME
+                rows.append((symbol, position['timeframe'], _dumps(position)))
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.execute('DROP TABLE positions')
+                self._db.execute(POSITIONS_TABLE)
+                self._db.executemany('INSERT INTO positions (symbol, timeframe, data) VALUES (?, ?, ?)', rows)
+    
+    def load(self) -> Tuple[Dict[Tuple[str, str], Dict], Dict[str, Dict]]:
+        """Retorna (posições por (símbolo, timeframe), estatísticas por símbolo)"""
+        started = time.perf_counter()
+        positions = {
+            (symbol, timeframe): json.loads(data)
+            for symbol, timeframe, data in self._db.execute('SELECT symbol, timeframe, data FROM positions')
+        }
+        statistics = {symbol: json.loads(data) for symbol, data in self._db.execute('SELECT symbol, data FROM statistics')}
+        self.load_ms = (time.perf_counter() - started) * 1000
+        return positions, statistics
+    
+    def load_analytics(self) -> Dict[str, Dict]:
+        """Retorna o estado das estatísticas de desempenho por escopo"""
+        return {scope: json.loads(data) for scope, data in self._db.execute('SELECT scope, data FROM analytics')}
+    
+    def iter_trades(self, since: Optional[str] = None) -> Iterator[Dict]:
+        """Percorre as operações fechadas (a partir do horário ISO `since`), da mais antiga para a mais recente"""
+        if since:
+            rows = self._db.execute('SELECT data FROM trades WHERE exit_time >= ? ORDER BY id', (since,))
+        else:
+            rows = self._db.execute('SELECT data FROM trades ORDER BY id')
+        for data, in rows:
+            yield json.loads(data)
+    
+    def save(self,
+             positions: Dict[Tuple[str, str], Dict],
+             statistics: Dict[str, Dict],
+             keys: Iterable[Tuple[str, str]],
+             symbols: Iterable[str],
+             closed: List[Dict],
+             analytics: Optional[Dict[str, Optional[Dict]]] = None):
+        """
+        Grava as posições e estatísticas alteradas e as operações fechadas em uma transação
+        
+        Args:
+            positions: Posições atuais por (símbolo, timeframe)
+            statistics: Estatísticas atuais por símbolo
+            keys: Posições alteradas desde a última gravação
+            symbols: Símbolos com estatísticas alteradas desde a última gravação
+            closed: Operações fechadas desde a última gravação
+            analytics: Estado dos escopos de desempenho alterados (None apaga o escopo)
+        """
+        started = time.perf_counter()
+        upsert_positions, upsert_statistics, deleted_statistics = [], [], []
+        for key in keys:
+            if key in positions:
+                upsert_positions.append((*key, _dumps(positions[key])))
+        for symbol in symbols:
+            if symbol in statistics:
+                upsert_statistics.append((symbol, _dumps(statistics[symbol])))
+            else:
+                deleted_statistics.append((symbol,))
+        trades = [
+            (trade['symbol'], trade.get('timeframe'), trade.get('exit_time'), trade.get('exit_reason'), trade.get('pnl_pct'), _dumps(trade))
+            for trade in closed
+        ]
+        upsert_analytics = [(scope, _dumps(state)) for scope, state in (analytics or {}).items() if state is not None]
+        deleted_analytics = [(scope,) for scope, state in (analytics or {}).items() if state is None]
+        
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO positions (symbol, timeframe, data) VALUES (?, ?, ?)', upsert_positions)
+            self._db.executemany('INSERT OR REPLACE INTO statistics (symbol, data) VALUES (?, ?)', upsert_statistics)
+            self._db.executemany('DELETE FROM statistics WHERE symbol = ?', deleted_statistics)
+            self._db.executemany(
+                'INSERT INTO trades (symbol, timeframe, exit_time, exit_reason, pnl_pct, data) VALUES (?, ?, ?, ?, ?, ?)',
+                trades
+            )
+            self._db.executemany('INSERT OR REPLACE INTO analytics (scope, data) VALUES (?, ?)', upsert_analytics)
+            self._db.executemany('DELETE FROM analytics WHERE scope = ?', deleted_analytics)
+        
+        self.saves += 1
+        self.rows_written += (len(upsert_positions) + len(upsert_statistics) + len(deleted_statistics) + len(trades)
+                              + len(upsert_analytics) + len(deleted_analytics))
+        self.last_save_ms = (time.perf_counter() - started) * 1000
+    
+    def trades(self, symbol: str = None, limit: int = 100, timeframe: Optional[str] = None) -> List[Dict]:
+        """Retorna as operações fechadas mais recentes (de um símbolo e timeframe, se informados)"""
+        if symbol and timeframe:
+            rows = self._db.execute(
+                'SELECT data FROM trades WHERE symbol = ? AND timeframe = ? ORDER BY id DESC LIMIT ?',
+                (symbol, timeframe, limit)
+            )
+        elif timeframe:
+            rows = self._db.execute('SELECT data FROM trades WHERE timeframe = ? ORDER BY id DESC LIMIT ?', (timeframe, limit))
+        elif symbol:
+            rows = self._db.execute('SELECT data FROM trades WHERE symbol = ? ORDER BY id DESC LIMIT ?', (symbol, limit))
+        else:
+            rows = self._db.execute('SELECT data FROM trades ORDER BY id DESC LIMIT ?', (limit,))
+        return [json.loads(data) for data, in rows]
+    
+    def close(self):
+        self._db.close()
+    
+    def get_stats(self) -> Dict:
+        """Retorna o tamanho do histórico e os tempos de carga e gravação"""
+        # As operações nunca são apagadas, então o maior id é o total
+        trades = self._db.execute('SELECT MAX(id) FROM trades').fetchone()[0] or 0
+        return {
+            'path': self.path,
+            'trades': trades,
+            'saves': self.saves,
+            'rows_written': self.rows_written,
+            'last_save_ms': self.last_save_ms,
+            'load_ms': self.load_ms
+        }
@@ -0,0 +1,216 @@
+"""
+Agendador central das requisições à exchange
+Balde de tokens por peso de requisição, com classes de prioridade e fila limitada
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+# Classes de prioridade (menor valor = atendida primeiro)
+PRIORITY_MONITOR = 0
+PRIORITY_API = 1
+PRIORITY_CHART = 2
+PRIORITY_BACKFILL = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_MONITOR: 'monitor',
+    PRIORITY_API: 'api',
+    PRIORITY_CHART: 'chart',
+    PRIORITY_BACKFILL: 'backfill'
+}
+
+
+class QueueFullError(Exception):
+    """A fila do agendador está cheia; a requisição foi recusada"""
+
+
+class RequestScheduler:
+    """
+    Libera requisições conforme o limite de peso da exchange
+    
+    O balde tem `weight_limit` tokens e é reabastecido continuamente à taxa
+    de `weight_limit / interval` por segundo; cada requisição consome o seu
+    peso. As requisições aguardam numa fila única ordenada por prioridade e
+    ordem de chegada: enquanto houver uma requisição do monitoramento na
+    fila, nenhuma de menor prioridade é liberada. O número de requisições
+    simultâneas também é limitado. Com a fila cheia, novas requisições são
+    recusadas com QueueFullError em vez de acumular.
+    
+    Configuração por variáveis de ambiente:
+        EXCHANGE_WEIGHT_LIMIT: peso permitido por intervalo (padrão 6000, limite da Binance)
+        EXCHANGE_WEIGHT_INTERVAL: intervalo do limite em segundos (padrão 60)
+        EXCHANGE_MAX_QUEUE: requisições aguardando na fila (padrão 1000)
+    """
+    
+    def __init__(self,
+                 weight_limit: Optional[float] = None,
+                 interval: Optional[float] = None,
+                 concurrency: int = 20,
+                 max_queue: Optional[int] = None,
+                 history: int = 1000,
+                 shared_limit: Optional[float] = None):
+        """
+        Inicializa o agendador
+        
+        Args:
+            weight_limit: Peso total permitido por intervalo
+            interval: Duração do intervalo em segundos
+            concurrency: Máximo de requisições simultâneas
+            max_queue: Máximo de requisições aguardando
+            history: Número de esperas usadas nas estatísticas
+            shared_limit: Limite total do IP quando ele é dividido entre
+                vários processos (padrão: weight_limit). O peso usado
+                informado pela exchange é do IP inteiro e é comparado com ele.
+        """
+        self.weight_limit = weight_limit or float(os.getenv("EXCHANGE_WEIGHT_LIMIT", "6000"))
+        self.interval = interval or float(os.getenv("EXCHANGE_WEIGHT_INTERVAL", "60"))
+        self.concurrency = concurrency
+        self.max_queue = max_queue or int(os.getenv("EXCHANGE_MAX_QUEUE", "1000"))
+        self.rate = self.weight_limit / self.interval
+        self.shared_limit = shared_limit or self.weight_limit
+        
+        self.tokens = self.weight_limit
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self._queue: List[tuple] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        
+        self.max_queue_depth = 0
+        self.throttled = 0
+        self.counters = {
+            priority: {'dispatched': 0, 'rejected': 0, 'waits': deque(maxlen=history)}
+            for priority in PRIORITY_NAMES
+        }
+    
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.weight_limit, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def _dispatch(self):
+        """Libera as requisições da frente da fila enquanto houver tokens e vagas"""
+        self._refill()
+        
+        while self._queue and self.in_flight < self.concurrency:
+            priority, _, weight, enqueued, future = self._queue[0]
+            if future.done():
+                # Requisição cancelada enquanto aguardava
+                heapq.heappop(self._queue)
+                continue
+            
+            if self.tokens < weight:
+                if self._timer is None:
+                    delay = (weight - self.tokens) / self.rate
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                return
+            
+            heapq.heappop(self._queue)
+            self.tokens -= weight
+            self.in_flight += 1
+            counters = self.counters[priority]
+            counters['dispatched'] += 1
+            counters['waits'].append(time.monotonic() - enqueued)
+            future.set_result(None)
+    
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+    
+    def _release(self):
+        self.in_flight -= 1
+        self._dispatch()
+    
+    @asynccontextmanager
+    async def request(self, weight: float = 1, priority: int = PRIORITY_API):
+        """
+        Aguarda a vez de uma requisição e mantém a vaga enquanto ela roda
+        
+        Args:
+            weight: Peso da requisição no limite da exchange
+            priority: PRIORITY_MONITOR, PRIORITY_API, PRIORITY_CHART ou PRIORITY_BACKFILL
+            
+        Raises:
+            QueueFullError: Se a fila estiver cheia
+        """
+        weight = min(weight, self.weight_limit)
+        if len(self._queue) >= self.max_queue:
+            self.counters[priority]['rejected'] += 1
+            raise QueueFullError(f"Fila de requisições cheia ({self.max_queue})")
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._counter), weight, time.monotonic(), future))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._dispatch()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Cancelada depois de liberada: devolve a vaga
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        
+        try:
+            yield
+        finally:
+            self._release()
+    
+    def sync_used_weight(self, used: float):
+        """
+        Ajusta o balde ao peso já usado informado pela exchange (ex: X-MBX-USED-WEIGHT-1M)
+        
+        O peso usado é do IP inteiro; com o limite dividido entre processos,
+        cada um fica com a sua fração do que resta do limite total.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, (self.shared_limit - used) * self.weight_limit / self.shared_limit)
+    
+    def throttle(self, seconds: float):
+        """Suspende as requisições por alguns segundos (após um erro de limite da exchange)"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+        self.throttled += 1
+    
+    def get_stats(self) -> Dict:
+        """Retorna tokens disponíveis, profundidade da fila e esperas por prioridade"""
+        self._refill()
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, _, future in self._queue:
+            if not future.done():
+                queued[PRIORITY_NAMES[priority]] += 1
+        
+        priorities = {}
+        for priority, counters in self.counters.items():
+            waits = counters['waits']
+            priorities[PRIORITY_NAMES[priority]] = {
+                'queued': queued[PRIORITY_NAMES[priority]],
+                'dispatched': counters['dispatched'],
+                'rejected': counters['rejected'],
+                'wait_ms': {
+                    'mean': sum(waits) / len(waits) * 1000 if waits else 0.0,
+                    'max': max(waits) * 1000 if waits else 0.0
+                }
+            }
+        
+        return {
+            'weight_limit': self.weight_limit,
+            'shared_limit': self.shared_limit,
+            'interval_s': self.interval,
+            'tokens': self.tokens,
+            'in_flight': self.in_flight,
+            'queue_depth': sum(queued.values()),
+            'max_queue_depth': self.max_queue_depth,
+            'max_queue': self.max_queue,
+            'throttled': self.throttled,
+            'priorities': priorities
+        }
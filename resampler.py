@@ -0,0 +1,260 @@
+"""
+Derivação de timeframes a partir de uma série base (1m ou 5m)
+As velas maiores são agregadas localmente e de forma incremental
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+import ccxt
+import pandas as pd
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def timeframe_ms(timeframe: str) -> int:
+    """Duração de um timeframe em milissegundos"""
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def closed_candles(df: pd.DataFrame, timeframe: str, now: int) -> pd.DataFrame:
+    """
+    Apenas as velas já fechadas no horário `now` (ms)
+    
+    Descarta a vela em formação (a que abriu há menos de um período), para
+    que o sinal seja calculado sobre a vela que acabou de fechar.
+    """
+    if len(df) == 0:
+        return df
+    ends = df['timestamp'].astype('datetime64[ms]').astype('int64') + timeframe_ms(timeframe)
+    closed = (ends <= now).to_numpy()
+    return df if closed.all() else df[closed]
+
+
+def _merge(bar: List, candle: List) -> List:
+    """Agrega uma vela base a uma vela do timeframe maior"""
+    return [
+        bar[0],
+        bar[1],
+        max(bar[2], candle[2]),
+        min(bar[3], candle[3]),
+        candle[4],
+        bar[5] + candle[5]
+    ]
+
+
+class _TimeframeState:
+    """Velas derivadas de um timeframe para um símbolo"""
+    
+    def __init__(self, period_ms: int, max_bars: int):
+        self.period_ms = period_ms
+        self.history: List[List] = []               # velas da exchange anteriores à série base
+        self.bars: deque = deque(maxlen=max_bars)   # velas agregadas da série base
+        self.committed: Optional[List] = None       # vela atual sem a última vela base
+    
+    def bucket(self, timestamp: int) -> int:
+        return timestamp - timestamp % self.period_ms
+    
+    def apply(self, candle: List, revision: bool):
+        """
+        Aplica uma vela base nova ou a revisão da última vela base
+        
+        O parcial `committed` guarda a vela em formação sem a última vela
+        base, então uma revisão (mesmo timestamp, preço diferente) é
+        reaplicada em O(1) sem somar o volume duas vezes.
+        """
+        bucket = self.bucket(candle[0])
+        current = self.bars[-1] if self.bars else None
+        
+        if current is None or current[0] != bucket:
+            self.committed = None
+            self.bars.append([bucket] + list(candle[1:]))
+            return
+        
+        if not revision:
+            self.committed = current
+        if self.committed is None:
+            self.bars[-1] = [bucket] + list(candle[1:])
+        else:
+            self.bars[-1] = _merge(self.committed, candle)
+    
+    def rows(self) -> List[List]:
+        return self.history + list(self.bars)
+
+
+class CandleResampler:
+    """
+    Mantém uma série base por símbolo e deriva velas de timeframes maiores
+    
+    Cada vela base atualiza todos os timeframes do símbolo em O(1); adicionar
+    um timeframe custa apenas CPU. O histórico anterior à série base pode ser
+    carregado uma vez por timeframe (load_history); as velas a partir do
+    início da série base são sempre derivadas dela.
+    """
+    
+    def __init__(self, base_timeframe: str = '1m', max_bars: int = 1000, base_limit: int = 1500):
+        """
+        Inicializa o resampler
+        
+        Args:
+            base_timeframe: Timeframe da série base (ex: 1m, 5m)
+            max_bars: Máximo de velas guardadas por timeframe derivado
+            base_limit: Máximo de velas base guardadas por símbolo
+        """
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_ms(base_timeframe)
+        self.max_bars = max_bars
+        self.base_limit = base_limit
+        self._base: Dict[str, deque] = {}
+        self._timeframes: Dict[str, Dict[str, _TimeframeState]] = {}
+    
+    def check_timeframe(self, timeframe: str) -> int:
+        """Valida o timeframe derivado e retorna sua duração em ms"""
+        period = timeframe_ms(timeframe)
+        if timeframe[-1] in ('w', 'M') or period < self.base_ms or period % self.base_ms != 0:
+            raise ValueError(
+                f"Timeframe {timeframe} não pode ser derivado de {self.base_timeframe} "
+                "(deve ser múltiplo da base e menor que 1w)"
+            )
+        return period
+    
+    def has_base(self, symbol: str) -> bool:
+        return bool(self._base.get(symbol))
+    
+    def has_timeframe(self, symbol: str, timeframe: str) -> bool:
+        return timeframe in self._timeframes.get(symbol, {})
+    
+    def first_base_timestamp(self, symbol: str) -> Optional[int]:
+        """Timestamp (ms) da primeira vela base guardada do símbolo"""
+        base = self._base.get(symbol)
+        return base[0][0] if base else None
+    
+    def last_base_timestamp(self, symbol: str) -> Optional[int]:
+        """Timestamp (ms) da última vela base do símbolo"""
+        base = self._base.get(symbol)
+        return base[-1][0] if base else None
+    
+    def bucket_start(self, timestamp: int, timeframe: str) -> int:
+        """Início (ms) da vela do timeframe que contém o timestamp"""
+        period = self.check_timeframe(timeframe)
+        return timestamp - timestamp % period
+    
+    def update(self, symbol: str, candles: Iterable[List]) -> int:
+        """
+        Adiciona velas base no formato ccxt [timestamp, open, high, low, close, volume]
+        
+        Velas mais antigas que a última são ignoradas; uma vela com o mesmo
+        timestamp da última é tratada como revisão (vela em formação).
+        
+        Returns:
+            Número de velas novas
+        """
+        base = self._base.setdefault(symbol, deque(maxlen=self.base_limit))
+        states = self._timeframes.get(symbol, {})
+        added = 0
+        
+        for candle in candles:
+            candle = [int(candle[0])] + [float(value) for value in candle[1:6]]
+            last = base[-1][0] if base else None
+            
+            if last is not None and candle[0] < last:
+                continue
+            revision = candle[0] == last
+            if revision:
+                base[-1] = candle
+            else:
+                base.append(candle)
+                added += 1
+            
+            for state in states.values():
+                state.apply(candle, revision)
+        
+        return added
+    
+    def prepend(self, symbol: str, candles: Iterable[List]) -> int:
+        """
+        Adiciona velas base anteriores à primeira guardada
+        
+        Usado antes de load_history quando a vela atual de um novo timeframe
+        começa antes da série base. Os timeframes já registrados não mudam.
+        
+        Returns:
+            Número de velas adicionadas
+        """
+        base = self._base.setdefault(symbol, deque(maxlen=self.base_limit))
+        first = base[0][0] if base else None
+        older = [
+            [int(candle[0])] + [float(value) for value in candle[1:6]]
+            for candle in candles
+            if first is None or candle[0] < first
+        ]
+        older = list({candle[0]: candle for candle in older}.values())
+        
+        self._base[symbol] = deque(sorted(older) + list(base), maxlen=self.base_limit)
+        return len(older)
+    
+    def load_history(self, symbol: str, timeframe: str, candles: Iterable[List]):
+        """
+        Registra o timeframe para o símbolo com o histórico buscado na exchange
+        
+        Apenas as velas anteriores à primeira vela totalmente coberta pela
+        série base são usadas; dali em diante as velas são derivadas da base.
+        Para que a vela em formação também seja derivada, a série base deve
+        começar no início da vela atual do timeframe (ver bucket_start).
+        """
+        period = self.check_timeframe(timeframe)
+        state = _TimeframeState(period, self.max_bars)
+        base = self._base.get(symbol, ())
+        
+        first_derived = None
+        if base:
+            first = base[0][0]
+            first_derived = state.bucket(first) if first % period == 0 else state.bucket(first) + period
+        
+        state.history = [
+            [int(candle[0])] + [float(value) for value in candle[1:6]]
+            for candle in candles
+            if first_derived is None or candle[0] < first_derived
+        ][-self.max_bars:]
+        
+        for candle in base:
+            if first_derived is not None and candle[0] >= first_derived:
+                state.apply(candle, revision=False)
+        
+        self._timeframes.setdefault(symbol, {})[timeframe] = state
+    
+    def add_timeframe(self, symbol: str, timeframe: str):
+        """Registra o timeframe sem histórico (apenas velas derivadas da base)"""
+        self.load_history(symbol, timeframe, [])
+    
+    def get_ohlcv(self, symbol: str, timeframe: str, limit: int = 100) -> pd.DataFrame:
+        """
+        Velas do timeframe no mesmo formato de fetch_ohlcv (a última pode estar em formação)
+        
+        Args:
+            symbol: Símbolo do ativo
+            timeframe: Timeframe registrado com load_history/add_timeframe
+            limit: Número máximo de velas
+        """
+        if timeframe == self.base_timeframe:
+            rows = list(self._base.get(symbol, ()))
+        else:
+            state = self._timeframes.get(symbol, {}).get(timeframe)
+            if state is None:
+                raise KeyError(f"Timeframe {timeframe} não registrado para {symbol}")
+            rows = state.rows()
+        
+        df = pd.DataFrame(rows[-limit:], columns=OHLCV_COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+    
+    def get_stats(self) -> Dict:
+        """Retorna o número de símbolos e de velas guardadas"""
+        return {
+            'base_timeframe': self.base_timeframe,
+            'symbols': len(self._base),
+            'base_candles': sum(len(base) for base in self._base.values()),
+            'timeframes': {
+                symbol: sorted(states, key=timeframe_ms)
+                for symbol, states in self._timeframes.items()
+            }
+        }
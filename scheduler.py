@@ -0,0 +1,185 @@
+"""
+Agendador do monitoramento alinhado ao fechamento das velas
+"""
+import asyncio
+import math
+import os
+import statistics
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+import ccxt
+
+
+class CandleScheduler:
+    """
+    Acorda o monitoramento no início de cada vela do timeframe
+    
+    O próximo ciclo é agendado para a próxima fronteira de vela (alinhada ao
+    horário UTC, como na exchange) mais um atraso de acomodação, para a
+    exchange publicar a vela nova. Opcionalmente também acorda em intervalos
+    fixos dentro da vela. Como o horário é absoluto, a duração do ciclo não
+    acumula atraso. O relógio pode ser o da exchange (ex: replay acelerado);
+    nesse caso as esperas reais são divididas pela velocidade dele.
+    
+    Configuração por variáveis de ambiente:
+        SCHEDULER_SETTLE_DELAY: segundos após a fronteira da vela (padrão 2)
+        SCHEDULER_INTRA_CANDLE: intervalo em segundos dentro da vela (padrão 0 = desativado)
+    """
+    
+    def __init__(self,
+                 timeframe: str,
+                 settle_delay: Optional[float] = None,
+                 intra_candle: Optional[float] = None,
+                 history: int = 100,
+                 clock: Callable[[], float] = time.time,
+                 speed: float = 1.0):
+        """
+        Inicializa o agendador
+        
+        Args:
+            timeframe: Timeframe das velas (ex: 15m, 1h)
+            settle_delay: Atraso em segundos após a fronteira da vela
+            intra_candle: Intervalo em segundos entre ciclos dentro da vela (0 = apenas no fechamento)
+            history: Número de ciclos usados nas estatísticas
+            clock: Horário atual em segundos (epoch)
+            speed: Velocidade do relógio em relação ao real
+        """
+        self.timeframe = timeframe
+        self.clock = clock
+        self.speed = speed
+        self.period = ccxt.Exchange.parse_timeframe(timeframe)
+        self.settle_delay = settle_delay if settle_delay is not None else float(os.getenv("SCHEDULER_SETTLE_DELAY", "2"))
+        self.intra_candle = intra_candle if intra_candle is not None else float(os.getenv("SCHEDULER_INTRA_CANDLE", "0"))
+        if self.intra_candle >= self.period:
+            self.intra_candle = 0
+        
+        self.cycles = 0
+        self.next_run_at: Optional[float] = None
+        self.jitter: deque = deque(maxlen=history)
+        self.durations: deque = deque(maxlen=history)
+    
+    def next_run(self, now: Optional[float] = None) -> float:
+        """Horário (epoch em segundos) do próximo ciclo após `now`"""
+        now = self.clock() if now is None else now
+        step = self.intra_candle or self.period
+        
+        # Fronteiras de vela e, se configurado, os passos intermediários dentro dela
+        candle_start = math.floor((now - self.settle_delay) / self.period) * self.period
+        steps = math.floor((now - self.settle_delay - candle_start) / step) + 1
+        candidate = candle_start + steps * step
+        next_candle = candle_start + self.period
+        
+        return min(candidate, next_candle) + self.settle_delay
+    
+    def at_candle_close(self, run_at: float) -> bool:
+        """Se o ciclo de `run_at` é o do fechamento de uma vela (e não um intermediário)"""
+        offset = (run_at - self.settle_delay) % self.period
+        return min(offset, self.period - offset) < 1e-3
+    
+    async def wait(self) -> float:
+        """
+        Dorme até o próximo ciclo e registra o atraso em relação ao horário agendado
+        
+        Returns:
+            Atraso (jitter) em segundos reais
+        """
+        return await self.wait_until(self.next_run())
+    
+    async def wait_until(self, run_at: float) -> float:
+        """Dorme até o horário `run_at` (epoch em segundos) e registra o jitter"""
+        self.next_run_at = run_at
+        await asyncio.sleep(max(run_at - self.clock(), 0) / self.speed)
+        
+        jitter = (self.clock() - run_at) / self.speed
+        self.jitter.append(jitter)
+        return jitter
+    
+    def record_cycle(self, duration: float):
+        """Registra a duração (em segundos) de um ciclo"""
+        self.cycles += 1
+        self.durations.append(duration)
+    
+    def get_stats(self) -> Dict:
+        """Retorna o jitter de início e a duração dos ciclos (em ms)"""
+        jitter = list(self.jitter)
+        durations = list(self.durations)
+        return {
+            'timeframe': self.timeframe,
+            'settle_delay_s': self.settle_delay,
+            'intra_candle_s': self.intra_candle,
+            'cycles': self.cycles,
+            'next_run': datetime.fromtimestamp(self.next_run_at).isoformat() if self.next_run_at else None,
+            'jitter_ms': {
+                'last': jitter[-1] * 1000 if jitter else 0.0,
+                'mean': statistics.fmean(jitter) * 1000 if jitter else 0.0,
+                'max': max(jitter) * 1000 if jitter else 0.0
+            },
+            'duration_ms': {
+                'last': durations[-1] * 1000 if durations else 0.0,
+                'mean': statistics.fmean(durations) * 1000 if durations else 0.0,
+                'max': max(durations) * 1000 if durations else 0.0
+            }
+        }
+
+
+class MultiTimeframeScheduler:
+    """
+    Um CandleScheduler por timeframe, acordando no próximo ciclo de qualquer um deles
+    
+    Timeframes cujas fronteiras coincidem (ex: 15m e 1h na virada da hora)
+    acordam juntos, então o ciclo pode buscar as velas uma única vez para
+    todos eles. `forming` tem os timeframes do último ciclo que acordaram
+    num intervalo dentro da vela; nos demais (fechamento da vela e primeiro
+    ciclo) só as velas fechadas devem ser analisadas.
+    """
+    
+    def __init__(self,
+                 timeframes: List[str],
+                 clock: Callable[[], float] = time.time,
+                 speed: float = 1.0):
+        """
+        Args:
+            timeframes: Timeframes monitorados (ex: ['15m', '1h'])
+            clock: Horário atual em segundos (epoch)
+            speed: Velocidade do relógio em relação ao real
+        """
+        self.clock = clock
+        self.forming: Set[str] = set()
+        self.schedulers: Dict[str, CandleScheduler] = {
+            timeframe: CandleScheduler(timeframe, clock=clock, speed=speed)
+            for timeframe in timeframes
+        }
+    
+    @property
+    def timeframes(self) -> List[str]:
+        return list(self.schedulers)
+    
+    async def wait(self) -> List[str]:
+        """
+        Dorme até o próximo ciclo
+        
+        Returns:
+            Timeframes cujo ciclo chegou
+        """
+        now = self.clock()
+        runs = {timeframe: scheduler.next_run(now) for timeframe, scheduler in self.schedulers.items()}
+        run_at = min(runs.values())
+        due = [timeframe for timeframe, at in runs.items() if at <= run_at + 1e-6]
+        
+        jitter = await self.schedulers[due[0]].wait_until(run_at)
+        for timeframe in due[1:]:
+            self.schedulers[timeframe].next_run_at = run_at
+            self.schedulers[timeframe].jitter.append(jitter)
+        self.forming = {timeframe for timeframe in due if not self.schedulers[timeframe].at_candle_close(run_at)}
+        return due
+    
+    def record_cycle(self, timeframe: str, duration: float):
+        """Registra a duração (em segundos) do ciclo de um timeframe"""
+        self.schedulers[timeframe].record_cycle(duration)
+    
+    def get_stats(self) -> Dict:
+        """Retorna as estatísticas de cada timeframe"""
+        return {timeframe: scheduler.get_stats() for timeframe, scheduler in self.schedulers.items()}
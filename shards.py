@@ -0,0 +1,465 @@
+"""
+Monitoramento dividido entre vários processos (shards)
+
+Os símbolos monitorados são divididos entre N workers. Cada worker tem seu
+próprio cliente da exchange, indicador e estratégia, roda o ciclo busca →
+indicador → estratégia para a sua parte dos símbolos (em todos os
+timeframes monitorados, cada um no seu ritmo) e envia os sinais,
+alertas e posições ao coordenador na API. A comunicação usa
+multiprocessing.connection (TCP com chave), então os workers podem ser
+processos locais iniciados pela API ou rodar em outras máquinas:
+    
+    python shards.py --coordinator 10.0.0.5:7100 --authkey segredo --shard 2 --shards 4
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from exchange_client import ExchangeClient
+from indicator import GCMIndicator
+from rate_limiter import RequestScheduler, PRIORITY_MONITOR
+from resampler import timeframe_ms
+from scheduler import MultiTimeframeScheduler
+from trading import AlertMonitor, PositionManager, TradingStrategy
+
+
+def shard_of(symbol: str, shards: int) -> int:
+    """Shard responsável pelo símbolo (estável entre processos e execuções)"""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    """Converte 'host:porta' em (host, porta)"""
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+# ==================== WORKER ====================
+
+class ShardWorker:
+    """
+    Worker de um shard: monitora a sua parte dos símbolos
+    
+    Recebe do coordenador os símbolos, os timeframes e a configuração das
+    posições; a cada vela de cada timeframe busca as velas, calcula os
+    sinais em lote, aplica a estratégia e envia um relatório. O limite de peso da exchange é
+    dividido igualmente entre os shards; o peso usado informado pela
+    exchange (do IP inteiro) é comparado com o limite total.
+    """
+    
+    def __init__(self, connection: Connection, shard: int, shards: int):
+        self.connection = connection
+        self.shard = shard
+        self.shards = shards
+        
+        shared_limit = float(os.getenv("EXCHANGE_WEIGHT_LIMIT", "6000"))
+        concurrency = int(os.getenv("EXCHANGE_CONCURRENCY", "20"))
+        self.exchange = ExchangeClient(scheduler=RequestScheduler(
+            weight_limit=shared_limit / shards,
+            concurrency=concurrency,
+            shared_limit=shared_limit
+        ))
+        self.indicator = GCMIndicator()
+        self.position_manager = PositionManager(stop_loss_pct=2.0, take_profit_pct=3.0)
+        self.alert_monitor = AlertMonitor()
+        self.strategy = TradingStrategy(self.position_manager, self.alert_monitor)
+        
+        self.symbols: List[str] = []
+        self.timeframes: List[str] = ['15m']
+        self.last_candle: Dict[tuple, tuple] = {}
+        self.configured = asyncio.Event()
+        self.cycles = 0
+    
+    async def run(self):
+        """Processa comandos e roda os ciclos até receber 'stop'"""
+        await self.exchange.start()
+        self._send({'type': 'hello', 'shard': self.shard, 'pid': os.getpid(), 'host': socket.gethostname()})
+        cycles = asyncio.create_task(self._cycles())
+        try:
+            await self._commands()
+        finally:
+            cycles.cancel()
+            try:
+                await cycles
+            except asyncio.CancelledError:
+                pass
+            await self.exchange.close()
+    
+    async def _commands(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                message = await loop.run_in_executor(None, self.connection.recv)
+            except (EOFError, OSError):
+                return
+            
+            if message['type'] == 'stop':
+                return
+            if message['type'] == 'config':
+                self.symbols = message['symbols']
+                self.timeframes = message['timeframes']
+                self.position_manager.stop_loss_pct = message['stop_loss_pct']
+                self.position_manager.take_profit_pct = message['take_profit_pct']
+                if 'state' in message:
+                    self.position_manager.merge(message['state']['positions'], message['state']['statistics'])
+                self.configured.set()
+            elif message['type'] == 'close':
+                self._close_position(message['symbol'], message['timeframe'], message['price'])
+    
+    def _close_position(self, symbol: str, timeframe: str, price: float):
+        position = self.position_manager.get_position(symbol, timeframe)
+        if position and position['status'] == 'OPEN':
+            self.position_manager.close_position(symbol, price, 'MANUAL', timeframe)
+    
+    async def _cycles(self):
+        await self.configured.wait()
+        scheduler = None
+        due: List[str] = []
+        while True:
+            if scheduler is None or scheduler.timeframes != self.timeframes:
+                scheduler = MultiTimeframeScheduler(self.timeframes, clock=self.exchange.clock, speed=self.exchange.speed)
+                due = scheduler.timeframes
+            
+            started = time.perf_counter()
+            results = []
+            for timeframe in due:
+                try:
+                    results += await self.run_cycle(list(self.symbols), timeframe, closed_only=timeframe not in scheduler.forming)
+                except Exception as e:
+                    print(f"[shard {self.shard}] Erro no ciclo {timeframe}: {str(e)}")
+            duration = time.perf_counter() - started
+            self.cycles += 1
+            
+            symbols = set(self.symbols)
+            self._send({
+                'type': 'report',
+                'shard': self.shard,
+                'cycle': self.cycles,
+                'timeframes': due,
+                'duration_s': duration,
+                'results': results,
+                'positions': {key: position for key, position in self.position_manager.positions.items() if key[0] in symbols},
+                'statistics': {symbol: stats for symbol, stats in self.position_manager.statistics.items() if symbol in symbols},
+                'timestamp': datetime.now().isoformat()
+            })
+            due = await scheduler.wait()
+    
+    async def run_cycle(self, symbols: List[str], timeframe: str, closed_only: bool = False) -> List[Dict]:
+        """
+        Busca → indicador → estratégia para os símbolos do shard
+        
+        Com closed_only=True (ciclos no fechamento da vela) a vela em
+        formação é descartada, como em main.analyze_symbols.
+        """
+        async def fetch(symbol):
+            try:
+                return await self.exchange.fetch_ohlcv(symbol, timeframe, limit=100, priority=PRIORITY_MONITOR)
+            except Exception as e:
+                print(f"[shard {self.shard}] Erro ao buscar dados para {symbol}: {str(e)}")
+                return None
+        
+        candles = await asyncio.gather(*[fetch(symbol) for symbol in symbols])
+        
+        if closed_only:
+            # Mesmo critério de resampler.closed_candles
+            now = self.exchange.milliseconds()
+            period = timeframe_ms(timeframe)
+            candles = [[row for row in ohlcv if row[0] + period <= now] if ohlcv else ohlcv for ohlcv in candles]
+        
+        candles_by_symbol = dict(zip(symbols, candles))
+        frames = {}
+        results = []
+        for symbol, ohlcv in zip(symbols, candles):
+            if not ohlcv:
+                results.append({'symbol': symbol, 'timeframe': timeframe, 'error': 'Não foi possível buscar dados', 'success': False})
+                continue
+            # Vela sem alteração desde o ciclo anterior não passa pela estratégia
+            if self.last_candle.get((symbol, timeframe)) == tuple(ohlcv[-1]):
+                results.append({'symbol': symbol, 'timeframe': timeframe, 'success': True, 'skipped': True})
+                continue
+            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            frames[symbol] = df
+        
+        if frames:
+            signals = self.indicator.calculate_frames(frames).to_dict(orient='index')
+            for symbol, df in frames.items():
+                price = float(df['close'].iloc[-1])
+                candle_timestamp = int(df['timestamp'].iloc[-1].timestamp() * 1000)
+                action = self.strategy.process_signal(symbol, signals[symbol], price, candle_timestamp, timeframe)
+                # Registrada só depois de processada: se algo falhar, a vela é tentada de novo
+                self.last_candle[(symbol, timeframe)] = tuple(candles_by_symbol[symbol][-1])
+                results.append({
+                    'symbol': symbol,
+                    'timeframe': timeframe,
+                    'success': True,
+                    'price': price,
+                    'signal': signals[symbol],
+                    'strategy_action': action,
+                    'timestamp': datetime.now().isoformat()
+                })
+        
+        return results
+    
+    def _send(self, message: Dict):
+        self.connection.send(message)
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes, shard: int, shards: int):
+    """Ponto de entrada do processo worker"""
+    connection = Client(address, authkey=authkey)
+    try:
+        asyncio.run(ShardWorker(connection, shard, shards).run())
+    finally:
+        connection.close()
+
+
+# ==================== COORDENADOR ====================
+
+class ShardCoordinator:
+    """
+    Divide os símbolos entre os shards e recebe os relatórios deles
+    
+    Escuta conexões dos workers (locais ou remotos), envia a cada um a sua
+    parte dos símbolos e entrega os relatórios ao event loop da API pela
+    função `on_report`. Cada conexão tem uma thread de leitura; os envios
+    são feitos com uma trava por conexão.
+    
+    Configuração por variáveis de ambiente:
+        SHARD_COORDINATOR: endereço host:porta do coordenador (padrão 127.0.0.1:0, porta livre)
+        SHARD_AUTHKEY: chave dos workers (padrão: aleatória, apenas workers locais)
+        SHARD_LOCAL_WORKERS: workers iniciados pela API (padrão: todos os shards)
+    """
+    
+    def __init__(self,
+                 shards: int,
+                 on_report: Callable[[int, Dict], None],
+                 address: Optional[str] = None,
+                 authkey: Optional[str] = None,
+                 local_workers: Optional[int] = None,
+                 state: Optional[Callable[[List[str]], Dict]] = None):
+        """
+        Args:
+            shards: Número de shards
+            on_report: Chamada no event loop da API com (shard, relatório)
+            address: Endereço host:porta de escuta
+            authkey: Chave compartilhada com os workers
+            local_workers: Quantos shards rodam em processos locais
+            state: Retorna as posições e estatísticas salvas de uma lista de
+                símbolos; enviadas ao shard quando ele conecta
+        """
+        self.shards = shards
+        self.on_report = on_report
+        self.state = state
+        self.address = parse_address(address or os.getenv("SHARD_COORDINATOR") or "127.0.0.1:0")
+        self.authkey = (authkey or os.getenv("SHARD_AUTHKEY") or secrets.token_hex(16)).encode()
+        self.local_workers = local_workers if local_workers is not None else int(os.getenv("SHARD_LOCAL_WORKERS") or shards)
+        
+        self.config: Dict = {}
+        self._listener: Optional[Listener] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connections: Dict[int, Connection] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._processes: List[subprocess.Popen] = []
+        self.info: Dict[int, Dict] = {}
+    
+    @property
+    def running(self) -> bool:
+        return self._listener is not None
+    
+    def start(self, symbols: List[str], timeframes: List[str], stop_loss_pct: float, take_profit_pct: float):
+        """Abre o coordenador e inicia os workers locais (chamado no event loop da API)"""
+        self.configure(symbols, timeframes, stop_loss_pct, take_profit_pct)
+        if self.running:
+            return
+        
+        self._loop = asyncio.get_running_loop()
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.address = self._listener.address
+        threading.Thread(target=self._accept, daemon=True).start()
+        
+        # Os workers locais rodam este arquivo como script, igual aos remotos:
+        # com multiprocessing (spawn) cada um reimportaria o __main__ da API
+        # (main.py) e repetiria a inicialização dela. A chave vai pelo
+        # ambiente para não aparecer na linha de comando.
+        host, port = self.address
+        environment = dict(os.environ, SHARD_AUTHKEY=self.authkey.decode())
+        for shard in range(min(self.local_workers, self.shards)):
+            self._processes.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__),
+                 '--coordinator', f'{host}:{port}', '--shard', str(shard), '--shards', str(self.shards)],
+                env=environment
+            ))
+    
+    async def stop(self, timeout: float = 5.0):
+        """Para os workers e fecha o coordenador, sem bloquear o event loop enquanto eles terminam"""
+        for shard in list(self._connections):
+            self.send(shard, {'type': 'stop'})
+        
+        processes, self._processes = self._processes, []
+        deadline = time.monotonic() + timeout
+        while any(process.poll() is None for process in processes) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+            await asyncio.to_thread(process.wait)
+        
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+    
+    def configure(self, symbols: List[str], timeframes: List[str], stop_loss_pct: float, take_profit_pct: float):
+        """Atualiza símbolos, timeframes e posições e envia a cada shard a sua parte"""
+        self.config = {
+            'symbols': list(symbols),
+            'timeframes': list(timeframes),
+            'stop_loss_pct': stop_loss_pct,
+            'take_profit_pct': take_profit_pct
+        }
+        for shard in list(self._connections):
+            self._send_config(shard)
+    
+    def symbols_of(self, shard: int) -> List[str]:
+        return [symbol for symbol in self.config.get('symbols', []) if shard_of(symbol, self.shards) == shard]
+    
+    def _send_config(self, shard: int):
+        self.send(shard, {'type': 'config', **self.config, 'symbols': self.symbols_of(shard)})
+    
+    def send(self, shard: int, message: Dict) -> bool:
+        """Envia uma mensagem ao shard; False se ele não estiver conectado"""
+        connection = self._connections.get(shard)
+        if connection is None:
+            return False
+        try:
+            with self._locks[shard]:
+                connection.send(message)
+            return True
+        except (OSError, ValueError):
+            self._connections.pop(shard, None)
+            return False
+    
+    def close_position(self, symbol: str, timeframe: str, price: float):
+        """Repassa o fechamento manual de uma posição ao shard do símbolo"""
+        self.send(shard_of(symbol, self.shards), {'type': 'close', 'symbol': symbol, 'timeframe': timeframe, 'price': price})
+    
+    def _accept(self):
+        listener = self._listener
+        while self._listener is listener:
+            try:
+                connection = listener.accept()
+                hello = connection.recv()
+            except Exception:
+                if self._listener is not listener:
+                    return
+                continue
+            
+            shard = hello['shard']
+            if not 0 <= shard < self.shards:
+                connection.close()
+                continue
+            
+            # O estado é montado no event loop, que é quem altera as posições;
+            # esta thread só envia a mensagem pronta
+            try:
+                message = asyncio.run_coroutine_threadsafe(self._register(shard, connection, hello), self._loop).result()
+            except Exception:
+                connection.close()
+                continue
+            try:
+                connection.send(message)
+            except (OSError, ValueError):
+                pass
+            finally:
+                self._locks[shard].release()
+            threading.Thread(target=self._read, args=(shard, connection), daemon=True).start()
+    
+    async def _register(self, shard: int, connection: Connection, hello: Dict) -> Dict:
+        """
+        Registra a conexão de um shard e monta a configuração inicial dele
+        
+        A trava da conexão fica adquirida até a thread de accept enviar a
+        configuração, para que um configure() feito nesse intervalo chegue
+        depois dela.
+        """
+        lock = threading.Lock()
+        lock.acquire()
+        self._locks[shard] = lock
+        self._connections[shard] = connection
+        self.info[shard] = {
+            'host': hello['host'],
+            'pid': hello['pid'],
+            'connected_at': datetime.now().isoformat(),
+            'cycles': 0,
+            'last_report': None,
+            'last_duration_s': None
+        }
+        
+        message = {'type': 'config', **self.config, 'symbols': self.symbols_of(shard)}
+        if self.state is not None:
+            # Retoma as posições abertas e as estatísticas salvas pela API
+            message['state'] = self.state(message['symbols'])
+        return message
+    
+    def _read(self, shard: int, connection: Connection):
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                break
+            if message.get('type') == 'report':
+                self._loop.call_soon_threadsafe(self._handle_report, shard, message)
+        
+        if self._connections.get(shard) is connection:
+            del self._connections[shard]
+    
+    def _handle_report(self, shard: int, report: Dict):
+        info = self.info[shard]
+        info['cycles'] = report['cycle']
+        info['last_report'] = report['timestamp']
+        info['last_duration_s'] = report['duration_s']
+        info['last_results'] = len(report['results'])
+        try:
+            self.on_report(shard, report)
+        except Exception as e:
+            print(f"Erro ao processar relatório do shard {shard}: {str(e)}")
+    
+    def get_stats(self) -> Dict:
+        """Retorna o endereço do coordenador e o estado de cada shard"""
+        return {
+            'shards': self.shards,
+            'address': f"{self.address[0]}:{self.address[1]}",
+            'connected': len(self._connections),
+            'local_workers': len(self._processes),
+            'workers': {
+                shard: {**self.info.get(shard, {}), 'connected': shard in self._connections, 'assigned': len(self.symbols_of(shard))}
+                for shard in range(self.shards)
+            }
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Worker de um shard do monitoramento')
+    parser.add_argument('--coordinator', required=True, help='Endereço host:porta do coordenador (SHARD_COORDINATOR da API)')
+    parser.add_argument('--authkey', default=os.getenv("SHARD_AUTHKEY"), help='Chave compartilhada (SHARD_AUTHKEY da API)')
+    parser.add_argument('--shard', type=int, required=True, help='Número deste shard (0 a shards-1)')
+    parser.add_argument('--shards', type=int, required=True, help='Total de shards')
+    args = parser.parse_args()
+    if not args.authkey:
+        parser.error('informe --authkey ou SHARD_AUTHKEY')
+    run_worker(parse_address(args.coordinator), args.authkey.encode(), args.shard, args.shards)
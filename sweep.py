@@ -0,0 +1,181 @@
+"""
+Varredura de parâmetros do indicador GCM HRT
+Avalia muitas configurações sobre o mesmo histórico de velas
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicator import GCMIndicator, _heikin_ashi, _rsi, _smooth_half
+
+
+def parameter_grid(**axes) -> List[Dict]:
+    """
+    Produto cartesiano de listas de parâmetros
+    
+    Exemplo:
+        parameter_grid(len_rsi=[5, 7, 9], upper=[20, 25], lower=[-20, -25])
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def _forward_returns(close: np.ndarray, horizon: int) -> np.ndarray:
+    """Retorno percentual de cada vela até `horizon` velas à frente (NaN no final)"""
+    forward = np.full(len(close), np.nan)
+    if horizon < len(close):
+        forward[:-horizon] = (close[horizon:] / close[:-horizon] - 1) * 100
+    return forward
+
+
+def _evaluate_configs(arrays: Dict[str, np.ndarray],
+                      configs: List[Dict],
+                      horizon: int,
+                      min_strength: int) -> List[Dict]:
+    """
+    Avalia um lote de configurações sobre o mesmo histórico
+    
+    Os intermediários são compartilhados entre as configurações do lote: o
+    RSI suavizado depende apenas de len_rsi, o Heikin Ashi apenas de
+    (len_harsi, smoothing), e os limites (upper/lower/extremos) só entram nos
+    sinais de cruzamento.
+    """
+    forward = _forward_returns(arrays['close'], horizon)
+    
+    smoothed_rsi: Dict[int, np.ndarray] = {}
+    zero_rsi: Dict[tuple, np.ndarray] = {}
+    heikin_ashi: Dict[tuple, Dict] = {}
+    
+    def zrsi(source: str, period: int) -> np.ndarray:
+        if (source, period) not in zero_rsi:
+            zero_rsi[(source, period)] = _rsi(arrays[source], period) - 50
+        return zero_rsi[(source, period)]
+    
+    rows = []
+    for config in configs:
+        indicator = GCMIndicator(**config)
+        
+        if indicator.len_rsi not in smoothed_rsi:
+            smoothed_rsi[indicator.len_rsi] = _smooth_half(zrsi('close', indicator.len_rsi))
+        rsi = smoothed_rsi[indicator.len_rsi]
+        
+        ha_key = (indicator.len_harsi, indicator.smoothing)
+        if ha_key not in heikin_ashi:
+            heikin_ashi[ha_key] = _heikin_ashi(
+                zrsi('close', indicator.len_harsi),
+                zrsi('high', indicator.len_harsi),
+                zrsi('low', indicator.len_harsi),
+                indicator.smoothing,
+                with_range=False
+            )
+        ha_rsi = heikin_ashi[ha_key]
+        
+        # Sinal de cada vela, com a mesma prioridade de get_signal()
+        flags = indicator._signal_flags(rsi, ha_rsi['ha_open'], ha_rsi['ha_close'])
+        flags['rsi'] = rsi
+        rules = indicator._signal_rules()
+        matched = np.select([condition(flags) for condition, _, _, _ in rules], np.arange(len(rules)), default=-1)
+        signal_types = np.array([rule[1] for rule in rules] + ['NONE'])[matched]
+        strengths = np.array([rule[2] for rule in rules] + [0])[matched]
+        
+        # Resultado das entradas: retorno a favor da posição após `horizon` velas
+        entries = (strengths >= min_strength) & ~np.isnan(forward)
+        direction = np.where(signal_types == 'SELL', -1.0, 1.0)
+        outcomes = (forward * direction)[entries]
+        wins = int((outcomes > 0).sum())
+        trades = len(outcomes)
+        
+        row = indicator.get_params()
+        row.update({
+            'buy_signals': int((signal_types == 'BUY').sum()),
+            'sell_signals': int((signal_types == 'SELL').sum()),
+            'strength_1': int((strengths == 1).sum()),
+            'strength_2': int((strengths == 2).sum()),
+            'strength_3': int((strengths == 3).sum()),
+            'trades': trades,
+            'wins': wins,
+            'losses': trades - wins,
+            'win_rate': (wins / trades) * 100 if trades > 0 else 0.0,
+            'avg_return_pct': float(outcomes.mean()) if trades > 0 else 0.0,
+            'total_return_pct': float(outcomes.sum())
+        })
+        rows.append(row)
+    
+    return rows
+
+
+def _balanced_batches(configs: List[Dict], workers: int) -> List[List[int]]:
+    """
+    Divide as posições das configurações em até `workers` lotes de tamanho parecido
+    
+    Configurações com o mesmo (len_rsi, len_harsi, smoothing) compartilham
+    RSI e Heikin Ashi e ficam juntas; grupos maiores que a parte de um
+    processo são divididos, para que uma grade com poucos grupos também
+    rode em paralelo. Os pedaços vão, do maior para o menor, para o lote
+    com menos configurações.
+    """
+    defaults = GCMIndicator().get_params()
+    groups: Dict[tuple, List[int]] = {}
+    for position, config in enumerate(configs):
+        key = tuple(config.get(name, defaults[name]) for name in ('len_rsi', 'len_harsi', 'smoothing'))
+        groups.setdefault(key, []).append(position)
+    
+    share = -(-len(configs) // workers)
+    pieces = [group[start:start + share] for group in groups.values() for start in range(0, len(group), share)]
+    
+    batches: List[List[int]] = [[] for _ in range(min(workers, len(pieces)))]
+    for piece in sorted(pieces, key=len, reverse=True):
+        min(batches, key=len).extend(piece)
+    return batches
+
+
+def run_sweep(df: pd.DataFrame,
+              configs: List[Dict],
+              horizon: int = 10,
+              min_strength: int = 3,
+              workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Calcula sinais e resultados para várias configurações do indicador
+    
+    As configurações são divididas em um lote por processo do pool (ver
+    _balanced_batches), e cada lote reaproveita RSIs e Heikin Ashi entre as
+    suas configurações.
+    
+    Args:
+        df: DataFrame OHLCV com o histórico
+        configs: Lista de dicts com parâmetros do GCMIndicator (ver parameter_grid)
+        horizon: Número de velas usado para medir o resultado de cada entrada
+        min_strength: Força mínima do sinal para contar como entrada (padrão 3, como a estratégia)
+        workers: Número de processos (None = número de CPUs, 1 = sem pool)
+        
+    Returns:
+        DataFrame com uma linha por configuração: parâmetros, contagem de sinais e resultados
+    """
+    if not configs:
+        return pd.DataFrame()
+    
+    arrays = {column: df[column].to_numpy(dtype=float) for column in ('close', 'high', 'low')}
+    batches = _balanced_batches(configs, workers or os.cpu_count() or 1)
+    
+    if len(batches) <= 1:
+        results = [_evaluate_configs(arrays, [configs[i] for i in batch], horizon, min_strength)
+                   for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+            futures = [
+                pool.submit(_evaluate_configs, arrays, [configs[i] for i in batch], horizon, min_strength)
+                for batch in batches
+            ]
+            results = [future.result() for future in futures]
+    
+    # Restaura a ordem original das configurações
+    rows: List[Optional[Dict]] = [None] * len(configs)
+    for batch, batch_rows in zip(batches, results):
+        for position, row in zip(batch, batch_rows):
+            rows[position] = row
+    
+    return pd.DataFrame(rows)
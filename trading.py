@@ -2,18 +2,38 @@
 Sistema de Monitoramento e Gerenciamento de Posições
 Inclui Stop Loss e Take Profit
 """
+import os
 import pandas as pd
-from typing import Dict, List, Optional
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+
+from analytics import PERIODS, TradeAnalytics
+from position_store import PositionStore
+from trigger_book import TriggerBook
+
+# Posições e deduplicação de alertas são por (símbolo, timeframe)
+PositionKey = Tuple[str, str]
 
 
 class PositionManager:
-    """Gerencia posições abertas com Stop Loss e Take Profit"""
+    """
+    Gerencia posições abertas com Stop Loss e Take Profit
+    
+    Cada símbolo pode ter uma posição por timeframe: as posições são
+    indexadas por (símbolo, timeframe), e as estatísticas somam as operações
+    de todos os timeframes do símbolo. Cada operação fechada também entra no
+    TradeAnalytics (drawdown, profit factor, janelas móveis etc., global,
+    por símbolo e por timeframe). Os níveis das posições abertas ficam
+    em um TriggerBook, então checar um preço custa uma busca binária no livro
+    do símbolo, e não uma varredura das posições.
+    """
     
     def __init__(self, 
                  stop_loss_pct: float = 2.0,
                  take_profit_pct: float = 3.0,
-                 risk_reward_ratio: float = 1.5):
+                 risk_reward_ratio: float = 1.5,
+                 store: Optional[PositionStore] = None):
         """
         Inicializa o gerenciador de posições
         
@@ -21,13 +41,51 @@ class PositionManager:
             stop_loss_pct: Percentual de stop loss (padrão 2%)
             take_profit_pct: Percentual de take profit (padrão 3%)
             risk_reward_ratio: Razão risco/retorno (padrão 1.5:1)
+            store: Persistência opcional; o estado salvo é carregado aqui e
+                as mudanças são gravadas em flush()
         """
         self.stop_loss_pct = stop_loss_pct
         self.take_profit_pct = take_profit_pct
         self.risk_reward_ratio = risk_reward_ratio
-        self.positions: Dict[str, Dict] = {}
+        self.positions: Dict[PositionKey, Dict] = {}
         # Estatísticas por símbolo: {symbol: {wins: 0, losses: 0, total: 0, win_rate: 0.0}}
         self.statistics: Dict[str, Dict] = {}
+        self.triggers = TriggerBook()
+        self.analytics = TradeAnalytics()
+        
+        # Mudanças ainda não gravadas: posições, estatísticas e escopos alterados e operações fechadas
+        self.store = store
+        self._dirty: Set[PositionKey] = set()
+        self._dirty_statistics: Set[str] = set()
+        self._dirty_analytics: Set[str] = set()
+        self._closed: List[Dict] = []
+        if store is not None:
+            self.positions, self.statistics = store.load()
+            for key in self.positions:
+                self._sync_triggers(key)
+            self._load_analytics()
+    
+    def _load_analytics(self):
+        """Carrega as estatísticas de desempenho; em um banco sem elas, recalcula pelo histórico"""
+        states = self.store.load_analytics()
+        if not states:
+            for trade in self.store.iter_trades():
+                self._dirty_analytics.update(self.analytics.record(*self._trade_fields(trade)))
+            return
+        
+        # As janelas de tempo são refeitas só com as operações recentes
+        self.analytics.load(states)
+        since = (datetime.now() - timedelta(seconds=max(PERIODS.values()))).isoformat()
+        for trade in self.store.iter_trades(since):
+            self.analytics.restore(*self._trade_fields(trade))
+    
+    def _sync_triggers(self, key: PositionKey):
+        """Registra os níveis da posição no livro de gatilhos (ou os retira, se ela não está aberta)"""
+        position = self.positions.get(key)
+        if position is not None and position['status'] == 'OPEN':
+            self.triggers.add(key, position['symbol'], position['type'], position['stop_loss'], position['take_profit'])
+        else:
+            self.triggers.remove(key)
     
     def calculate_stop_loss(self, entry_price: float, position_type: str) -> float:
         """
@@ -60,7 +118,8 @@ class PositionManager:
                       position_type: str, 
                       entry_price: float,
                       signal_strength: int = 1,
-                      message: str = '') -> Dict:
+                      message: str = '',
+                      timeframe: str = '15m') -> Dict:
         """
         Abre uma nova posição
         
@@ -70,6 +129,7 @@ class PositionManager:
             entry_price: Preço de entrada
             signal_strength: Força do sinal (1-3)
             message: Mensagem descritiva
+            timeframe: Timeframe que gerou o sinal
         """
         stop_loss = self.calculate_stop_loss(entry_price, position_type)
         take_profit = self.calculate_take_profit(entry_price, position_type)
@@ -85,35 +145,39 @@ class PositionManager:
             'status': 'OPEN',
             'message': message,
             'pnl': 0.0,
-            'pnl_pct': 0.0
+            'pnl_pct': 0.0,
+            'timeframe': timeframe
         }
         
-        self.positions[symbol] = position
+        key = (symbol, timeframe)
+        self.positions[key] = position
+        self._sync_triggers(key)
+        self._dirty.add(key)
         return position
     
-    def check_exit_conditions(self, symbol: str, current_price: float) -> Optional[Dict]:
+    def check_exit_conditions(self, symbol: str, current_price: float, timeframe: str = '15m') -> Optional[Dict]:
         """
         Verifica se alguma condição de saída foi atingida
         
+        Só a posição do timeframe é verificada; as dos outros timeframes do
+        símbolo são verificadas nos ciclos deles (ou em check_price).
+        
         Args:
             symbol: Símbolo do ativo
             current_price: Preço atual
+            timeframe: Timeframe da posição
             
         Returns:
             Dict com informações de saída se alguma condição foi atingida, None caso contrário
         """
-        if symbol not in self.positions:
-            return None
-        
-        position = self.positions[symbol]
+        key = (symbol, timeframe)
+        position = self.positions.get(key)
         
-        if position['status'] != 'OPEN':
+        if position is None or position['status'] != 'OPEN':
             return None
         
         position_type = position['type']
         entry_price = position['entry_price']
-        stop_loss = position['stop_loss']
-        take_profit = position['take_profit']
         
         # Calcula PnL
         if position_type == 'LONG':
@@ -122,22 +186,54 @@ class PositionManager:
             pnl_pct = ((entry_price - current_price) / entry_price) * 100
         
         position['pnl_pct'] = pnl_pct
+        self._dirty.add(key)
         
-        # Verifica Stop Loss
-        if position_type == 'LONG' and current_price <= stop_loss:
-            return self.close_position(symbol, current_price, 'STOP_LOSS')
-        elif position_type == 'SHORT' and current_price >= stop_loss:
-            return self.close_position(symbol, current_price, 'STOP_LOSS')
-        
-        # Verifica Take Profit
-        if position_type == 'LONG' and current_price >= take_profit:
-            return self.close_position(symbol, current_price, 'TAKE_PROFIT')
-        elif position_type == 'SHORT' and current_price <= take_profit:
-            return self.close_position(symbol, current_price, 'TAKE_PROFIT')
+        # Stop loss tem prioridade sobre take profit (como em TriggerBook.check_range)
+        if position_type == 'LONG':
+            hit_stop = current_price <= position['stop_loss']
+            hit_target = current_price >= position['take_profit']
+        else:  # SHORT
+            hit_stop = current_price >= position['stop_loss']
+            hit_target = current_price <= position['take_profit']
         
+        if hit_stop:
+            return self._close(key, current_price, 'STOP_LOSS')
+        if hit_target:
+            return self._close(key, current_price, 'TAKE_PROFIT')
         return None
     
-    def close_position(self, symbol: str, exit_price: float, exit_reason: str) -> Dict:
+    def check_price(self, symbol: str, price: float) -> List[Dict]:
+        """
+        Fecha as posições do símbolo (de todos os timeframes) cujo stop ou alvo foi cruzado pelo preço
+        
+        Usado a cada atualização de preço (ex: stream de velas), sem passar
+        pelo indicador. O preço de saída é o próprio preço informado.
+        
+        Returns:
+            Lista das posições fechadas
+        """
+        return [
+            self._close(key, price, reason)
+            for key, reason in self.triggers.check(symbol, price)
+        ]
+    
+    def check_range(self, symbol: str, low: float, high: float) -> List[Dict]:
+        """
+        Fecha as posições do símbolo cujo stop ou alvo está entre a mínima e a máxima de uma vela
+        
+        A saída é no nível do gatilho; com stop e alvo na mesma vela vale o stop.
+        
+        Returns:
+            Lista das posições fechadas
+        """
+        closed = []
+        for key, reason in self.triggers.check_range(symbol, low, high):
+            position = self.positions[key]
+            level = position['stop_loss'] if reason == 'STOP_LOSS' else position['take_profit']
+            closed.append(self._close(key, level, reason))
+        return closed
+    
+    def close_position(self, symbol: str, exit_price: float, exit_reason: str, timeframe: str = '15m') -> Dict:
         """
         Fecha uma posição
         
@@ -145,11 +241,15 @@ class PositionManager:
             symbol: Símbolo do ativo
             exit_price: Preço de saída
             exit_reason: Razão da saída (STOP_LOSS, TAKE_PROFIT, MANUAL, SIGNAL)
+            timeframe: Timeframe da posição
         """
-        if symbol not in self.positions:
+        return self._close((symbol, timeframe), exit_price, exit_reason)
+    
+    def _close(self, key: PositionKey, exit_price: float, exit_reason: str) -> Dict:
+        if key not in self.positions:
             return {'error': 'Position not found'}
         
-        position = self.positions[symbol]
+        position = self.positions[key]
         entry_price = position['entry_price']
         position_type = position['type']
         
@@ -166,13 +266,39 @@ class PositionManager:
         position['pnl_pct'] = pnl_pct
         
         # Atualiza estatísticas
-        self._update_statistics(symbol, exit_reason, pnl_pct)
+        self._update_statistics(key[0], exit_reason, pnl_pct)
+        
+        self.triggers.remove(key)
+        self._dirty.add(key)
+        self._dirty_statistics.add(key[0])
+        self._record_trade(position)
         
         return position
     
-    def get_position(self, symbol: str) -> Optional[Dict]:
+    def _record_trade(self, position: Dict):
+        """Registra uma operação fechada nas estatísticas de desempenho e no histórico"""
+        self._dirty_analytics.update(self.analytics.record(*self._trade_fields(position)))
+        if self.store is not None:
+            self._closed.append(dict(position))
+    
+    @staticmethod
+    def _trade_fields(trade: Dict) -> Tuple[str, Optional[str], float, bool, float]:
+        """(símbolo, timeframe, PnL %, ganho, horário do fechamento em epoch) de uma operação fechada"""
+        # Mesmo critério de ganho de _update_statistics
+        is_win = trade.get('exit_reason') == 'TAKE_PROFIT' or trade['pnl_pct'] > 0
+        try:
+            closed_at = datetime.fromisoformat(trade['exit_time']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            closed_at = datetime.now().timestamp()
+        return trade['symbol'], trade.get('timeframe'), trade['pnl_pct'], is_win, closed_at
+    
+    def get_position(self, symbol: str, timeframe: str = '15m') -> Optional[Dict]:
         """Retorna informações de uma posição"""
-        return self.positions.get(symbol)
+        return self.positions.get((symbol, timeframe))
+    
+    def get_symbol_positions(self, symbol: str) -> List[Dict]:
+        """Retorna as posições do símbolo em todos os timeframes"""
+        return [position for key, position in self.positions.items() if key[0] == symbol]
     
     def get_all_positions(self) -> List[Dict]:
         """Retorna todas as posições"""
@@ -250,39 +376,144 @@ class PositionManager:
         if symbol:
             if symbol in self.statistics:
                 del self.statistics[symbol]
+                self._dirty_statistics.add(symbol)
         else:
+            self._dirty_statistics.update(self.statistics)
             self.statistics = {}
+        self._dirty_analytics.update(self.analytics.reset(symbol))
+    
+    def merge(self, positions: Dict[PositionKey, Dict], statistics: Dict[str, Dict]):
+        """
+        Incorpora posições e estatísticas calculadas em outro processo (ex: um shard)
+        
+        Posições que chegam fechadas e que estavam abertas aqui entram no
+        histórico de operações e nas estatísticas de desempenho. Uma posição
+        que chega aberta mas já foi fechada aqui (fechamento manual enviado
+        ao shard depois que ele gerou o relatório) é ignorada: o shard ainda
+        vai confirmar o fechamento, e reabri-la faria a operação ser
+        registrada duas vezes.
+        """
+        for key, position in positions.items():
+            current = self.positions.get(key)
+            if position == current:
+                continue
+            if (position['status'] == 'OPEN' and current is not None and current['status'] == 'CLOSED'
+                    and current['entry_time'] == position['entry_time']):
+                continue
+            if (position['status'] == 'CLOSED'
+                    and (current is None or current['status'] == 'OPEN' or current['entry_time'] != position['entry_time'])):
+                self._record_trade(position)
+            self.positions[key] = position
+            self._sync_triggers(key)
+            self._dirty.add(key)
+        
+        for symbol, stats in statistics.items():
+            if self.statistics.get(symbol) != stats:
+                self.statistics[symbol] = stats
+                self._dirty_statistics.add(symbol)
+    
+    def flush(self):
+        """Grava as mudanças acumuladas (chamado uma vez por ciclo do monitoramento)"""
+        if self.store is None or (not self._dirty and not self._dirty_statistics and not self._dirty_analytics and not self._closed):
+            self._dirty.clear()
+            self._dirty_statistics.clear()
+            self._dirty_analytics.clear()
+            return
+        
+        dirty, dirty_statistics, dirty_analytics, closed = self._dirty, self._dirty_statistics, self._dirty_analytics, self._closed
+        self._dirty, self._dirty_statistics, self._dirty_analytics, self._closed = set(), set(), set(), []
+        try:
+            analytics = {scope: self.analytics.state(scope) for scope in dirty_analytics}
+            self.store.save(self.positions, self.statistics, dirty, dirty_statistics, closed, analytics)
+        except Exception:
+            # Mantém as mudanças para a próxima tentativa
+            self._dirty |= dirty
+            self._dirty_statistics |= dirty_statistics
+            self._dirty_analytics |= dirty_analytics
+            self._closed = closed + self._closed
+            raise
 
 
-class AlertMonitor:
-    """Monitora e gerencia alertas de sinais"""
+class _AlertIndex:
+    """
+    Ids dos alertas de uma chave (símbolo ou tipo), em ordem crescente
+    
+    Lista com início móvel: acrescentar e descartar os mais antigos é O(1)
+    amortizado, e as consultas por intervalo de ids usam busca binária.
+    """
     
     def __init__(self):
-        self.alerts: List[Dict] = []
-        self.max_alerts = 100  # Mantém apenas os últimos 100 alertas
-        self.last_alert_candle: Dict[str, int] = {}  # Armazena timestamp da última vela alertada por símbolo
+        self.ids: List[int] = []
+        self.head = 0
+    
+    def __len__(self) -> int:
+        return len(self.ids) - self.head
+    
+    def append(self, alert_id: int):
+        self.ids.append(alert_id)
+    
+    def prune(self, first_id: int):
+        """Descarta os ids menores que first_id (alertas sobrescritos no buffer)"""
+        self.head = bisect_left(self.ids, first_id, self.head)
+        if self.head > 1024 and self.head * 2 > len(self.ids):
+            del self.ids[:self.head]
+            self.head = 0
+    
+    def newest(self, after: int, before: int, limit: int) -> List[int]:
+        """Até `limit` ids em (after, before), do mais recente para o mais antigo"""
+        low = bisect_right(self.ids, after, self.head)
+        high = bisect_left(self.ids, before, low)
+        return self.ids[max(low, high - limit):high][::-1]
+
+
+class AlertMonitor:
+    """
+    Monitora e gerencia alertas de sinais
+    
+    Os alertas ficam em um buffer circular de capacidade fixa (ALERT_CAPACITY,
+    padrão 100000), que cresce conforme os alertas chegam: acrescentar é
+    O(1) e, cheio, o mais antigo é sobrescrito. Cada alerta recebe um id crescente, usado como cursor na
+    paginação, e entra nos índices por símbolo e por tipo de sinal.
+    """
     
-    def should_alert(self, symbol: str, candle_timestamp: int) -> bool:
+    def __init__(self, max_alerts: Optional[int] = None):
         """
-        Verifica se deve gerar alerta para o símbolo
+        Args:
+            max_alerts: Capacidade do buffer (padrão ALERT_CAPACITY)
+        """
+        self.max_alerts = max_alerts or int(os.getenv("ALERT_CAPACITY", "100000"))
+        self._buffer: List[Dict] = []
+        self._next_id = 1
+        self._first_id = 1  # Menor id ainda no buffer
+        self._base_id = 1  # Id guardado na posição 0 do buffer
+        self._by_symbol: Dict[str, _AlertIndex] = {}
+        self._by_type: Dict[str, _AlertIndex] = {}
+        self.last_alert_candle: Dict[PositionKey, int] = {}  # Timestamp da última vela alertada por (símbolo, timeframe)
+    
+    def should_alert(self, symbol: str, candle_timestamp: int, timeframe: str = '15m') -> bool:
+        """
+        Verifica se deve gerar alerta para o símbolo no timeframe
         Retorna True apenas se for uma nova vela
         
         Args:
             symbol: Símbolo do ativo
             candle_timestamp: Timestamp da vela atual (em milissegundos)
+            timeframe: Timeframe da vela
         """
-        if symbol not in self.last_alert_candle:
+        key = (symbol, timeframe)
+        if key not in self.last_alert_candle:
             return True
         
         # Se o timestamp da vela é diferente da última alertada, pode alertar
-        return candle_timestamp != self.last_alert_candle[symbol]
+        return candle_timestamp != self.last_alert_candle[key]
     
     def add_alert(self, 
                   symbol: str, 
                   signal_type: str, 
                   message: str, 
                   data: Dict,
-                  candle_timestamp: int = None) -> Dict:
+                  candle_timestamp: int = None,
+                  timeframe: Optional[str] = None) -> Dict:
         """
         Adiciona um novo alerta
         
@@ -292,10 +523,14 @@ class AlertMonitor:
             message: Mensagem descritiva
             data: Dados adicionais
             candle_timestamp: Timestamp da vela (em milissegundos)
+            timeframe: Timeframe do sinal
         """
+        alert_id = self._next_id
         alert = {
+            'id': alert_id,
             'timestamp': datetime.now().isoformat(),
             'symbol': symbol,
+            'timeframe': timeframe,
             'signal_type': signal_type,
             'message': message,
             'data': data
@@ -303,23 +538,92 @@ class AlertMonitor:
         
         # Registra o timestamp da vela alertada
         if candle_timestamp:
-            self.last_alert_candle[symbol] = candle_timestamp
+            self.last_alert_candle[(symbol, timeframe)] = candle_timestamp
         
-        self.alerts.insert(0, alert)  # Adiciona no início da lista
-        
-        # Limita o número de alertas
-        if len(self.alerts) > self.max_alerts:
-            self.alerts = self.alerts[:self.max_alerts]
+        # Cresce até a capacidade; cheio, sobrescreve o alerta mais antigo
+        slot = self._slot(alert_id)
+        if slot == len(self._buffer):
+            self._buffer.append(alert)
+        else:
+            self._buffer[slot] = alert
+        self._next_id += 1
+        self._first_id = max(self._first_id, self._next_id - self.max_alerts)
+        
+        for indexes, key in ((self._by_symbol, symbol), (self._by_type, signal_type)):
+            index = indexes.get(key)
+            if index is None:
+                index = indexes[key] = _AlertIndex()
+            index.append(alert_id)
+            # Os índices descartam os ids sobrescritos aos poucos, a cada alerta da mesma chave
+            index.prune(self._first_id)
         
         return alert
     
-    def get_alerts(self, limit: int = 50) -> List[Dict]:
-        """Retorna os alertas mais recentes"""
-        return self.alerts[:limit]
+    def _slot(self, alert_id: int) -> int:
+        return (alert_id - self._base_id) % self.max_alerts
+    
+    @property
+    def cursor(self) -> int:
+        """Id do alerta mais recente (0 se nunca houve alertas)"""
+        return self._next_id - 1
+    
+    def __len__(self) -> int:
+        return self._next_id - self._first_id
+    
+    def get_alerts(self,
+                   limit: int = 50,
+                   since: Optional[int] = None,
+                   before: Optional[int] = None,
+                   symbol: Optional[str] = None,
+                   signal_type: Optional[str] = None) -> List[Dict]:
+        """
+        Retorna os alertas mais recentes, do mais novo para o mais antigo
+        
+        Args:
+            limit: Número máximo de alertas
+            since: Apenas alertas com id maior (novos desde a última consulta)
+            before: Apenas alertas com id menor (página anterior do histórico)
+            symbol: Filtra por símbolo
+            signal_type: Filtra por tipo de sinal (BUY, SELL, INFO)
+        """
+        after = self._first_id - 1 if since is None else max(since, self._first_id - 1)
+        before = self._next_id if before is None else min(before, self._next_id)
+        if limit <= 0 or before <= after + 1:
+            return []
+        
+        if symbol is None and signal_type is None:
+            ids = range(before - 1, max(after, before - 1 - limit), -1)
+            return [self._buffer[self._slot(alert_id)] for alert_id in ids]
+        
+        # Percorre o menor dos índices e confere o outro filtro no alerta
+        candidates = [
+            indexes.get(key)
+            for indexes, key in ((self._by_symbol, symbol), (self._by_type, signal_type))
+            if key is not None
+        ]
+        if any(index is None for index in candidates):
+            return []
+        index = min(candidates, key=len)
+        
+        alerts = []
+        while len(alerts) < limit:
+            ids = index.newest(after, before, limit - len(alerts))
+            if not ids:
+                break
+            for alert_id in ids:
+                alert = self._buffer[self._slot(alert_id)]
+                if (symbol is None or alert['symbol'] == symbol) and (signal_type is None or alert['signal_type'] == signal_type):
+                    alerts.append(alert)
+            before = ids[-1]
+        return alerts
     
     def clear_alerts(self):
-        """Limpa todos os alertas"""
-        self.alerts = []
+        """Limpa todos os alertas (os ids continuam crescendo, então os cursores seguem válidos)"""
+        self._buffer = []
+        self._first_id = self._next_id
+        self._base_id = self._next_id
+        self._by_symbol = {}
+        self._by_type = {}
 
 
 class TradingStrategy:
@@ -355,8 +659,8 @@ class TradingStrategy:
         signal_type = signal['signal']
         strength = signal['strength']
         
-        # Verifica se já existe posição aberta
-        current_position = self.position_manager.get_position(symbol)
+        # Verifica se já existe posição aberta no timeframe
+        current_position = self.position_manager.get_position(symbol, timeframe)
         
         result = {
             'action': 'NONE',
@@ -367,23 +671,10 @@ class TradingStrategy:
         
         # Se já tem posição aberta, verifica condições de saída
         if current_position and current_position['status'] == 'OPEN':
-            exit_info = self.position_manager.check_exit_conditions(symbol, current_price)
+            exit_info = self.position_manager.check_exit_conditions(symbol, current_price, timeframe)
             
             if exit_info:
-                result['action'] = 'EXIT'
-                result['position'] = exit_info
-                result['message'] = f"Posição fechada: {exit_info['exit_reason']}"
-                
-                # Adiciona alerta
-                alert = self.alert_monitor.add_alert(
-                    symbol=symbol,
-                    signal_type='INFO',
-                    message=result['message'],
-                    data=exit_info
-                )
-                result['alert'] = alert
-                
-                return result
+                return self._exit_result(exit_info)
             
             # Atualiza PnL da posição
             current_position['current_price'] = current_price
@@ -395,19 +686,17 @@ class TradingStrategy:
             # Sinais de força 1-2 são apenas alertas/avisos
             if signal_type == 'BUY' and strength >= 3:
                 # Verifica se deve alertar (nova vela)
-                if not candle_timestamp or self.alert_monitor.should_alert(symbol, candle_timestamp):
+                if not candle_timestamp or self.alert_monitor.should_alert(symbol, candle_timestamp, timeframe):
                     # Abre posição LONG
                     position = self.position_manager.open_position(
                         symbol=symbol,
                         position_type='LONG',
                         entry_price=current_price,
                         signal_strength=strength,
-                        message=signal['message']
+                        message=signal['message'],
+                        timeframe=timeframe
                     )
                     
-                    # Adiciona timeframe aos dados
-                    position['timeframe'] = timeframe
-                    
                     result['action'] = 'ENTRY_LONG'
                     result['position'] = position
                     
@@ -425,25 +714,24 @@ class TradingStrategy:
                         signal_type='BUY',
                         message=result['message'],
                         data=position,
-                        candle_timestamp=candle_timestamp
+                        candle_timestamp=candle_timestamp,
+                        timeframe=timeframe
                     )
                     result['alert'] = alert
             
             elif signal_type == 'SELL' and strength >= 3:
                 # Verifica se deve alertar (nova vela)
-                if not candle_timestamp or self.alert_monitor.should_alert(symbol, candle_timestamp):
+                if not candle_timestamp or self.alert_monitor.should_alert(symbol, candle_timestamp, timeframe):
                     # Abre posição SHORT
                     position = self.position_manager.open_position(
                         symbol=symbol,
                         position_type='SHORT',
                         entry_price=current_price,
                         signal_strength=strength,
-                        message=signal['message']
+                        message=signal['message'],
+                        timeframe=timeframe
                     )
                     
-                    # Adiciona timeframe aos dados
-                    position['timeframe'] = timeframe
-                    
                     result['action'] = 'ENTRY_SHORT'
                     result['position'] = position
                     
@@ -461,8 +749,38 @@ class TradingStrategy:
                         signal_type='SELL',
                         message=result['message'],
                         data=position,
-                        candle_timestamp=candle_timestamp
+                        candle_timestamp=candle_timestamp,
+                        timeframe=timeframe
                     )
                     result['alert'] = alert
         
         return result
+    
+    def _exit_result(self, exit_info: Dict) -> Dict:
+        """Resultado e alerta de uma posição fechada por stop loss ou take profit"""
+        message = f"Posição fechada: {exit_info['exit_reason']}"
+        alert = self.alert_monitor.add_alert(
+            symbol=exit_info['symbol'],
+            signal_type='INFO',
+            message=message,
+            data=exit_info,
+            timeframe=exit_info.get('timeframe')
+        )
+        return {
+            'action': 'EXIT',
+            'message': message,
+            'position': exit_info,
+            'alert': alert
+        }
+    
+    def process_price(self, symbol: str, price: float) -> List[Dict]:
+        """
+        Verifica só as saídas das posições do símbolo para um novo preço
+        
+        Mais barato que process_signal (não usa o indicador), então pode ser
+        chamado a cada atualização de preço.
+        
+        Returns:
+            Um resultado EXIT (como em process_signal) por posição fechada
+        """
+        return [self._exit_result(exit_info) for exit_info in self.position_manager.check_price(symbol, price)]
@@ -0,0 +1,153 @@
+"""
+Livro de gatilhos de stop loss e take profit
+Níveis ordenados por preço para achar as saídas cruzadas por um preço ou uma vela
+"""
+import itertools
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Hashable, List, Optional, Tuple
+
+STOP_LOSS = 'STOP_LOSS'
+TAKE_PROFIT = 'TAKE_PROFIT'
+
+# (nível, sequência, id da posição, motivo); a sequência desempata níveis iguais
+Trigger = Tuple[float, int, Hashable, str]
+
+
+class _SymbolBook:
+    """Gatilhos de um símbolo: os que disparam com o preço subindo e os que disparam com ele caindo"""
+    
+    def __init__(self):
+        self.above: List[Trigger] = []  # disparam com preço >= nível (TP de compra, SL de venda)
+        self.below: List[Trigger] = []  # disparam com preço <= nível (SL de compra, TP de venda)
+    
+    def __len__(self) -> int:
+        return len(self.above) + len(self.below)
+
+
+class TriggerBook:
+    """
+    Níveis de stop loss e take profit de muitas posições, por símbolo
+    
+    Cada posição tem dois gatilhos. Por símbolo, os gatilhos ficam em duas
+    listas ordenadas pelo nível: os que disparam quando o preço sobe até o
+    nível e os que disparam quando ele cai até o nível. Um preço (ou a
+    máxima/mínima de uma vela) encontra por busca binária exatamente os
+    gatilhos cruzados, em O(log n + k), e eles são retirados com o gatilho
+    irmão da mesma posição. Vale para várias posições por símbolo
+    (timeframes, estratégias ou entradas parciais diferentes), identificadas
+    por `position_id`.
+    """
+    
+    def __init__(self):
+        self._books: Dict[str, _SymbolBook] = {}
+        # position_id -> (símbolo, gatilho de stop, gatilho de alvo)
+        self._positions: Dict[Hashable, Tuple[str, Trigger, Trigger]] = {}
+        self._sequence = itertools.count()
+        self.checks = 0
+        self.fired = 0
+    
+    def __len__(self) -> int:
+        return len(self._positions)
+    
+    def __contains__(self, position_id: Hashable) -> bool:
+        return position_id in self._positions
+    
+    def add(self, position_id: Hashable, symbol: str, position_type: str, stop_loss: float, take_profit: float):
+        """
+        Registra (ou substitui) os gatilhos de uma posição
+        
+        Args:
+            position_id: Identificador da posição
+            symbol: Símbolo do ativo
+            position_type: 'LONG' ou 'SHORT'
+            stop_loss: Preço de stop loss
+            take_profit: Preço de take profit
+        """
+        self.remove(position_id)
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = _SymbolBook()
+        
+        stop = (stop_loss, next(self._sequence), position_id, STOP_LOSS)
+        target = (take_profit, next(self._sequence), position_id, TAKE_PROFIT)
+        if position_type == 'LONG':
+            insort(book.below, stop)
+            insort(book.above, target)
+        else:  # SHORT
+            insort(book.above, stop)
+            insort(book.below, target)
+        self._positions[position_id] = (symbol, stop, target)
+    
+    def remove(self, position_id: Hashable) -> bool:
+        """Retira os gatilhos de uma posição; False se ela não estava no livro"""
+        entry = self._positions.pop(position_id, None)
+        if entry is None:
+            return False
+        
+        symbol, stop, target = entry
+        book = self._books[symbol]
+        for trigger in (stop, target):
+            for levels in (book.above, book.below):
+                index = bisect_left(levels, trigger)
+                if index < len(levels) and levels[index] == trigger:
+                    del levels[index]
+                    break
+        if not book:
+            del self._books[symbol]
+        return True
+    
+    def check(self, symbol: str, price: float) -> List[Tuple[Hashable, str]]:
+        """Dispara os gatilhos cruzados por um preço"""
+        return self.check_range(symbol, price, price)
+    
+    def check_range(self, symbol: str, low: float, high: float) -> List[Tuple[Hashable, str]]:
+        """
+        Dispara os gatilhos cruzados por um intervalo de preços (mínima e máxima de uma vela)
+        
+        Se o stop e o alvo da mesma posição estão no intervalo, vale o stop
+        loss (a hipótese conservadora, como em check_exit_conditions).
+        
+        Returns:
+            Lista de (position_id, motivo); os gatilhos disparados e os seus
+            irmãos saem do livro
+        """
+        self.checks += 1
+        book = self._books.get(symbol)
+        if book is None:
+            return []
+        
+        # Acima: nível <= máxima; abaixo: nível >= mínima
+        above_end = bisect_right(book.above, (high, float('inf')))
+        below_start = bisect_left(book.below, (low, -1))
+        crossed = book.above[:above_end] + book.below[below_start:]
+        if not crossed:
+            return []
+        
+        reasons: Dict[Hashable, str] = {}
+        for _, _, position_id, reason in crossed:
+            if reasons.get(position_id) != STOP_LOSS:
+                reasons[position_id] = reason
+        
+        # Os gatilhos cruzados são contíguos nas listas: saem de uma vez; depois sai o irmão de cada um
+        del book.above[:above_end]
+        del book.below[below_start:]
+        for position_id in reasons:
+            self.remove(position_id)
+        self.fired += len(reasons)
+        return list(reasons.items())
+    
+    def levels(self, position_id: Hashable) -> Optional[Tuple[float, float]]:
+        """Retorna (stop loss, take profit) da posição, ou None"""
+        entry = self._positions.get(position_id)
+        if entry is None:
+            return None
+        return entry[1][0], entry[2][0]
+    
+    def get_stats(self) -> Dict:
+        """Retorna o número de posições e símbolos no livro e os disparos"""
+        return {
+            'positions': len(self._positions),
+            'symbols': len(self._books),
+            'checks': self.checks,
+            'fired': self.fired
+        }